@@ -0,0 +1,252 @@
+"""
+In-memory library store
+
+Books are kept in a dict keyed by id, with secondary indexes maintained on
+every write:
+
+    author    -> ids of that author's books
+    available -> ids of books that can be borrowed
+    book      -> its open borrow record (a book has at most one holder)
+    user      -> ids of the books the user holds
+
+so lookups, borrow/return and "my borrows" are O(1) instead of a scan of
+the whole list. Ids come from a counter that only moves forward, so an id is
+never handed out twice, even after deletes.
+
+All access goes through a readers-writer lock: many requests can read at
+once on a threaded server, writers get exclusive access and are not starved
+by a steady stream of readers. Dicts returned to callers are copies, so
+routes cannot change a book behind the indexes' back.
+
+With a `journal` (see persistence.py) every write is appended to it as a
+record and only then applied to memory, both under the write lock: the
+journal order is the apply order, and a write whose append fails leaves the
+store untouched. The caller then waits for the record to be durable after
+releasing the lock, letting concurrent writers share one fsync.
+"""
+import threading
+from contextlib import contextmanager
+
+
+class BookNotFound(LookupError):
+    pass
+
+
+class BookUnavailable(Exception):
+    pass
+
+
+class RecordNotFound(LookupError):
+    pass
+
+
+class RWLock:
+    """Shared/exclusive lock; waiting writers block new readers"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class LibraryStore:
+    def __init__(self, books=(), borrows=(), next_id=1, journal=None):
+        self.lock = RWLock()
+        self._books = {}          # id -> book
+        self._by_author = {}      # author -> {id: None} (insertion-ordered set)
+        self._available = {}      # id -> None
+        self._records = {}        # book_id -> open borrow record
+        self._by_user = {}        # user -> {book_id: None}
+        self._next_id = next_id
+        self.journal = journal
+
+        for book in books:
+            self._insert(dict(book))
+        for record in borrows:
+            self._add_record(record["book_id"], record["user"])
+
+    # ---- index maintenance (caller holds the write lock) ----
+
+    def _insert(self, book):
+        book_id = book["id"]
+        self._books[book_id] = book
+        self._by_author.setdefault(book.get("author"), {})[book_id] = None
+        if book.get("available", True):
+            self._available[book_id] = None
+        self._next_id = max(self._next_id, book_id + 1)
+
+    def _set_available(self, book, available):
+        book["available"] = available
+        if available:
+            self._available[book["id"]] = None
+        else:
+            self._available.pop(book["id"], None)
+
+    def _add_record(self, book_id, user):
+        record = {"book_id": book_id, "user": user}
+        self._records[book_id] = record
+        self._by_user.setdefault(user, {})[book_id] = None
+        return record
+
+    def _remove_record(self, book_id):
+        record = self._records.pop(book_id)
+        held = self._by_user[record["user"]]
+        del held[book_id]
+        if not held:
+            del self._by_user[record["user"]]
+
+    def _delete(self, book_id):
+        book = self._books.pop(book_id)
+        author_ids = self._by_author.get(book.get("author"), {})
+        author_ids.pop(book_id, None)
+        if not author_ids:
+            self._by_author.pop(book.get("author"), None)
+        self._available.pop(book_id, None)
+        if book_id in self._records:
+            self._remove_record(book_id)
+        return book
+
+    def _state(self):
+        return {
+            "next_id": self._next_id,
+            "books": [dict(b) for b in self._books.values()],
+            "borrows": [dict(r) for r in self._records.values()],
+        }
+
+    def _commit(self, record):
+        """Journal `record`, then apply it; returns the lsn to wait for (None without a journal)"""
+        if self.journal is None:
+            self.apply(record)
+            return None
+        lsn = self.journal.append(record)
+        self.apply(record)
+        self.journal.applied(lsn, self._state)
+        return lsn
+
+    def _sync(self, lsn):
+        if lsn is not None:
+            self.journal.wait(lsn)
+
+    def apply(self, record):
+        """Apply one journal record to memory (no locking, no logging): recovery and every write"""
+        op = record["op"]
+        if op == "add_book":
+            self._insert(dict(record["book"]))
+        elif op == "delete_book":
+            self._delete(record["book_id"])
+        elif op == "borrow":
+            self._set_available(self._books[record["book_id"]], False)
+            self._add_record(record["book_id"], record["user"])
+        elif op == "return_book":
+            self._remove_record(record["book_id"])
+            self._set_available(self._books[record["book_id"]], True)
+        else:
+            raise ValueError(f"unknown journal op {op!r}")
+
+    # ---- reads ----
+
+    def get_book(self, book_id):
+        with self.lock.read():
+            book = self._books.get(book_id)
+            return dict(book) if book is not None else None
+
+    def list_books(self, author=None, available=None):
+        """All books (insertion order), optionally filtered through an index"""
+        with self.lock.read():
+            if author is not None:
+                ids = self._by_author.get(author, ())
+            elif available is True:
+                ids = self._available
+            else:
+                ids = self._books
+            books = (self._books[book_id] for book_id in ids)
+            if available is not None:
+                books = (b for b in books if b["available"] == available)
+            return [dict(b) for b in books]
+
+    def borrows_for(self, user):
+        with self.lock.read():
+            return [dict(self._records[book_id]) for book_id in self._by_user.get(user, ())]
+
+    def records(self):
+        with self.lock.read():
+            return [dict(r) for r in self._records.values()]
+
+    def __len__(self):
+        return len(self._books)
+
+    # ---- writes ----
+
+    def add_book(self, fields):
+        """Store a new book under a fresh id and return it"""
+        with self.lock.write():
+            book = {**fields, "id": self._next_id, "available": fields.get("available", True)}
+            lsn = self._commit({"op": "add_book", "book": book})
+        self._sync(lsn)
+        return dict(book)
+
+    def delete_book(self, book_id):
+        with self.lock.write():
+            if book_id not in self._books:
+                raise BookNotFound(book_id)
+            book = dict(self._books[book_id])
+            lsn = self._commit({"op": "delete_book", "book_id": book_id})
+        self._sync(lsn)
+        return book
+
+    def borrow(self, book_id, user):
+        """Mark the book borrowed by `user`; returns the book"""
+        with self.lock.write():
+            book = self._books.get(book_id)
+            if book is None:
+                raise BookNotFound(book_id)
+            if not book["available"]:
+                raise BookUnavailable(book_id)
+            lsn = self._commit({"op": "borrow", "book_id": book_id, "user": user})
+            result = dict(book)
+        self._sync(lsn)
+        return result
+
+    def return_book(self, book_id, user):
+        """Close `user`'s borrow of the book and make it available; returns the book"""
+        with self.lock.write():
+            book = self._books.get(book_id)
+            if book is None:
+                raise BookNotFound(book_id)
+            record = self._records.get(book_id)
+            if record is None or record["user"] != user:
+                raise RecordNotFound(book_id)
+            lsn = self._commit({"op": "return_book", "book_id": book_id, "user": user})
+            result = dict(book)
+        self._sync(lsn)
+        return result
@@ -1,32 +1,74 @@
 from flask import Flask, jsonify, request, url_for
-from data import books, borrow_records
+from data import store
+from store import BookNotFound, BookUnavailable, RecordNotFound
 from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)
 
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Links per book, built once per root URL as (prefix, suffix) around the id
+BOOK_LINKS = (("self", "get_book"), ("borrow", "borrow_book"), ("return", "return_book"))
+_ID_MARK = 987654321
+_link_templates = {}
+
+
+def book_link_templates():
+    """[(rel, prefix, suffix)] for the current root URL; url_for runs once per route, not per book"""
+    base = request.host_url + request.script_root  # behind a path prefix the links include SCRIPT_NAME
+    templates = _link_templates.get(base)
+    if templates is None:
+        templates = []
+        for rel, endpoint in BOOK_LINKS:
+            prefix, suffix = url_for(endpoint, book_id=_ID_MARK, _external=True).rsplit(str(_ID_MARK), 1)
+            templates.append((rel, prefix, suffix))
+        if len(_link_templates) >= 64:
+            _link_templates.clear()  # Host header is client-controlled: keep the cache bounded
+        _link_templates[base] = templates
+    return templates
+
+
+def with_links(books):
+    """Add `_links` to each book in place, in one pass"""
+    templates = book_link_templates()
+    for book in books:
+        book_id = str(book['id'])
+        book['_links'] = {rel: prefix + book_id + suffix for rel, prefix, suffix in templates}
+    return books
+
+
 @app.route('/api/books', methods=['GET'])
 def get_books():
-    result = []
-    for b in books:
-        book_repr = b.copy()
-        book_repr['_links'] = {
-            "self": url_for('get_book', book_id=b['id'], _external=True),
-            "borrow": url_for('borrow_book', book_id=b['id'], _external=True),
-            "return": url_for('return_book', book_id=b['id'], _external=True),
-        }
-        result.append(book_repr)
-    return jsonify(result), 200
+    # Không có limit/cursor: trả về toàn bộ danh sách như trước
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return jsonify(with_links(store.list_books())), 200
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        after_id = int(request.args.get('cursor') or 0)
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    if after_id < 0:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    books, next_cursor = store.page(after_id, limit)
+    links = {"self": url_for('get_books', limit=limit, cursor=after_id or None, _external=True)}
+    if next_cursor is not None:
+        links["next"] = url_for('get_books', limit=limit, cursor=next_cursor, _external=True)
+    return jsonify({"items": with_links(books), "_links": links}), 200
 
 
 @app.route('/api/books/<int:book_id>', methods=['GET'])
 def get_book(book_id):
-    book = next((b for b in books if b['id'] == book_id), None)
-    if not book:
+    book_detail = store.get_book(book_id)
+    if not book_detail:
         return jsonify({"error": "Book not found"}), 404
 
-    book_detail = book.copy()
     book_detail['_links'] = {
         "self": url_for('get_book', book_id=book_id, _external=True),
         "borrow": url_for('borrow_book', book_id=book_id, _external=True),
@@ -39,13 +81,11 @@ def get_book(book_id):
 @app.route('/api/books', methods=['POST'])
 def add_book():
     data = request.get_json()
-    new_book = {
-        "id": len(books) + 1,
+    new_book = store.add_book({
         "title": data.get("title"),
         "author": data.get("author"),
         "available": True
-    }
-    books.append(new_book)
+    })
 
     response = jsonify(new_book)
     response.status_code = 201
@@ -58,16 +98,13 @@ def borrow_book(book_id):
     data = request.get_json()
     user = data.get("user")
 
-    book = next((b for b in books if b['id'] == book_id), None)
-    if not book:
+    try:
+        book = store.borrow(book_id, user)
+    except BookNotFound:
         return jsonify({"error": "Book not found"}), 404
-
-    if not book['available']:
+    except BookUnavailable:
         return jsonify({"error": "Book already borrowed"}), 400
 
-    book['available'] = False
-    borrow_records.append({'book_id': book_id, 'user': user})
-
     response = {
         "message": f"{user} borrowed '{book['title']}' successfully",
         "book": book,
@@ -85,14 +122,11 @@ def return_book(book_id):
     data = request.get_json()
     user = data.get("user")
 
-    record = next((r for r in borrow_records if r['book_id'] == book_id and r['user'] == user), None)
-    if not record:
+    try:
+        book = store.return_book(book_id, user)
+    except (BookNotFound, RecordNotFound):
         return jsonify({"error": "No record found"}), 404
 
-    book = next((b for b in books if b['id'] == book_id), None)
-    book['available'] = True
-    borrow_records.remove(record)
-
     response = {
         "message": f"{user} returned '{book['title']}' successfully",
         "book": book,
@@ -108,15 +142,17 @@ def return_book(book_id):
 @app.route('/api/records', methods=['GET'])
 def get_records():
     enriched_records = []
-    for record in borrow_records:
-        book = next((b for b in books if b['id'] == record['book_id']), None)
+    prefix, suffix = next((p, s) for rel, p, s in book_link_templates() if rel == "self")
+    records_url = url_for('get_records', _external=True)
+    for record in store.records():
+        book = store.get_book(record['book_id'])
         if book:
             enriched_records.append({
                 **record,
                 "book_title": book["title"],
                 "_links": {
-                    "book": url_for('get_book', book_id=book['id'], _external=True),
-                    "self": url_for('get_records', _external=True)
+                    "book": prefix + str(book['id']) + suffix,
+                    "self": records_url
                 }
             })
     return jsonify(enriched_records), 200
@@ -0,0 +1,73 @@
+"""
+GET /api/books at N books: url_for per link vs precompiled link templates
+
+Times building the list body (links included) and the whole request
+through the test client, unpaged and one ?limit page. Run:
+
+    python bench_links.py --books 10000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Throwaway data directory, before `data` opens the store
+os.environ.setdefault("LIBRARY_DATA_DIR", tempfile.mkdtemp())
+os.environ.setdefault("LIBRARY_FSYNC", "0")
+
+from flask import url_for
+
+from app import app, with_links
+from data import store
+
+
+def links_with_url_for(books):
+    # What get_books did before: three url_for calls per book
+    result = []
+    for b in books:
+        book_repr = b.copy()
+        book_repr['_links'] = {
+            "self": url_for('get_book', book_id=b['id'], _external=True),
+            "borrow": url_for('borrow_book', book_id=b['id'], _external=True),
+            "return": url_for('return_book', book_id=b['id'], _external=True),
+        }
+        result.append(book_repr)
+    return result
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    for i in range(len(store), args.books):
+        store.add_book({"title": f"book-{i}", "author": f"author-{i % 100}", "available": True})
+
+    print(f"books={len(store):,} (median of {args.runs} runs)")
+    with app.test_request_context('/api/books'):
+        before = median_ms(lambda: links_with_url_for(store.list_books()), args.runs)
+        after = median_ms(lambda: with_links(store.list_books()), args.runs)
+        assert links_with_url_for(store.list_books()) == with_links(store.list_books())
+    print(f"  build list + links   url_for={before:8.1f} ms  templates={after:8.1f} ms  ({before / after:.1f}x)")
+
+    client = app.test_client()
+    full = median_ms(lambda: client.get('/api/books'), args.runs)
+    paged = median_ms(lambda: client.get(f'/api/books?limit={args.limit}&cursor={len(store) // 2}'), args.runs)
+    print(f"  GET /api/books       {full:8.1f} ms")
+    print(f"  GET ?limit={args.limit:<9} {paged:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
-books = [
+import os
+from persistence import open_store
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Khôi phục từ snapshot + journal trong LIBRARY_DATA_DIR; danh sách dưới đây chỉ dùng lần chạy đầu tiên
+store = open_store(os.environ.get("LIBRARY_DATA_DIR", os.path.join(SERVER_DIR, "var")), books=[
     {"id": 1, "title": "api-design-patterns", "author": "jj-geewax", "available": True},
     {"id": 2, "title": "building-an-api-product", "author": "bruno-pedro", "available": True},
     {"id": 3, "title": "principles-of-web-api-design", "author": "james-higginbotham", "available": True}
-]
-
-borrow_records = []
+])
@@ -0,0 +1,236 @@
+"""
+Write-ahead journal + snapshots for the in-memory LibraryStore
+
+Layout of the data directory:
+
+    snapshot.json                  full state as of journal record `lsn`
+    journal-<first lsn>.log        one JSON record per line, append-only
+
+Every write is appended to the current journal segment before it is
+applied to memory, and the request returns once it is on disk. Concurrent writers are group-committed: the
+first one to wait becomes the leader and fsyncs everything appended so far,
+the others find their record already durable and return without an fsync
+of their own.
+
+Every SNAPSHOT_EVERY records the journal switches to a new segment and the
+state at that point is copied (under the store's write lock) and written to
+snapshot.json by a background thread; segments the snapshot covers are then
+deleted. Boot loads the snapshot and replays only the segments after it, so
+recovery time depends on SNAPSHOT_EVERY, not on the length of history.
+Reads never touch the disk.
+
+One process per data directory. Settings (environment):
+
+    LIBRARY_DATA_DIR        data directory (default server/var)
+    LIBRARY_SNAPSHOT_EVERY  journal records between snapshots (default 10000)
+    LIBRARY_FSYNC           0 = leave flushing to the OS (faster, not crash-safe)
+"""
+import glob
+import json
+import os
+import threading
+
+from store import LibraryStore
+
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_PATTERN = "journal-*.log"
+
+SNAPSHOT_EVERY = int(os.environ.get("LIBRARY_SNAPSHOT_EVERY", 10000))
+FSYNC = os.environ.get("LIBRARY_FSYNC", "1").lower() not in ("0", "false", "no")
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _segment_start(path):
+    return int(os.path.basename(path)[len("journal-"):-len(".log")])
+
+
+def _segments(directory):
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)), key=_segment_start)
+
+
+def _fsync_dir(directory):
+    if os.name == "nt":
+        return  # directories cannot be opened for fsync on Windows
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    def __init__(self, directory, lsn=0, snapshot_lsn=0, snapshot_every=SNAPSHOT_EVERY, fsync=FSYNC):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.lsn = lsn                    # last record appended
+        self.snapshot_lsn = snapshot_lsn  # last record covered by snapshot.json
+        self._durable = lsn               # last record known to be on disk
+        self._syncing = False
+        self._snapshotting = False
+        self._cond = threading.Condition(threading.Lock())
+        self._file = None
+        self._switch_segment()
+
+    def _switch_segment(self):
+        # Caller holds self._cond (or is __init__)
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._durable = self.lsn
+        path = os.path.join(self.directory, f"journal-{self.lsn + 1:012d}.log")
+        self._file = open(path, "ab")
+
+    def append(self, record):
+        """
+        Append `record` (caller holds the store's write lock) and return its lsn
+
+        Nothing changes if this raises: the record is serialized before the
+        lsn is taken, so the store can leave its memory untouched.
+        """
+        with self._cond:
+            line = _dumps({**record, "lsn": self.lsn + 1}) + b"\n"
+            self._file.write(line)
+            self.lsn += 1
+            return self.lsn
+
+    def applied(self, lsn, state):
+        """
+        Record `lsn` is now in the store's memory (its write lock still held):
+        start a snapshot if one is due
+
+        `state` is called, still under that lock, only when a snapshot is due.
+        """
+        with self._cond:
+            due = (not self._snapshotting
+                   and self.snapshot_every > 0
+                   and lsn - self.snapshot_lsn >= self.snapshot_every)
+            if due:
+                while self._syncing:
+                    self._cond.wait()  # never close a segment a leader is fsyncing
+                self._snapshotting = True
+                self._switch_segment()
+        if due:
+            threading.Thread(target=self._write_snapshot, args=(state(), lsn),
+                             name="library-snapshot", daemon=True).start()
+
+    def wait(self, lsn):
+        """Block until record `lsn` is on disk (group commit)"""
+        with self._cond:
+            while self._durable < lsn:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                # Leader: make everything appended so far durable in one go
+                self._syncing = True
+                target = self.lsn
+                self._file.flush()
+                fd = self._file.fileno()
+                self._cond.release()
+                try:
+                    if self.fsync:
+                        os.fsync(fd)
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._durable = max(self._durable, target)
+
+    def snapshot(self, state, lsn):
+        """Write `state` (as of `lsn`) now, in the calling thread"""
+        with self._cond:
+            self._snapshotting = True
+        self._write_snapshot(state, lsn)
+
+    def _write_snapshot(self, state, lsn):
+        try:
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            with open(path + ".tmp", "wb") as f:
+                f.write(_dumps({**state, "lsn": lsn}))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            if self.fsync:
+                _fsync_dir(self.directory)
+            # Everything up to `lsn` is in the snapshot now
+            for segment in _segments(self.directory):
+                if _segment_start(segment) <= lsn:
+                    os.remove(segment)
+            with self._cond:
+                self.snapshot_lsn = max(self.snapshot_lsn, lsn)
+        finally:
+            with self._cond:
+                self._snapshotting = False
+
+    def close(self):
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def recover(directory):
+    """
+    Rebuild state from the snapshot plus the journal records after it
+
+    Returns:
+        (snapshot dict or None, records to redo, last lsn)
+    """
+    snapshot = None
+    try:
+        with open(os.path.join(directory, SNAPSHOT_FILE), "rb") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        pass
+
+    lsn = snapshot["lsn"] if snapshot else 0
+    records = []
+    for segment in _segments(directory):
+        with open(segment, "r+b") as f:
+            valid = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write at crash time: it never committed, and new
+                    # records may be appended to this file, so cut it off
+                    f.truncate(valid)
+                    break
+                valid += len(line)
+                if record["lsn"] > lsn:
+                    records.append(record)
+                    lsn = record["lsn"]
+    return snapshot, records, lsn
+
+
+def open_store(directory, books=(), borrows=(), snapshot_every=SNAPSHOT_EVERY, fsync=FSYNC):
+    """
+    LibraryStore recovered from `directory`, journaling from now on
+
+    `books`/`borrows` seed a brand-new directory; afterwards the directory
+    is the source of truth.
+    """
+    os.makedirs(directory, exist_ok=True)
+    snapshot, records, lsn = recover(directory)
+    if snapshot:
+        store = LibraryStore(snapshot["books"], snapshot["borrows"], next_id=snapshot["next_id"])
+    else:
+        store = LibraryStore(books, borrows)
+    for record in records:
+        store.apply(record)
+
+    snapshot_lsn = snapshot["lsn"] if snapshot else 0
+    store.journal = Journal(directory, lsn, snapshot_lsn, snapshot_every, fsync)
+    if snapshot is None or records:
+        # Fold the replayed tail (or the seed) into a snapshot: next boot starts there
+        store.journal.snapshot(store._state(), lsn)
+    return store
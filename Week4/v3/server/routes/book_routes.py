@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from utils.jwt_helper import verify_token
-from database import books
+from database import store
 
 book_bp = Blueprint("books", __name__)
 
@@ -15,7 +15,7 @@ def get_books():
     user = get_user_from_header()
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
-    return jsonify(books), 200
+    return jsonify(store.list_books()), 200
 
 
 # ==== Lấy thông tin 1 sách ====
@@ -25,8 +25,8 @@ def get_book(book_id):
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    for book in books:
-        if book["id"] == book_id:
-            return jsonify(book), 200
+    book = store.get_book(book_id)
+    if book:
+        return jsonify(book), 200
 
     return jsonify({"message": "Book not found"}), 404
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from utils.jwt_helper import verify_token
-from database import books, borrows
+from database import store
+from store import BookNotFound, BookUnavailable, RecordNotFound
 
 borrow_bp = Blueprint("borrow", __name__)
 
@@ -16,15 +17,14 @@ def borrow_book(book_id):
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    for book in books:
-        if book["id"] == book_id:
-            if not book["available"]:
-                return jsonify({"message": "Book not available"}), 400
-            book["available"] = False
-            borrows.append({"user": user, "book_id": book_id})
-            return jsonify({"message": f"{user} borrowed {book['title']}"}), 200
+    try:
+        book = store.borrow(book_id, user)
+    except BookNotFound:
+        return jsonify({"message": "Book not found"}), 404
+    except BookUnavailable:
+        return jsonify({"message": "Book not available"}), 400
 
-    return jsonify({"message": "Book not found"}), 404
+    return jsonify({"message": f"{user} borrowed {book['title']}"}), 200
 
 
 # ==== Trả sách ====
@@ -34,10 +34,11 @@ def return_book(book_id):
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    for book in books:
-        if book["id"] == book_id:
-            book["available"] = True
-            borrows[:] = [b for b in borrows if not (b["book_id"] == book_id and b["user"] == user)]
-            return jsonify({"message": f"{user} returned {book['title']}"}), 200
+    try:
+        book = store.return_book(book_id, user)
+    except BookNotFound:
+        return jsonify({"message": "Book not found"}), 404
+    except RecordNotFound:
+        return jsonify({"message": "You have not borrowed this book"}), 404
 
-    return jsonify({"message": "Book not found"}), 404
+    return jsonify({"message": f"{user} returned {book['title']}"}), 200
@@ -0,0 +1,88 @@
+"""
+Journal write throughput and recovery time
+
+Write throughput: borrow + return pairs from 1 and N threads with fsync on
+(N threads share fsyncs through group commit) and with LIBRARY_FSYNC=0.
+Recovery: boot time after H journal records, journal only vs snapshots
+every --snapshot-every records. Run:
+
+    python bench_persistence.py --books 100000 --history 200000
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from persistence import open_store
+
+
+def make_books(n):
+    return [{"id": i, "title": f"book-{i}", "author": f"author-{i % 1000}", "available": True}
+            for i in range(1, n + 1)]
+
+
+def writes(store, threads, pairs):
+    def worker(offset):
+        for i in range(pairs):
+            book_id = offset * pairs + i + 1
+            store.borrow(book_id, f"user-{offset}")
+            store.return_book(book_id, f"user-{offset}")
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return threads * pairs * 2 / (time.perf_counter() - started)
+
+
+def bench_writes(books, threads, pairs):
+    print(f"writes ({pairs} borrow+return pairs per thread)")
+    for fsync in (True, False):
+        for n in (1, threads):
+            directory = tempfile.mkdtemp()
+            store = open_store(directory, books, fsync=fsync, snapshot_every=0)
+            rate = writes(store, n, pairs)
+            store.journal.close()
+            shutil.rmtree(directory)
+            print(f"  fsync={'on ' if fsync else 'off'} threads={n:<3} {rate:12,.0f} writes/s")
+
+
+def bench_recovery(books, history, snapshot_every):
+    print(f"recovery after {history:,} journal records")
+    for label, every in (("journal only", 0), (f"snapshot every {snapshot_every:,}", snapshot_every)):
+        directory = tempfile.mkdtemp()
+        store = open_store(directory, books, fsync=False, snapshot_every=every)
+        for i in range(history // 2):
+            book_id = i % len(books) + 1
+            store.borrow(book_id, "bench")
+            store.return_book(book_id, "bench")
+        time.sleep(0.5)  # let the last background snapshot land
+        store.journal.close()
+
+        started = time.perf_counter()
+        recovered = open_store(directory, books, fsync=False, snapshot_every=every)
+        elapsed = time.perf_counter() - started
+        recovered.journal.close()
+        shutil.rmtree(directory)
+        print(f"  {label:<26} boot {elapsed * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pairs', type=int, default=200, help="borrow+return pairs per writer thread")
+    parser.add_argument('--history', type=int, default=200_000)
+    parser.add_argument('--snapshot-every', type=int, default=10_000)
+    args = parser.parse_args()
+
+    books = make_books(args.books)
+    bench_writes(books, args.threads, args.pairs)
+    bench_recovery(books, args.history, args.snapshot_every)
+
+
+if __name__ == '__main__':
+    main()
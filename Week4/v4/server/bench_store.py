@@ -0,0 +1,133 @@
+"""
+List-of-dicts scans vs LibraryStore indexes
+
+Times the operations the routes perform against a catalogue of N books:
+lookup by id, borrow + return, one user's borrows, books by author, then
+a threaded read/write mix through the readers-writer lock. Run:
+
+    python bench_store.py --books 100000
+"""
+import argparse
+import random
+import threading
+import time
+
+from store import BookUnavailable, LibraryStore
+
+
+def make_books(n):
+    return [{"id": i, "title": f"book-{i}", "author": f"author-{i % 1000}", "available": True}
+            for i in range(1, n + 1)]
+
+
+def timed(label, ops, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed * 1e6 / ops:10.2f} us/op")
+
+
+def bench_list(books, borrows, ids, users):
+    def lookup():
+        for book_id in ids:
+            next(b for b in books if b["id"] == book_id)
+
+    def borrow_return():
+        for book_id, user in zip(ids, users):
+            book = next(b for b in books if b["id"] == book_id)
+            book["available"] = False
+            borrows.append({"user": user, "book_id": book_id})
+            book["available"] = True
+            borrows[:] = [b for b in borrows if not (b["book_id"] == book_id and b["user"] == user)]
+
+    def user_borrows():
+        for user in users:
+            [b for b in borrows if b["user"] == user]
+
+    def by_author():
+        for book_id in ids:
+            [b for b in books if b["author"] == f"author-{book_id % 1000}"]
+
+    return lookup, borrow_return, user_borrows, by_author
+
+
+def bench_store(store, ids, users):
+    def lookup():
+        for book_id in ids:
+            store.get_book(book_id)
+
+    def borrow_return():
+        for book_id, user in zip(ids, users):
+            store.borrow(book_id, user)
+            store.return_book(book_id, user)
+
+    def user_borrows():
+        for user in users:
+            store.borrows_for(user)
+
+    def by_author():
+        for book_id in ids:
+            store.list_books(author=f"author-{book_id % 1000}")
+
+    return lookup, borrow_return, user_borrows, by_author
+
+
+def mixed(store, n, threads, ops, write_ratio):
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            book_id = rng.randint(1, n)
+            if rng.random() < write_ratio:
+                try:
+                    store.borrow(book_id, f"user-{seed}")
+                    store.return_book(book_id, f"user-{seed}")
+                except BookUnavailable:
+                    pass  # held by another thread or an open borrow
+            else:
+                store.get_book(book_id)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    print(f"  {threads} threads x {ops} ops ({write_ratio:.0%} writes): "
+          f"{threads * ops / elapsed:,.0f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--ops', type=int, default=200, help="operations per scan-based measurement")
+    parser.add_argument('--borrows', type=int, default=10_000, help="open borrows while measuring")
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    books = make_books(args.books)
+    open_borrows = [{"user": f"user-{i % 500}", "book_id": i} for i in range(1, args.borrows + 1)]
+    for record in open_borrows:
+        books[record["book_id"] - 1]["available"] = False
+    # Measure on books nobody holds, so borrow + return always succeeds
+    ids = [rng.randint(args.borrows + 1, args.books) for _ in range(args.ops)]
+    users = [f"user-{rng.randrange(500)}" for _ in range(args.ops)]
+    store = LibraryStore(books=books, borrows=open_borrows)
+
+    labels = ("get book by id", "borrow + return", "borrows of one user", "books by author")
+    print(f"books={args.books:,} open borrows={args.borrows:,}")
+    print("list scan")
+    for label, fn in zip(labels, bench_list(books, list(open_borrows), ids, users)):
+        timed(label, args.ops, fn)
+    print("LibraryStore")
+    for label, fn in zip(labels, bench_store(store, ids, users)):
+        timed(label, args.ops, fn)
+
+    print("LibraryStore, threaded")
+    for write_ratio in (0.0, 0.1, 0.5):
+        mixed(store, args.books, args.threads, 20_000, write_ratio)
+
+
+if __name__ == '__main__':
+    main()
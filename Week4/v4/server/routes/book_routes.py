@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from utils.jwt_helper import verify_token
 from utils.cache_helper import cache_response
-from database import books
+from database import store
 
 book_bp = Blueprint("books_v4", __name__)
 
@@ -15,7 +15,7 @@ def get_books():
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
     
-    return cache_response(books, max_age=120)
+    return cache_response(store.list_books(), max_age=120)
 
 @book_bp.route("/<int:book_id>", methods=["GET"])
 def get_book(book_id):
@@ -23,7 +23,7 @@ def get_book(book_id):
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    for book in books:
-        if book["id"] == book_id:
-            return cache_response(book, max_age=300)
+    book = store.get_book(book_id)
+    if book:
+        return cache_response(book, max_age=300)
     return jsonify({"message": "Book not found"}), 404
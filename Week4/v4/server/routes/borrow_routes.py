@@ -1,7 +1,8 @@
 from flask import Blueprint, jsonify, request
 from utils.jwt_helper import verify_token
-from utils.cache_helper import cache_response
-from database import books, borrows
+from utils.cache_helper import private_response, response_memo
+from database import store
+from store import BookNotFound, BookUnavailable, RecordNotFound
 
 borrow_bp = Blueprint("borrow_v4", __name__)
 
@@ -15,8 +16,8 @@ def get_borrowed_books():
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    user_borrows = [b for b in borrows if b["user"] == user]
-    return cache_response(user_borrows, max_age=60)
+    # Dữ liệu riêng của từng user: private + Vary: Authorization, không để proxy dùng chung
+    return private_response(user, "borrows", lambda: store.borrows_for(user), max_age=60)
 
 @borrow_bp.route("/books/<int:book_id>/borrow/", methods=["POST"])
 def borrow_book(book_id):
@@ -24,16 +25,15 @@ def borrow_book(book_id):
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    for book in books:
-        if book["id"] == book_id:
-            if not book["available"]:
-                return jsonify({"message": "Book not available"}), 400
+    try:
+        book = store.borrow(book_id, user)
+    except BookNotFound:
+        return jsonify({"message": "Book not found"}), 404
+    except BookUnavailable:
+        return jsonify({"message": "Book not available"}), 400
 
-            book["available"] = False
-            borrows.append({"user": user, "book_id": book_id})
-            return jsonify({"message": f"{user} borrowed '{book['title']}'"}), 200
-
-    return jsonify({"message": "Book not found"}), 404
+    response_memo.invalidate(user)
+    return jsonify({"message": f"{user} borrowed '{book['title']}'"}), 200
 
 @borrow_bp.route("/books/<int:book_id>/return/", methods=["POST"])
 def return_book(book_id):
@@ -41,10 +41,12 @@ def return_book(book_id):
     if not user:
         return jsonify({"message": "Unauthorized"}), 401
 
-    for book in books:
-        if book["id"] == book_id:
-            book["available"] = True
-            borrows[:] = [b for b in borrows if not (b["book_id"] == book_id and b["user"] == user)]
-            return jsonify({"message": f"{user} returned '{book['title']}'"}), 200
+    try:
+        book = store.return_book(book_id, user)
+    except BookNotFound:
+        return jsonify({"message": "Book not found"}), 404
+    except RecordNotFound:
+        return jsonify({"message": "You have not borrowed this book"}), 404
 
-    return jsonify({"message": "Book not found"}), 404
+    response_memo.invalidate(user)
+    return jsonify({"message": f"{user} returned '{book['title']}'"}), 200
@@ -0,0 +1,39 @@
+import pytest
+
+from persistence import open_store
+
+BOOKS = [
+    {"id": 1, "title": "Dune", "author": "Frank Herbert", "available": True},
+    {"id": 2, "title": "Emma", "author": "Jane Austen", "available": False},
+]
+BORROWS = [{"book_id": 2, "user": "alice"}]
+
+
+def test_failed_append_leaves_store_unchanged(tmp_path, monkeypatch):
+    store = open_store(str(tmp_path), BOOKS, BORROWS, snapshot_every=0, fsync=False)
+    before = store._state()
+
+    def disk_full(record):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(store.journal, "append", disk_full)
+    for write in (lambda: store.add_book({"title": "Ulysses"}),
+                  lambda: store.delete_book(1),
+                  lambda: store.borrow(1, "bob"),
+                  lambda: store.return_book(2, "alice")):
+        with pytest.raises(OSError):
+            write()
+        assert store._state() == before
+    monkeypatch.undo()
+
+    # A record that cannot be serialized fails the same way
+    with pytest.raises(TypeError):
+        store.add_book({"title": object()})
+    assert store._state() == before
+
+    assert store.add_book({"title": "Ulysses"})["id"] == 3
+    store.borrow(1, "bob")
+    store.journal.close()
+    recovered = open_store(str(tmp_path), snapshot_every=0, fsync=False)
+    assert recovered._state() == store._state()
+    recovered.journal.close()
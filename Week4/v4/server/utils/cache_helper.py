@@ -1,7 +1,100 @@
-from flask import make_response, jsonify
+"""
+HTTP caching for the v4 API
+
+- cache_response: catalogue data, the same for every caller ->
+  `Cache-Control: public` (explicitly allows shared caches to store a
+  response to an Authorization request) + ETag
+- private_response: data that depends on who is asking ->
+  `Cache-Control: private` + `Vary: Authorization` + ETag, so only the
+  user's own browser may keep it
+
+Both answer a matching If-None-Match with 304.
+
+private_response also memoizes the serialized body in-process, keyed by
+(user, route, version). Routes that change a user's data (borrow, return)
+call `response_memo.invalidate(user)`, which bumps the user's version: a
+body computed concurrently under the old version is never served again.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, jsonify, make_response, request
+
+
+def _etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
 
 def cache_response(data, max_age=60):
     resp = make_response(jsonify(data))
     resp.headers["Cache-Control"] = f"public, max-age={max_age}"
     resp.headers["Content-Type"] = "application/json"
-    return resp
+    resp.set_etag(_etag(resp.get_data()))
+    return resp.make_conditional(request)
+
+
+class UserResponseMemo:
+    """LRU of serialized user-scoped responses, (user, route, version) -> (body, etag)"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, user):
+        with self._lock:
+            return self._versions.get(user, 0)
+
+    def get(self, user, route, version):
+        with self._lock:
+            entry = self._entries.get((user, route, version))
+            if entry is not None:
+                self._entries.move_to_end((user, route, version))
+            return entry
+
+    def put(self, user, route, version, body, etag):
+        with self._lock:
+            if version != self._versions.get(user, 0):
+                return  # invalidated while it was being built
+            self._entries[(user, route, version)] = (body, etag)
+            self._entries.move_to_end((user, route, version))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user):
+        """The user's data changed: drop their entries and start a new version"""
+        with self._lock:
+            self._versions[user] = self._versions.get(user, 0) + 1
+            for key in [key for key in self._entries if key[0] == user]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+response_memo = UserResponseMemo()
+
+
+def private_response(user, route, build, max_age=60):
+    """
+    Serve `build()` (JSON-able, specific to `user`) from the memo or build it
+
+    `route` names the resource within the user's data, e.g. "borrows".
+    """
+    version = response_memo.version(user)
+    entry = response_memo.get(user, route, version)
+    if entry is None:
+        body = jsonify(build()).get_data()
+        entry = (body, _etag(body))
+        response_memo.put(user, route, version, *entry)
+
+    body, etag = entry
+    resp = Response(body, mimetype="application/json")
+    resp.headers["Cache-Control"] = f"private, max-age={max_age}"
+    resp.headers["Vary"] = "Authorization"
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
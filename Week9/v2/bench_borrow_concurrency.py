@@ -0,0 +1,101 @@
+"""
+Concurrency benchmark for the borrow path
+
+N threads start together (Barrier) and all try to borrow the same book.
+Exactly one must win; everyone else must get 409. Run:
+
+    python bench_borrow_concurrency.py --threads 32 --rounds 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), 'bench_borrow.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file}')
+
+from app import app, db  # noqa: E402
+from models import Book, User  # noqa: E402
+from utils.jwt_helper import create_access_token  # noqa: E402
+
+
+def seed(num_users):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([User(name=f"Bench {i}", email=f"bench{i}@example.com", password_hash="x")
+                            for i in range(num_users)])
+        db.session.add(Book(title="Hot book", author="Bench", category="Bench"))
+        db.session.commit()
+        return create_access_token('1')
+
+
+def run_round(threads, token):
+    """One burst: every thread borrows book 1, then the winner returns it"""
+    barrier = threading.Barrier(threads)
+    results = []
+    lock = threading.Lock()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def worker(user_id):
+        client = app.test_client()
+        barrier.wait()
+        started = time.perf_counter()
+        response = client.post('/api/v1/borrows', json={"user_id": user_id, "book_id": 1}, headers=headers)
+        elapsed = time.perf_counter() - started
+        body = response.get_json() or {}
+        with lock:
+            results.append((response.status_code, elapsed, body))
+
+    workers = [threading.Thread(target=worker, args=(i + 1,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    winners = [body for status, _, body in results if status == 201]
+    for body in winners:
+        app.test_client().put(f'/api/v1/borrows/{body["id"]}/return')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    token = seed(args.threads)
+    statuses = {}
+    latencies = []
+    double_borrows = 0
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        results = run_round(args.threads, token)
+        wins = sum(1 for status, _, _ in results if status == 201)
+        if wins > 1:
+            double_borrows += 1
+        for status, elapsed, body in results:
+            key = status
+            if status == 500 and 'locked' in body.get('error', ''):
+                key = '500 (database is locked)'
+            statuses[key] = statuses.get(key, 0) + 1
+            latencies.append(elapsed * 1000)
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"threads={args.threads} rounds={args.rounds} requests={len(latencies)} in {total:.2f}s")
+    for status, count in sorted(statuses.items(), key=lambda item: str(item[0])):
+        print(f"  {status}: {count}")
+    print(f"  latency ms: p50={statistics.median(latencies):.1f} "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}")
+    print(f"  rounds with more than one winner: {double_borrows}")
+    return 1 if double_borrows else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Login storm benchmark: inline hashing vs the hashing process pool
+
+Many threads log in continuously while one thread keeps reading a book, so
+the report shows both login throughput and how much the storm slows down
+an unrelated endpoint. Run:
+
+    python bench_login_throughput.py --threads 16 --seconds 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file}')
+
+from app import app, db  # noqa: E402
+from models import Book, User  # noqa: E402
+from utils.password_hashing import password_hasher  # noqa: E402
+
+
+def seed(num_users):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        password_hasher.configure(workers=0)
+        template = User(name="x", email="x")
+        template.set_password("secret")
+        db.session.add_all([User(name=f"Bench {i}", email=f"bench{i}@example.com",
+                                 password_hash=template.password_hash) for i in range(num_users)])
+        db.session.add(Book(title="Probe"))
+        db.session.commit()
+
+
+def run(label, workers, args):
+    password_hasher.configure(workers=workers, queue_depth=args.queue)
+    stop = threading.Event()
+    lock = threading.Lock()
+    statuses = {}
+    probe_latencies = []
+
+    def login_loop(i):
+        client = app.test_client()
+        body = {"email": f"bench{i % args.users}@example.com", "password": "secret"}
+        while not stop.is_set():
+            status = client.post('/api/v1/auth/login', json=body).status_code
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    def probe_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/v1/books/1')
+            probe_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(args.threads)]
+    threads.append(threading.Thread(target=probe_loop))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    password_hasher.shutdown()
+
+    ok = statuses.get(200, 0)
+    probe_latencies.sort()
+    print(f"{label:<7} logins/s={ok / args.seconds:>7.1f}  503s={statuses.get(503, 0):>5}  "
+          f"probe p50={statistics.median(probe_latencies):.1f}ms "
+          f"p95={probe_latencies[int(len(probe_latencies) * 0.95) - 1]:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queue', type=int, default=64)
+    args = parser.parse_args()
+
+    seed(args.users)
+    print(f"method={password_hasher.method} threads={args.threads} seconds={args.seconds} "
+          f"workers={args.workers} queue={args.queue}")
+    run("inline", 0, args)
+    run("pool", args.workers, args)
+
+
+if __name__ == '__main__':
+    main()
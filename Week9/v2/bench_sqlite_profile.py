@@ -0,0 +1,95 @@
+"""
+Mixed read/write throughput: stock SQLite settings vs the engine profile
+
+Readers page through available books while writers flip availability, on a
+fresh file database per profile. Run:
+
+    python bench_sqlite_profile.py --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from database import engine_options, install_pragmas, sqlite_pragmas
+
+READ_SQL = text("SELECT id, title FROM book WHERE is_available = 1 ORDER BY title LIMIT 20 OFFSET :offset")
+WRITE_SQL = text("UPDATE book SET is_available = NOT is_available WHERE id = :id")
+
+
+def make_engine(path, pragmas):
+    engine = create_engine(f"sqlite:///{path}", **engine_options(f"sqlite:///{path}"))
+    install_pragmas(engine, pragmas)
+    return engine
+
+
+def seed(engine, num_books):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE book (id INTEGER PRIMARY KEY, title TEXT, is_available BOOLEAN)"))
+        connection.execute(text("CREATE INDEX ix_book_available_title ON book (is_available, title)"))
+        connection.execute(text("INSERT INTO book (title, is_available) VALUES (:title, 1)"),
+                           [{"title": f"Book {i:06d}"} for i in range(num_books)])
+
+
+def run_profile(name, pragmas, args):
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    engine = make_engine(path, pragmas)
+    seed(engine, args.books)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    totals = {"reads": 0, "writes": 0, "locked": 0}
+
+    def loop(kind):
+        rng = random.Random()
+        done = locked = 0
+        while not stop.is_set():
+            try:
+                if kind == "reads":
+                    with engine.connect() as connection:
+                        connection.execute(READ_SQL, {"offset": rng.randrange(0, args.books // 2)}).all()
+                else:
+                    with engine.begin() as connection:
+                        connection.execute(WRITE_SQL, {"id": rng.randrange(1, args.books + 1)})
+                done += 1
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                locked += 1
+        with lock:
+            totals[kind] += done
+            totals["locked"] += locked
+
+    threads = ([threading.Thread(target=loop, args=("reads",)) for _ in range(args.readers)]
+               + [threading.Thread(target=loop, args=("writes",)) for _ in range(args.writers)])
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    print(f"{name:<8} reads/s={totals['reads'] / args.seconds:>9.0f}  "
+          f"writes/s={totals['writes'] / args.seconds:>8.0f}  locked errors={totals['locked']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--books', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"readers={args.readers} writers={args.writers} seconds={args.seconds} books={args.books}")
+    # Stock: rollback journal, FULL sync, only the driver's 5 s lock timeout
+    run_profile("stock", {}, args)
+    run_profile("profile", sqlite_pragmas(), args)
+
+
+if __name__ == '__main__':
+    main()
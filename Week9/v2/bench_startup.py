@@ -0,0 +1,62 @@
+"""
+Cold start: import + first /apispec.json request, live flasgger vs the artifact
+
+Each sample is a fresh interpreter, as a newly forked/booted worker would
+be. Run:
+
+    python bench_startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/apispec.json', headers={'Accept-Encoding': 'gzip'})
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(imported - started, done - imported)
+"""
+
+
+def sample(env):
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    import_s, request_s = map(float, result.stdout.split())
+    return import_s * 1000, request_s * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    artifact = os.path.join(tempfile.mkdtemp(), 'apispec.json')
+    base = {**os.environ, 'DATABASE_URL': 'sqlite://'}
+    modes = [
+        ("live (flasgger)", {**base, 'APIDOC_LIVE': '1'}),
+        ("precompiled", {**base, 'APIDOC_LIVE': '0', 'APIDOC_PATH': artifact}),
+    ]
+    # Build the artifact once, as the deploy step would
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'apispec-build'],
+                   cwd=ROOT, env=modes[1][1], check=True, capture_output=True)
+
+    print(f"runs={args.runs} (median ms)")
+    for label, env in modes:
+        samples = [sample(env) for _ in range(args.runs)]
+        import_ms = statistics.median(s[0] for s in samples)
+        request_ms = statistics.median(s[1] for s in samples)
+        print(f"  {label:<16} import={import_ms:7.1f}  first /apispec.json={request_ms:7.1f}  "
+              f"total={import_ms + request_ms:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-request cost of JWT verification with and without the token cache
+
+Times protected requests (`POST /api/v2/payments/book`, `POST /api/v1/borrows`)
+with a fresh decode every time vs the verified-token cache. Run:
+
+    python bench_token_cache.py --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+_db_file = os.path.join(tempfile.mkdtemp(), 'bench_token.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file}')
+
+from app import app, db  # noqa: E402
+from models import Book, User  # noqa: E402
+from utils.jwt_helper import create_access_token  # noqa: E402
+from utils.token_cache import TokenCache  # noqa: E402
+
+ENDPOINTS = [
+    ('/api/v2/payments/book', {"book_id": "1", "amount": 1.5, "currency": "USD", "payment_method": "card"}),
+    ('/api/v1/borrows', {"user_id": 1, "book_id": 1}),
+]
+
+
+def seed():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(name="Bench", email="bench@example.com", password_hash="x"))
+        db.session.add(Book(title="Bench"))
+        db.session.commit()
+        return create_access_token('1')
+
+
+def time_requests(path, body, headers, n):
+    client = app.test_client()
+    client.post(path, json=body, headers=headers)  # warm-up
+    started = time.perf_counter()
+    for _ in range(n):
+        client.post(path, json=body, headers=headers)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    token = seed()
+    headers = {"Authorization": f"Bearer {token}"}
+    secret = app.config['JWT_SECRET_KEY']
+
+    uncached = TokenCache(max_entries=0)
+    token_cache = app.extensions['token_cache']
+    token_cache.decode(token, secret)
+    print("decode only (µs/call):")
+    print(f"  uncached {timeit.timeit(lambda: uncached.decode(token, secret), number=args.requests) / args.requests * 1e6:8.1f}")
+    print(f"  cached   {timeit.timeit(lambda: token_cache.decode(token, secret), number=args.requests) / args.requests * 1e6:8.1f}")
+
+    print("full request (µs/request):")
+    for path, body in ENDPOINTS:
+        app.extensions['token_cache'] = uncached
+        before = time_requests(path, body, headers, args.requests)
+        app.extensions['token_cache'] = token_cache
+        after = time_requests(path, body, headers, args.requests)
+        print(f"  POST {path:<24} uncached={before:8.1f} cached={after:8.1f} saved={before - after:7.1f}")
+
+    print(f"token cache stats: {token_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
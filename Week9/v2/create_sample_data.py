@@ -6,6 +6,7 @@ Script to create sample data for the library management system
 from app import app
 from database import db
 from models import Book, User, BorrowRecord
+from utils import facets
 from datetime import datetime
 
 def create_sample_data():
@@ -75,6 +76,8 @@ def create_sample_data():
             if book:
                 book.is_available = False
         
+        # Recompute the facet counts table from the seeded books
+        facets.rebuild(db.session)
         db.session.commit()
 
 if __name__ == "__main__":
@@ -1,3 +1,111 @@
+"""
+Database handle and the SQLite engine profile
+
+Every new SQLite connection gets the pragmas below (WAL so readers don't
+block the writer, a busy timeout instead of instant "database is locked",
+mmap/page cache sizing). Everything can be overridden from the environment:
+
+    DATABASE_URL            sqlite:///library.db
+    SQLITE_JOURNAL_MODE     WAL
+    SQLITE_SYNCHRONOUS      NORMAL
+    SQLITE_BUSY_TIMEOUT     5000        (ms)
+    SQLITE_MMAP_SIZE        268435456   (bytes)
+    SQLITE_CACHE_SIZE       -65536      (negative = KiB)
+    SQLITE_TEMP_STORE       MEMORY
+    DB_POOL_SIZE            5
+    DB_MAX_OVERFLOW         10
+    DB_POOL_TIMEOUT         30          (s)
+    DB_POOL_RECYCLE         -1          (s, -1 = never)
+"""
+import os
+import re
+from typing import Any, Dict, Mapping, Optional
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
+
+DEFAULT_DATABASE_URI = 'sqlite:///library.db'
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+DEFAULT_POOL = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': -1,
+}
+
+# Pragma values are interpolated into SQL, so only plain words/numbers pass
+_PRAGMA_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+
+def _is_memory(uri: str) -> bool:
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def sqlite_pragmas(environ: Mapping[str, str] = os.environ) -> Dict[str, Any]:
+    """
+    DEFAULT_PRAGMAS overridden by SQLITE_<PRAGMA> environment variables
+
+    Raises:
+        ValueError: if a value is not a plain word or integer
+    """
+    pragmas = dict(DEFAULT_PRAGMAS)
+    for name in DEFAULT_PRAGMAS:
+        value = environ.get(f'SQLITE_{name.upper()}')
+        if value is not None:
+            pragmas[name] = value
+    for name, value in pragmas.items():
+        if not _PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"Invalid value for SQLite pragma {name}: {value!r}")
+    return pragmas
+
+
+def engine_options(uri: str, environ: Mapping[str, str] = os.environ) -> Dict[str, Any]:
+    """
+    Pool sizing for SQLALCHEMY_ENGINE_OPTIONS
+
+    In-memory databases keep Flask-SQLAlchemy's single shared connection,
+    so no pool options are returned for them.
+    """
+    if _is_memory(uri):
+        return {}
+    options = {}
+    for name, default in DEFAULT_POOL.items():
+        options[name] = int(environ.get(f'DB_{name.upper()}', default))
+    return options
+
+
+def install_pragmas(engine, pragmas: Dict[str, Any]) -> None:
+    """Run `PRAGMA name=value` on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def init_db(app, environ: Optional[Mapping[str, str]] = None) -> None:
+    """Configure the URI, pool and pragmas from the environment, then bind `db`"""
+    environ = os.environ if environ is None else environ
+    uri = app.config.setdefault('SQLALCHEMY_DATABASE_URI', environ.get('DATABASE_URL', DEFAULT_DATABASE_URI))
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(uri, environ))
+    app.config.setdefault('SQLITE_PRAGMAS', sqlite_pragmas(environ))
+
+    db.init_app(app)
+    with app.app_context():
+        install_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
@@ -0,0 +1,80 @@
+"""
+App factory: configuration, blueprints and extensions
+
+Importing this module builds nothing; app.py holds the default instance and
+serve.py builds its own, so a prefork master preloads exactly one app.
+"""
+from flask import Flask
+from database import db, init_db
+from routes.books import books_bp
+from routes.users import users_bp
+from routes.borrows import borrows_bp
+from routes.demo_pagination import demo_bp
+from routes.auth import auth_bp
+from routes.payments import payment_bp
+from utils import fulltext, migrations, apidoc, response_cache, count_cache, token_cache
+
+DEFAULT_CONFIG = {
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'JWT_SECRET_KEY': 'abc!@#123',
+}
+
+swagger_config = {
+    "headers": [],
+    "specs": [
+        {
+            "endpoint": 'apispec',
+            "route": '/apispec.json',
+            "rule_filter": lambda rule: True,  # tất cả endpoint
+            "model_filter": lambda tag: True,  # tất cả model
+        }
+    ],
+    "static_url_path": "/flasgger_static",
+    "swagger_ui": True,
+    "specs_route": "/api/docs/"
+}
+
+swagger_template = {
+    "swagger": "2.0",
+    "info": {
+        "title": "Library Management API",
+        "description": "RESTful API for library system. <br><br>"
+                       "**⚠️ Deprecation Notice**: ` API version v1 : /api/v1/payments/book` is deprecated. <br><br>"
+                       "Please migrate to the new version v2: `/api/v2/payments/book` (which requires JWT for authentication). <br><br>"
+                       " Deprecation Starts: 2025-11-11 <br><br>"
+                       "Sunset Date: 2026-02-09 (The version may stop receiving updates and support after this date.) <br><br>"
+                       "Removal Date: 2026-05-09 (The version will be completely shut down and removed.)",
+        "version": "2.0.0"
+    }
+}
+
+
+
+def create_app(config=None):
+    """
+    Build a configured app instance
+    
+    Args:
+        config: Overrides applied on top of DEFAULT_CONFIG, before the
+            database is bound (e.g. SQLALCHEMY_DATABASE_URI, TESTING)
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    init_db(app)  # DATABASE_URL, SQLITE_*, DB_POOL_* (xem database.py)
+    response_cache.init_app(app)  # cache riêng cho từng instance (khác DB thì khác cache)
+    count_cache.init_app(app)
+    token_cache.init_app(app)
+    
+    apidoc.init_app(app, swagger_config, swagger_template)  # build/apispec-v*.json; APIDOC_LIVE=1 = flasgger
+    
+    app.register_blueprint(books_bp)
+    app.register_blueprint(users_bp)
+    app.register_blueprint(borrows_bp)
+    app.register_blueprint(demo_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(payment_bp)
+    
+    fulltext.register_commands(app)
+    migrations.register_commands(app)
+    return app
@@ -1,6 +1,6 @@
 from database import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.password_hashing import password_hasher
 
 
 
@@ -10,6 +10,20 @@ class Book(db.Model):
     author = db.Column(db.String(120))
     category = db.Column(db.String(50))
     is_available = db.Column(db.Boolean, default=True)
+    # Per-row version, incremented by SQLAlchemy on every ORM UPDATE
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {'version_id_col': version}
+    __table_args__ = (
+        # Sort orders of GET /api/v1/books (rowid = id breaks ties for free)
+        db.Index('ix_book_title', 'title'),
+        db.Index('ix_book_author', 'author'),
+        db.Index('ix_book_category', 'category'),
+        # ?available= with the default title sort
+        db.Index('ix_book_available_title', 'is_available', 'title'),
+        # Facet grouping (covering)
+        db.Index('ix_book_category_available', 'category', 'is_available'),
+    )
 
     def to_dict(self):
         return {
@@ -27,6 +41,10 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_user_name', 'name'),
+    )
+
     def to_dict(self):
         return {
             "userId": self.id,
@@ -34,11 +52,16 @@ class User(db.Model):
             "email": self.email
         }
     
+    # Hashing runs in utils.password_hashing's process pool and may raise
+    # HashingBusy when it is saturated
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
 
 class BorrowRecord(db.Model):
@@ -52,6 +75,17 @@ class BorrowRecord(db.Model):
     user = db.relationship('User', backref='borrow_records')
     book = db.relationship('Book', backref='borrow_records')
 
+    __table_args__ = (
+        # A user's borrows, newest first
+        db.Index('ix_borrow_record_user_date', 'user_id', 'borrow_date'),
+        # The open borrow of a book
+        db.Index('ix_borrow_record_book_returned', 'book_id', 'is_returned'),
+        # GET /api/v1/borrows: default sort, ?is_returned= filter, other sorts
+        db.Index('ix_borrow_record_borrow_date', 'borrow_date'),
+        db.Index('ix_borrow_record_returned_date', 'is_returned', 'borrow_date'),
+        db.Index('ix_borrow_record_return_date', 'return_date'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -71,6 +105,15 @@ class Payment(db.Model):
     status = db.Column(db.String(20), default="pending")
     payment_method = db.Column(db.String(20), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Lease taken by a payment worker while it talks to the processor
+    claimed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_payment_user_created', 'user_id', 'created_at'),
+        db.Index('ix_payment_created_at', 'created_at'),
+        db.Index('ix_payment_status_created', 'status', 'created_at'),
+        db.Index('ix_payment_currency_created', 'currency', 'created_at'),
+    )
 
     def to_dict(self):
         return {
@@ -82,4 +125,79 @@ class Payment(db.Model):
             "status": self.status,
             "payment_method": self.payment_method,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
\ No newline at end of file
+        }
+
+class TableVersion(db.Model):
+    """Committed write counter per table, shared by every worker process"""
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class BookFacetCount(db.Model):
+    """Incrementally maintained book counts per (category, is_available)"""
+    category = db.Column(db.String(50), primary_key=True)  # NULL category stored as ''
+    is_available = db.Column(db.Boolean, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PaymentDailyTotal(db.Model):
+    """Incrementally maintained payment count/amount per (day, currency, status)"""
+    day = db.Column(db.Date, primary_key=True)
+    currency = db.Column(db.String(10), primary_key=True)  # NULL stored as ''
+    status = db.Column(db.String(20), primary_key=True)  # NULL stored as ''
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class IdempotencyKey(db.Model):
+    """Outcome of a request sent with an Idempotency-Key, per caller"""
+    scope = db.Column(db.String(64), primary_key=True)  # caller identity (JWT sub)
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path, body
+    status = db.Column(db.String(20), nullable=False, default="in_progress")  # in_progress | completed
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    locked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
+
+
+# API field name -> column, mirroring each model's to_dict() keys.
+# Used to build column-only SELECTs that skip ORM entity hydration.
+BOOK_FIELDS = {
+    "bookId": Book.id,
+    "title": Book.title,
+    "author": Book.author,
+    "category": Book.category,
+    "is_available": Book.is_available,
+}
+
+USER_FIELDS = {
+    "userId": User.id,
+    "name": User.name,
+    "email": User.email,
+}
+
+PAYMENT_FIELDS = {
+    "id": Payment.id,
+    "user_id": Payment.user_id,
+    "book_id": Payment.book_id,
+    "amount": Payment.amount,
+    "currency": Payment.currency,
+    "status": Payment.status,
+    "payment_method": Payment.payment_method,
+    "created_at": Payment.created_at,
+}
+
+# "user" and "book" require the query to join User and Book
+BORROW_FIELDS = {
+    "id": BorrowRecord.id,
+    "user": User.name,
+    "book": Book.title,
+    "borrow_date": BorrowRecord.borrow_date,
+    "return_date": BorrowRecord.return_date,
+    "is_returned": BorrowRecord.is_returned,
+}
@@ -1,11 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
-from flasgger import swag_from
+from utils.apidoc import swag_from
 from database import db
 from models import User
 from utils.jwt_helper import create_access_token, decode_token
+from utils.password_hashing import HashingBusy
 
 auth_bp = Blueprint('auth', __name__)
 
+
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    # Pool bão hoà: trả lỗi ngay thay vì xếp hàng sau hàng loạt login
+    response = jsonify({"error": "Server is busy, please retry"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/api/v1/auth/register', methods=['POST'])
 @swag_from({
     'tags': ['Auth'],
@@ -20,7 +29,11 @@ auth_bp = Blueprint('auth', __name__)
             'required': ['name', 'email', 'password']
         }}
     ],
-    'responses': {201: {'description': 'User created'}, 400: {'description': 'Bad request'}}
+    'responses': {
+        201: {'description': 'User created'},
+        400: {'description': 'Bad request'},
+        503: {'description': 'Password hashing pool saturated, retry later'}
+    }
 })
 
 def register():
@@ -55,7 +68,11 @@ def register():
             'required': ['email', 'password']
         }}
     ],
-    'responses': {200: {'description': 'Login success with token'}, 401: {'description': 'Unauthorized'}}
+    'responses': {
+        200: {'description': 'Login success with token'},
+        401: {'description': 'Unauthorized'},
+        503: {'description': 'Password hashing pool saturated, retry later'}
+    }
 })
 
 def login():
@@ -70,6 +87,14 @@ def login():
     if not user or not user.check_password(password):
         return jsonify({"error": "invalid credentials"}), 401
     
+    # Hash cũ (method/work factor khác): băm lại bằng policy hiện tại
+    if user.password_needs_rehash():
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except HashingBusy:
+            pass  # pool bận: mật khẩu đã đúng, lần login sau sẽ băm lại
+    
     token = create_access_token(identity=str(user.id))
 
     return jsonify({'access_token': token, 'user': user.to_dict()}), 200
@@ -1,23 +1,81 @@
 from flask import Blueprint, request, jsonify
-from flasgger import swag_from
-from sqlalchemy import or_
-from models import Book
+from utils.apidoc import swag_from
+from sqlalchemy import or_, select
+from models import Book, BOOK_FIELDS
 from database import db
-from utils.pagination import PaginationHelper, handle_pagination_error
+from utils.pagination import PaginationHelper, KeysetPagination, handle_pagination_error
+from utils.fieldsets import Fieldset
+from utils.etag import conditional_get, make_etag, not_modified
+from utils.response_cache import cached_response
+from utils import fulltext, facets, bulk_import, export
 
 books_bp = Blueprint('books', __name__)
 
+# Public sort field -> column; every sort is tie-broken by Book.id
+BOOK_SORT_COLUMNS = {
+    'title': Book.title,
+    'author': Book.author,
+    'category': Book.category,
+    'bookId': Book.id,
+}
+
+
+
+def filter_books(query, search=None, category=None, available=None):
+    """
+    Apply the list filters shared by the books endpoints
+    
+    Returns:
+        (query, match) where match is the FTS5 (rowid, rank) subquery, or
+        None when searching fell back to ILIKE or there is no search
+    """
+    # Tìm kiếm: FTS5 index (prefix + bm25), ILIKE khi không có FTS5
+    match = fulltext.match_subquery(db.session, 'book', search) if search else None
+    if match is not None:
+        query = query.join(match, match.c.rowid == Book.id)
+    elif search:
+        query = query.filter(or_(
+            Book.title.ilike(f"%{search}%"),
+            Book.author.ilike(f"%{search}%")
+        ))
+
+    # Lọc
+    if category:
+        query = query.filter(Book.category.ilike(f"%{category}%"))
+    if available:
+        query = query.filter(Book.is_available == (available.lower() == 'true'))
+
+    return query, match
+
+
+def describe_filters(search=None, category=None, available=None):
+    filters_applied = []
+    if search:
+        filters_applied.append(f"search: '{search}'")
+    if category:
+        filters_applied.append(f"category: '{category}'")
+    if available:
+        filters_applied.append(f"available: {available}")
+    return filters_applied
+
+
 @books_bp.route('/api/v1/books', methods=['GET'])
+@conditional_get(tables=['book'])
+@cached_response(tags=['book'])
 @swag_from({
     'tags': ['Books'],
     'parameters': [
         {'name': 'page', 'in': 'query', 'type': 'integer', 'default': 1, 'description': 'Trang hiện tại'},
         {'name': 'per_page', 'in': 'query', 'type': 'integer', 'default': 10, 'description': 'Số phần tử mỗi trang'},
-        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc tác giả'},
+        {'name': 'include_total', 'in': 'query', 'type': 'boolean', 'default': True, 'description': 'false = bỏ qua COUNT(*), chỉ trả về has_next'},
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc tác giả (full-text, theo tiền tố)'},
         {'name': 'category', 'in': 'query', 'type': 'string', 'description': 'Lọc theo thể loại'},
         {'name': 'available', 'in': 'query', 'type': 'boolean', 'description': 'true = còn sách, false = đã mượn'},
-        {'name': 'sort_by', 'in': 'query', 'type': 'string', 'default': 'title', 'description': 'Trường sắp xếp'},
-        {'name': 'order', 'in': 'query', 'type': 'string', 'enum': ['asc', 'desc'], 'default': 'asc', 'description': 'Thứ tự'}
+        {'name': 'sort_by', 'in': 'query', 'type': 'string', 'default': 'title', 'description': 'Trường sắp xếp: title, author, category, bookId, relevance (mặc định khi có search)'},
+        {'name': 'order', 'in': 'query', 'type': 'string', 'enum': ['asc', 'desc'], 'default': 'asc', 'description': 'Thứ tự'},
+        {'name': 'cursor', 'in': 'query', 'type': 'string', 'description': 'Keyset cursor (để trống cho trang đầu), thay cho page'},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'default': 10, 'description': 'Số phần tử mỗi trang khi dùng cursor'},
+        {'name': 'fields', 'in': 'query', 'type': 'string', 'description': 'Chỉ trả về các trường này, vd: bookId,title'}
     ],
     'responses': {
         200: {
@@ -53,21 +111,11 @@ books_bp = Blueprint('books', __name__)
                 }
             }
         },
+        304: {'description': 'Không thay đổi (If-None-Match khớp ETag)'},
         400: {'description': 'Tham số phân trang không hợp lệ'}
     }
 })
 def get_books():
-    # Create pagination helper from request
-    pagination_helper = PaginationHelper.from_request(
-        max_per_page=50,  # Maximum 50 books per page
-        endpoint='books.get_books'
-    )
-    
-    # Validate pagination parameters
-    validation_error = pagination_helper.validate_page_params()
-    if validation_error:
-        return handle_pagination_error(validation_error)
-    
     # Get other query parameters
     search = request.args.get('search', type=str)
     category = request.args.get('category', type=str)
@@ -75,49 +123,162 @@ def get_books():
     sort_by = request.args.get('sort_by', 'title', type=str)
     order = request.args.get('order', 'asc', type=str)
 
-    query = Book.query
-
-    # Tìm kiếm
-    if search:
-        query = query.filter(or_(
-            Book.title.ilike(f"%{search}%"),
-            Book.author.ilike(f"%{search}%")
-        ))
+    keyset_mode = 'cursor' in request.args
+    query, match = filter_books(Book.query, search, category, available)
 
-    # Lọc
-    if category:
-        query = query.filter(Book.category.ilike(f"%{category}%"))
-    if available:
-        query = query.filter(Book.is_available == (available.lower() == 'true'))
+    # Sparse fieldset: ?fields=bookId,title -> column-only SELECT
+    fieldset, fields_error = Fieldset.from_request(BOOK_FIELDS)
+    if fields_error:
+        return handle_pagination_error(fields_error)
+    serializer = fieldset.serialize if fieldset else None
 
-    # Sắp xếp
-    valid_sort_fields = ['title', 'author', 'category', 'bookId']
-    if sort_by not in valid_sort_fields:
+    # Sắp xếp: mặc định theo độ liên quan khi tìm kiếm (chỉ với phân trang offset)
+    if match is not None and not keyset_mode and 'sort_by' not in request.args:
+        sort_by = 'relevance'
+    relevance = match is not None and not keyset_mode and sort_by == 'relevance'
+    if not relevance and sort_by not in BOOK_SORT_COLUMNS:
         sort_by = 'title'
-    
-    sort_column = getattr(Book, sort_by, Book.title)
-    if order == 'desc':
-        sort_column = sort_column.desc()
-    query = query.order_by(sort_column)
+    sort_column = BOOK_SORT_COLUMNS.get(sort_by)
+
+    # Keyset pagination: ?cursor= (empty for the first page) replaces ?page=
+    if keyset_mode:
+        keyset = KeysetPagination.from_request(
+            sort_key=sort_by,
+            sort_column=sort_column,
+            id_column=Book.id,
+            order=order,
+            max_limit=50,
+            endpoint='books.get_books'
+        )
+        validation_error = keyset.validate_cursor()
+        if validation_error:
+            return handle_pagination_error(validation_error)
+
+        if fieldset:
+            # Sort key and id ride along as trailing columns for the cursor
+            query = fieldset.project(query, extra_columns=(sort_column, Book.id))
+            value_getter = lambda row: (row[-2], row[-1])
+        else:
+            value_getter = lambda book: (getattr(book, sort_column.key), book.id)
+
+        items = keyset.apply_to_query(query).all()
+        result = keyset.format_response(items, value_getter, serializer=serializer)
+    else:
+        # Create pagination helper from request
+        pagination_helper = PaginationHelper.from_request(
+            max_per_page=50,  # Maximum 50 books per page
+            endpoint='books.get_books'
+        )
+
+        # Validate pagination parameters
+        validation_error = pagination_helper.validate_page_params()
+        if validation_error:
+            return handle_pagination_error(validation_error)
 
-    # Apply pagination and return response
-    result = pagination_helper.paginate_query(query)
+        order_columns = [sort_column] if sort_column is Book.id else [sort_column, Book.id]
+        if relevance:
+            query = query.order_by(match.c.rank, Book.id)
+        elif order == 'desc':
+            query = query.order_by(*[column.desc() for column in order_columns])
+        else:
+            query = query.order_by(*[column.asc() for column in order_columns])
+
+        if fieldset:
+            query = fieldset.project(query)
+
+        # Apply pagination and return response
+        result = pagination_helper.paginate_query(query, count_tables=['book'], serializer=serializer)
     
     # Add search/filter info to meta
     if search or category or available:
-        filters_applied = []
-        if search:
-            filters_applied.append(f"search: '{search}'")
-        if category:
-            filters_applied.append(f"category: '{category}'")
-        if available:
-            filters_applied.append(f"available: {available}")
-        
-        result["meta"]["filters"] = filters_applied
+        result["meta"]["filters"] = describe_filters(search, category, available)
     
     return jsonify(result), 200
 
+
+@books_bp.route('/api/v1/books/facets', methods=['GET'])
+@conditional_get(tables=['book'])
+@cached_response(tags=['book'])
+@swag_from({
+    'tags': ['Books'],
+    'parameters': [
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc tác giả'},
+        {'name': 'category', 'in': 'query', 'type': 'string', 'description': 'Lọc theo thể loại'},
+        {'name': 'available', 'in': 'query', 'type': 'boolean', 'description': 'true = còn sách, false = đã mượn'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Số lượng sách theo thể loại và trạng thái',
+            'examples': {
+                'application/json': {
+                    "data": {
+                        "categories": [
+                            {"category": "Programming", "count": 4, "available": 3, "borrowed": 1}
+                        ],
+                        "availability": {"available": 3, "borrowed": 1},
+                        "total": 4
+                    },
+                    "meta": {"status": "success", "source": "counts_table"}
+                }
+            }
+        }
+    }
+})
+def get_book_facets():
+    """Đếm sách theo thể loại và trạng thái cho bộ lọc hiện tại"""
+    search = request.args.get('search', type=str)
+    category = request.args.get('category', type=str)
+    available = request.args.get('available', type=str)
+
+    if search or category or available:
+        query, _ = filter_books(Book.query, search, category, available)
+        rows = facets.grouped_counts(query)
+        source = "grouped_query"
+    else:
+        rows = facets.stored_counts(db.session)
+        source = "counts_table"
+
+    result = {
+        "data": facets.format_facets(rows),
+        "meta": {"status": "success", "source": source}
+    }
+    if source == "grouped_query":
+        result["meta"]["filters"] = describe_filters(search, category, available)
+
+    return jsonify(result), 200
+
+@books_bp.route('/api/v1/books/export', methods=['GET'])
+@swag_from({
+    'tags': ['Books'],
+    'produces': ['application/x-ndjson', 'text/csv'],
+    'parameters': [
+        {'name': 'format', 'in': 'query', 'type': 'string', 'enum': ['ndjson', 'csv'], 'default': 'ndjson'},
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc tác giả'},
+        {'name': 'category', 'in': 'query', 'type': 'string', 'description': 'Lọc theo thể loại'},
+        {'name': 'available', 'in': 'query', 'type': 'boolean', 'description': 'true = còn sách, false = đã mượn'}
+    ],
+    'responses': {
+        200: {'description': 'Toàn bộ sách theo bộ lọc, trả về theo luồng'},
+        400: {'description': 'Định dạng không hợp lệ'}
+    }
+})
+def export_books():
+    """Xuất toàn bộ sách (NDJSON/CSV) theo luồng, bộ nhớ không đổi"""
+    fmt = request.args.get('format', 'ndjson', type=str)
+    if fmt not in export.EXPORT_FORMATS:
+        return export.invalid_format_response()
+
+    query, _ = filter_books(
+        Book.query,
+        request.args.get('search', type=str),
+        request.args.get('category', type=str),
+        request.args.get('available', type=str)
+    )
+    return export.export_response(query.order_by(Book.id), BOOK_FIELDS, fmt, 'books')
+
+
 @books_bp.route('/api/v1/books/<int:book_id>', methods=['GET'])
+@cached_response(tags=['book'])
 @swag_from({
     'tags': ['Books'],
     'parameters': [
@@ -142,19 +303,30 @@ def get_books():
                 }
             }
         },
+        304: {'description': 'Không thay đổi (If-None-Match khớp ETag)'},
         404: {'description': 'Không tìm thấy sách với ID này'}
     }
 })
 def get_book_by_id(book_id):
     """Lấy thông tin chi tiết 1 quyển sách theo ID"""
-    book = Book.query.get(book_id)
-    
+    # ETag theo version của từng dòng: chỉ đọc cột version, 304 nếu client đã có bản mới nhất
+    version = db.session.scalar(select(Book.version).where(Book.id == book_id))
+    if version is not None:
+        etag = make_etag('book', book_id, version)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+    book = db.session.get(Book, book_id)
     if not book:
         return jsonify({
             "error": f"Không tìm thấy sách có ID = {book_id}"
         }), 404
 
-    return jsonify(book.to_dict()), 200
+    etag = make_etag('book', book.id, book.version)
+    response = jsonify(book.to_dict())
+    response.set_etag(etag, weak=True)
+    return response, 200
 
 @books_bp.route('/api/v1/books', methods=['POST'])
 @swag_from({
@@ -205,6 +377,7 @@ def create_book():
     
     try:
         db.session.add(book)
+        facets.book_added(db.session, book)
         db.session.commit()
         return jsonify(book.to_dict()), 201
     except Exception as e:
@@ -212,6 +385,70 @@ def create_book():
         return jsonify({"error": str(e)}), 400
 
 
+@books_bp.route('/api/v1/books/bulk', methods=['POST'])
+@swag_from({
+    'tags': ['Books'],
+    'consumes': ['application/x-ndjson', 'text/csv'],
+    'parameters': [
+        {'name': 'body', 'in': 'body', 'required': True,
+         'description': 'NDJSON (mỗi dòng một sách) hoặc CSV có header title,author,category',
+         'schema': {'type': 'string'}},
+        {'name': 'batch_size', 'in': 'query', 'type': 'integer', 'default': 1000,
+         'description': 'Số dòng mỗi transaction (tối đa 10000)'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Báo cáo import',
+            'examples': {
+                'application/json': {
+                    "data": {
+                        "received": 3, "inserted": 2, "failed": 1, "batches": 1, "batch_size": 1000,
+                        "elapsed_seconds": 0.004, "rows_per_second": 500.0,
+                        "errors": [{"line": 2, "error": "Title is required"}],
+                        "errors_truncated": False
+                    },
+                    "meta": {"status": "success", "message": "Imported 2 of 3 rows"}
+                }
+            }
+        },
+        400: {'description': 'Body không phải UTF-8 (dừng tại dòng lỗi, các batch trước đó đã được lưu)'},
+        415: {'description': 'Content-Type không được hỗ trợ'}
+    }
+})
+def bulk_import_books():
+    """Import sách hàng loạt, đọc body theo luồng"""
+    mimetype = request.mimetype
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-seq'):
+        rows = bulk_import.iter_ndjson(request.stream)
+    elif mimetype in ('text/csv', 'application/csv'):
+        rows = bulk_import.iter_csv(request.stream)
+    else:
+        return jsonify({"error": "Content-Type must be application/x-ndjson or text/csv"}), 415
+
+    batch_size = min(max(1, request.args.get('batch_size', 1000, type=int)), 10000)
+    importer = bulk_import.BulkImporter(db.session, batch_size=batch_size)
+    try:
+        report = importer.run(rows)
+    except bulk_import.BodyDecodeError as e:
+        # Không đọc tiếp được body: các batch đã commit vẫn giữ nguyên
+        db.session.rollback()
+        return jsonify({
+            "meta": {
+                "status": "error",
+                "message": f"Body is not valid UTF-8; {importer.inserted} rows were imported before line {e.line}"
+            },
+            "errors": [{"line": e.line, "error": e.message}]
+        }), 400
+
+    return jsonify({
+        "data": report,
+        "meta": {
+            "status": "success" if report["inserted"] or not report["failed"] else "error",
+            "message": f"Imported {report['inserted']} of {report['received']} rows"
+        }
+    }), 200
+
+
 @books_bp.route('/api/v1/books/<int:book_id>', methods=['DELETE'])
 @swag_from({
     'tags': ['Books'],
@@ -247,6 +484,7 @@ def delete_book(book_id):
         }), 404
 
     try:
+        facets.book_removed(db.session, book.category, book.is_available)
         db.session.delete(book)
         db.session.commit()
         return jsonify({
@@ -1,23 +1,47 @@
 from flask import Blueprint, request, jsonify
-from flasgger import swag_from
+from utils.apidoc import swag_from
 from sqlalchemy import or_
-from models import BorrowRecord, User, Book
+from sqlalchemy.orm import contains_eager
+from models import BorrowRecord, User, Book, BORROW_FIELDS
 from database import db
 from utils.pagination import PaginationHelper, handle_pagination_error
+from utils.fieldsets import Fieldset
+from utils.response_cache import cached_response
 from utils.jwt_helper import jwt_required
+from utils import export, borrow_engine
 
 borrows_bp = Blueprint('borrows', __name__)
 
+
+def filter_borrows(query, search=None, is_returned=None):
+    """Apply the filters shared by the borrows endpoints (query must join User and Book)"""
+    # Tìm kiếm (theo tên sách hoặc người mượn)
+    if search:
+        query = query.filter(or_(
+            User.name.ilike(f"%{search}%"),
+            Book.title.ilike(f"%{search}%")
+        ))
+
+    # Lọc trạng thái trả
+    if is_returned:
+        query = query.filter(BorrowRecord.is_returned == (is_returned.lower() == 'true'))
+
+    return query
+
+
 @borrows_bp.route('/api/v1/borrows', methods=['GET'])
+@cached_response(tags=['borrow_record', 'user', 'book'])
 @swag_from({
     'tags': ['Borrow Records'],
     'parameters': [
         {'name': 'page', 'in': 'query', 'type': 'integer', 'default': 1},
         {'name': 'per_page', 'in': 'query', 'type': 'integer', 'default': 10},
+        {'name': 'include_total', 'in': 'query', 'type': 'boolean', 'default': True, 'description': 'false = bỏ qua COUNT(*), chỉ trả về has_next'},
         {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên người hoặc sách'},
         {'name': 'is_returned', 'in': 'query', 'type': 'boolean', 'description': 'true/false'},
         {'name': 'sort_by', 'in': 'query', 'type': 'string', 'default': 'borrow_date'},
-        {'name': 'order', 'in': 'query', 'type': 'string', 'enum': ['asc', 'desc'], 'default': 'desc'}
+        {'name': 'order', 'in': 'query', 'type': 'string', 'enum': ['asc', 'desc'], 'default': 'desc'},
+        {'name': 'fields', 'in': 'query', 'type': 'string', 'description': 'Chỉ trả về các trường này, vd: id,book,borrow_date'}
     ],
     'responses': {
         200: {
@@ -72,18 +96,12 @@ def get_borrow_records():
     sort_by = request.args.get('sort_by', 'borrow_date', type=str)
     order = request.args.get('order', 'desc', type=str)
 
-    query = BorrowRecord.query.join(User).join(Book)
-
-    # Tìm kiếm (theo tên sách hoặc người mượn)
-    if search:
-        query = query.filter(or_(
-            User.name.ilike(f"%{search}%"),
-            Book.title.ilike(f"%{search}%")
-        ))
+    query = filter_borrows(BorrowRecord.query.join(User).join(Book), search, is_returned)
 
-    # Lọc trạng thái trả
-    if is_returned:
-        query = query.filter(BorrowRecord.is_returned == (is_returned.lower() == 'true'))
+    # Sparse fieldset: ?fields=id,book -> column-only SELECT over the joins
+    fieldset, fields_error = Fieldset.from_request(BORROW_FIELDS)
+    if fields_error:
+        return handle_pagination_error(fields_error)
 
     # Sắp xếp
     valid_sort_fields = ['borrow_date', 'return_date', 'id']
@@ -95,8 +113,17 @@ def get_borrow_records():
         sort_column = sort_column.desc()
     query = query.order_by(sort_column)
 
+    if fieldset:
+        query = fieldset.project(query)
+    else:
+        # Fill record.user / record.book from the joined rows (no per-row SELECTs)
+        query = query.options(contains_eager(BorrowRecord.user), contains_eager(BorrowRecord.book))
+
     # Apply pagination and return response
-    result = pagination_helper.paginate_query(query)
+    result = pagination_helper.paginate_query(
+        query, count_tables=['borrow_record', 'user', 'book'],
+        serializer=fieldset.serialize if fieldset else None
+    )
     
     # Add filter info to meta
     if search or is_returned:
@@ -111,6 +138,33 @@ def get_borrow_records():
     return jsonify(result), 200
 
 
+@borrows_bp.route('/api/v1/borrows/export', methods=['GET'])
+@swag_from({
+    'tags': ['Borrow Records'],
+    'produces': ['application/x-ndjson', 'text/csv'],
+    'parameters': [
+        {'name': 'format', 'in': 'query', 'type': 'string', 'enum': ['ndjson', 'csv'], 'default': 'ndjson'},
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên người hoặc sách'},
+        {'name': 'is_returned', 'in': 'query', 'type': 'boolean', 'description': 'true/false'}
+    ],
+    'responses': {
+        200: {'description': 'Toàn bộ phiếu mượn theo bộ lọc, trả về theo luồng'},
+        400: {'description': 'Định dạng không hợp lệ'}
+    }
+})
+def export_borrow_records():
+    fmt = request.args.get('format', 'ndjson', type=str)
+    if fmt not in export.EXPORT_FORMATS:
+        return export.invalid_format_response()
+
+    query = filter_borrows(
+        BorrowRecord.query.join(User).join(Book),
+        request.args.get('search', type=str),
+        request.args.get('is_returned', type=str)
+    )
+    return export.export_response(query.order_by(BorrowRecord.id), BORROW_FIELDS, fmt, 'borrows')
+
+
 @borrows_bp.route('/api/v1/borrows', methods=['POST'])
 @jwt_required
 @swag_from({
@@ -150,43 +204,18 @@ def get_borrow_records():
     }
 })
 def create_borrow_record():
-    from datetime import datetime
-    
     try:
         data = request.get_json()
         
         if not data or not data.get('user_id') or not data.get('book_id'):
             return jsonify({"error": "user_id và book_id là bắt buộc"}), 400
         
-        # Check if user exists
-        user = User.query.get(data['user_id'])
-        if not user:
-            return jsonify({"error": "Người dùng không tồn tại"}), 404
-        
-        # Check if book exists
-        book = Book.query.get(data['book_id'])
-        if not book:
-            return jsonify({"error": "Sách không tồn tại"}), 404
-        
-        # Check if book is available
-        if not book.is_available:
-            return jsonify({"error": "Sách đã được mượn"}), 409
-        
-        # Create borrow record
-        borrow_record = BorrowRecord(
-            user_id=data['user_id'],
-            book_id=data['book_id'],
-            borrow_date=datetime.utcnow()
-        )
-        
-        # Update book availability
-        book.is_available = False
-        
-        db.session.add(borrow_record)
-        db.session.commit()
-        
-        return jsonify(borrow_record.to_dict()), 201
+        # Claim the book and insert the record atomically (no prior reads)
+        result = borrow_engine.borrow(db.session, data['user_id'], data['book_id'])
+        return jsonify(result), 201
         
+    except borrow_engine.BorrowError as e:
+        return jsonify({"error": e.message}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -217,28 +246,136 @@ def create_borrow_record():
     }
 })
 def return_book(borrow_id):
-    from datetime import datetime
-    
     try:
-        borrow_record = BorrowRecord.query.get(borrow_id)
-        if not borrow_record:
-            return jsonify({"error": "Phiếu mượn không tồn tại"}), 404
-        
-        if borrow_record.is_returned:
-            return jsonify({"error": "Sách đã được trả"}), 409
+        result = borrow_engine.return_borrow(db.session, borrow_id)
+        return jsonify(result), 200
         
-        # Update borrow record
-        borrow_record.return_date = datetime.utcnow()
-        borrow_record.is_returned = True
+    except borrow_engine.BorrowError as e:
+        return jsonify({"error": e.message}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+def parse_batch(data):
+    """Validate a batch body; returns (user_id, book_ids, error_message)"""
+    if not data or not data.get('user_id') or not data.get('book_ids'):
+        return None, None, "user_id và book_ids là bắt buộc"
+    book_ids = data['book_ids']
+    if not isinstance(book_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in book_ids):
+        return None, None, "book_ids phải là danh sách số nguyên"
+    if len(book_ids) > borrow_engine.MAX_BATCH:
+        return None, None, f"Tối đa {borrow_engine.MAX_BATCH} sách mỗi lần"
+    return data['user_id'], book_ids, None
+
+
+def batch_response(result, action):
+    return jsonify({
+        "data": result,
+        "meta": {
+            "status": "success" if result["succeeded"] else "error",
+            "message": f"{action} {result['succeeded']} of {len(result['items'])} books"
+        }
+    }), 200
+
+
+BATCH_BODY = {
+    'name': 'batch',
+    'in': 'body',
+    'required': True,
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'user_id': {'type': 'integer', 'description': 'ID người mượn'},
+            'book_ids': {'type': 'array', 'items': {'type': 'integer'},
+                         'description': f'Danh sách ID sách (tối đa {borrow_engine.MAX_BATCH})'}
+        },
+        'required': ['user_id', 'book_ids']
+    }
+}
+
+
+@borrows_bp.route('/api/v1/borrows/batch', methods=['POST'])
+@jwt_required
+@swag_from({
+    'tags': ['Borrow Records'],
+    'parameters': [BATCH_BODY],
+    'responses': {
+        200: {
+            'description': 'Kết quả mượn từng sách (một transaction)',
+            'examples': {
+                'application/json': {
+                    "data": {
+                        "user_id": 1, "succeeded": 1, "failed": 1,
+                        "items": [
+                            {"book_id": 1, "status": 201, "borrow": {
+                                "id": 7, "user": "John Doe", "book": "Python 101",
+                                "borrow_date": "2023-01-01T00:00:00", "return_date": None, "is_returned": False}},
+                            {"book_id": 2, "status": 409, "error": "Sách đã được mượn"}
+                        ]
+                    },
+                    "meta": {"status": "success", "message": "Borrowed 1 of 2 books"}
+                }
+            }
+        },
+        400: {'description': 'Dữ liệu không hợp lệ'},
+        404: {'description': 'Người dùng không tồn tại'}
+    }
+})
+def create_borrow_records_batch():
+    """Mượn nhiều sách cho một người trong một transaction"""
+    try:
+        user_id, book_ids, error = parse_batch(request.get_json(silent=True))
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Update book availability
-        book = Book.query.get(borrow_record.book_id)
-        book.is_available = True
+        return batch_response(borrow_engine.borrow_many(db.session, user_id, book_ids), "Borrowed")
         
-        db.session.commit()
+    except borrow_engine.BorrowError as e:
+        return jsonify({"error": e.message}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@borrows_bp.route('/api/v1/borrows/return/batch', methods=['PUT'])
+@swag_from({
+    'tags': ['Borrow Records'],
+    'parameters': [BATCH_BODY],
+    'responses': {
+        200: {
+            'description': 'Kết quả trả từng sách (một transaction)',
+            'examples': {
+                'application/json': {
+                    "data": {
+                        "user_id": 1, "succeeded": 1, "failed": 1,
+                        "items": [
+                            {"book_id": 1, "status": 200, "borrow": {
+                                "id": 7, "user": "John Doe", "book": "Python 101",
+                                "borrow_date": "2023-01-01T00:00:00", "return_date": "2023-01-15T00:00:00",
+                                "is_returned": True}},
+                            {"book_id": 3, "status": 409, "error": "Người dùng không mượn sách này"}
+                        ]
+                    },
+                    "meta": {"status": "success", "message": "Returned 1 of 2 books"}
+                }
+            }
+        },
+        400: {'description': 'Dữ liệu không hợp lệ'},
+        404: {'description': 'Người dùng không tồn tại'}
+    }
+})
+def return_books_batch():
+    """Trả nhiều sách của một người trong một transaction"""
+    try:
+        user_id, book_ids, error = parse_batch(request.get_json(silent=True))
+        if error:
+            return jsonify({"error": error}), 400
         
-        return jsonify(borrow_record.to_dict()), 200
+        return batch_response(borrow_engine.return_many(db.session, user_id, book_ids), "Returned")
         
+    except borrow_engine.BorrowError as e:
+        return jsonify({"error": e.message}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -2,7 +2,7 @@
 Advanced pagination examples and demo routes
 """
 from flask import Blueprint, request, jsonify
-from flasgger import swag_from
+from utils.apidoc import swag_from
 from models import Book, User, BorrowRecord
 from utils.pagination import PaginationHelper, CursorPagination, handle_pagination_error
 
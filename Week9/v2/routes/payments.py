@@ -1,13 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from datetime import datetime
-from models import Payment
+from models import Payment, PAYMENT_FIELDS
 from database import db
 import uuid
 
 from utils.jwt_helper import jwt_required
+from utils import idempotency, payment_pipeline, payment_rollup
+from utils.idempotency import idempotent
+from utils.pagination import KeysetPagination, handle_pagination_error
+from utils.fieldsets import Fieldset
 
 payment_bp = Blueprint("payment_bp", __name__)
 
+# Upper bound for ?wait= on the status endpoint (long-polling)
+MAX_WAIT_SECONDS = 30
+
+
+def _status_location(payment_id):
+    return f"/api/v2/payments/book/{payment_id}"
+
+
 @payment_bp.route("/api/v1/payments/book", methods=["POST"])
 def pay_book():
     """
@@ -72,6 +84,8 @@ def pay_book():
 
 @payment_bp.route("/api/v2/payments/book", methods=["POST"])
 @jwt_required
+# Kho idempotency chỉ lưu status + body: dựng lại Location từ id khi replay
+@idempotent(replay_headers=lambda body: {"Location": _status_location(body["id"])})
 def create_payment_v2():
     """
     Create a new payment (JWT Protected)
@@ -88,7 +102,7 @@ def create_payment_v2():
         name: Idempotency-Key
         type: string
         required: false
-        description: "Optional idempotency key"
+        description: "Optional idempotency key; a retry with the same key and body returns the stored response"
       - in: body
         name: body
         schema:
@@ -104,15 +118,18 @@ def create_payment_v2():
             payment_method:
               type: string
     responses:
-      201:
-        description: Payment created successfully
+      202:
+        description: "Đã nhận thanh toán (status=pending); theo dõi kết quả qua header Location"
       401:
         description: Unauthorized or invalid token
       400:
         description: Missing required fields
+      409:
+        description: A request with the same Idempotency-Key is still being processed
+      422:
+        description: Idempotency-Key reused with a different request body
     """
 
-    idem_key = request.headers.get("Idempotency-Key")
     data = request.get_json() or {}
     print("DEBUG JSON:", data)
 
@@ -129,24 +146,205 @@ def create_payment_v2():
         book_id=data["book_id"],
         amount=data["amount"],
         currency=data["currency"],
-        status="succeeded",
+        status="pending",
         payment_method=data["payment_method"],
         created_at=datetime.utcnow(),
     )
     
     db.session.add(new_payment)
+    db.session.flush()
+    payment_rollup.payment_added(db.session, new_payment)
+
+    # Stored with the payment in one commit: a retry can never pay twice
+    response = jsonify(new_payment.to_dict())
+    idempotency.complete(db.session, 202, response.get_data(as_text=True))
     db.session.commit()
 
-    if idem_key:
-        print(f"[Idempotency] Saved key: {idem_key}")
+    # Bộ xử lý chạy nền (utils/payment_pipeline); client theo dõi qua Location
+    payment_pipeline.enqueued(current_app._get_current_object())
+    response.headers["Location"] = _status_location(new_payment.id)
+    return response, 202
+
+
+@payment_bp.route("/api/v2/payments", methods=["GET"])
+@jwt_required
+def list_payments_v2():
+    """
+    Payments ledger (JWT Protected), keyset-paginated on (created_at, id)
+    ---
+    tags:
+      - Payments v2
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: "Bearer token"
+      - {name: limit, in: query, type: integer, default: 20, description: "Items per page (max 100)"}
+      - {name: cursor, in: query, type: string, description: "Cursor from a previous page (empty for the first page)"}
+      - {name: order, in: query, type: string, enum: [asc, desc], default: desc, description: "Newest first by default"}
+      - {name: user_id, in: query, type: integer}
+      - {name: status, in: query, type: string}
+      - {name: currency, in: query, type: string}
+      - {name: fields, in: query, type: string, description: "Sparse fieldset, e.g. id,amount,created_at"}
+    responses:
+      200:
+        description: One page of payments with next/prev cursors
+      400:
+        description: Invalid cursor or fields
+    """
+    query = Payment.query
+    # Each filter is backed by an index on (filter, created_at)
+    user_id = request.args.get("user_id", type=int)
+    if user_id is not None:
+        query = query.filter(Payment.user_id == user_id)
+    status = request.args.get("status", type=str)
+    if status:
+        query = query.filter(Payment.status == status)
+    currency = request.args.get("currency", type=str)
+    if currency:
+        query = query.filter(Payment.currency == currency)
+
+    fieldset, fields_error = Fieldset.from_request(PAYMENT_FIELDS)
+    if fields_error:
+        return handle_pagination_error(fields_error)
+
+    keyset = KeysetPagination(
+        sort_key="created_at",
+        sort_column=Payment.created_at,
+        id_column=Payment.id,
+        order=request.args.get("order", "desc", type=str),
+        limit=request.args.get("limit", 20, type=int),
+        max_limit=100,
+        cursor=request.args.get("cursor", type=str),
+        endpoint="payment_bp.list_payments_v2"
+    )
+    validation_error = keyset.validate_cursor()
+    if validation_error:
+        return handle_pagination_error(validation_error)
+
+    if fieldset:
+        query = fieldset.project(query, extra_columns=(Payment.created_at, Payment.id))
+        value_getter = lambda row: (row[-2], row[-1])
+    else:
+        value_getter = lambda payment: (payment.created_at, payment.id)
+
+    items = keyset.apply_to_query(query).all()
+    result = keyset.format_response(items, value_getter, serializer=fieldset.serialize if fieldset else None)
+    return jsonify(result), 200
+
+
+@payment_bp.route("/api/v2/payments/summary", methods=["GET"])
+@jwt_required
+def payments_summary_v2():
+    """
+    Payment counts and amounts per currency, status and day (JWT Protected)
+    ---
+    tags:
+      - Payments v2
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: "Bearer token"
+      - {name: group_by, in: query, type: string, default: "currency,status", description: "Any of day,currency,status"}
+      - {name: from, in: query, type: string, format: date, description: "First day (YYYY-MM-DD), inclusive"}
+      - {name: to, in: query, type: string, format: date, description: "Last day (YYYY-MM-DD), inclusive"}
+      - {name: currency, in: query, type: string}
+      - {name: status, in: query, type: string}
+    responses:
+      200:
+        description: Totals read from the payment_daily_total rollup
+      400:
+        description: Invalid group_by or date
+    """
+    errors = []
+    group_by = list(dict.fromkeys(
+        name.strip() for name in request.args.get("group_by", "currency,status").split(",") if name.strip()
+    ))
+    unknown = [name for name in group_by if name not in payment_rollup.GROUP_BY_FIELDS]
+    if unknown:
+        errors.append(f"Unknown group_by field(s): {', '.join(unknown)}")
+
+    dates = {}
+    for arg in ("from", "to"):
+        value = request.args.get(arg)
+        try:
+            dates[arg] = datetime.strptime(value, "%Y-%m-%d").date() if value else None
+        except ValueError:
+            errors.append(f"'{arg}' must be a date in YYYY-MM-DD format")
+
+    if errors:
+        return handle_pagination_error({
+            "meta": {"status": "error", "message": "Invalid summary parameters"},
+            "errors": errors
+        })
+
+    rows = payment_rollup.summary(
+        db.session, group_by,
+        date_from=dates["from"], date_to=dates["to"],
+        currency=request.args.get("currency"), status=request.args.get("status")
+    )
+    return jsonify({
+        "data": {
+            "group_by": group_by,
+            "rows": rows,
+            "total": {
+                "count": sum(row["count"] for row in rows),
+                "amount_by_currency": _amount_by_currency(rows)
+            }
+        },
+        "meta": {"status": "success", "message": f"Retrieved {len(rows)} groups"}
+    }), 200
+
 
-    return jsonify(new_payment.to_dict()), 201
+def _amount_by_currency(rows):
+    """Amounts are only summable within one currency"""
+    if rows and "currency" not in rows[0]:
+        return None
+    totals = {}
+    for row in rows:
+        totals[row["currency"]] = round(totals.get(row["currency"], 0.0) + row["amount"], 2)
+    return totals
 
 
 @payment_bp.route("/api/v2/payments/book/<int:payment_id>", methods=["GET"])
 @jwt_required
 def get_payment_status_v2(payment_id):
-    payment = Payment.query.get(payment_id)
+    """
+    Payment status (JWT Protected), with optional long-polling
+    ---
+    tags:
+      - Payments v2
+    parameters:
+      - name: Authorization
+        in: header
+        type: string
+        required: true
+        description: "Bearer token"
+      - {name: payment_id, in: path, type: integer, required: true}
+      - {name: wait, in: query, type: number, description: "Giữ request tối đa số giây này (<= 30) cho tới khi status khác giá trị `status`"}
+      - {name: status, in: query, type: string, default: pending, description: "Status client đang biết"}
+    responses:
+      200:
+        description: Payment status
+      400:
+        description: Invalid wait
+      404:
+        description: Payment not found
+    """
+    try:
+        wait = float(request.args.get("wait", 0))
+    except ValueError:
+        return jsonify({"error": "bad_request", "message": "wait must be a number of seconds"}), 400
+    wait = max(0.0, min(wait, MAX_WAIT_SECONDS))
+
+    if wait:
+        payment = payment_pipeline.wait_for_change(db.session, payment_id,
+                                                   request.args.get("status", "pending"), wait)
+    else:
+        payment = db.session.get(Payment, payment_id)
     if not payment:
         return jsonify({"error": "not_found", "message": "Payment not found"}), 404
     
@@ -159,9 +357,10 @@ def get_payment_status_v2(payment_id):
         "book": {"id": payment.book_id},
         "created_at": payment.created_at.isoformat() + "Z",
     }
-    {
-}
-    return jsonify(result), 200
+    response = jsonify(result)
+    if payment.status == "pending":
+        response.headers["Retry-After"] = "1"
+    return response, 200
 
 @payment_bp.route("/api/payments/book", methods=["POST"])
 def payments_queryparam():
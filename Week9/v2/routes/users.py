@@ -1,21 +1,59 @@
 from flask import Blueprint, request, jsonify
-from flasgger import swag_from
+from utils.apidoc import swag_from
 from sqlalchemy import or_
-from models import User
+from models import User, USER_FIELDS
 from database import db
 from utils.pagination import PaginationHelper, handle_pagination_error
+from utils.fieldsets import Fieldset
+from utils.response_cache import cached_response
+from utils import fulltext, export
 
 users_bp = Blueprint('users', __name__)
 
+
+def filter_users(query, search=None, exact=False):
+    """
+    Apply the search filter shared by the users endpoints
+    
+    Returns:
+        (query, match) where match is the FTS5 (rowid, rank) subquery, or
+        None for exact/ILIKE searches and when there is no search
+    """
+    match = None
+    if search:
+        if exact:
+            query = query.filter(
+                or_(
+                    User.name.ilike(search),
+                    User.email.ilike(search)
+                )
+            )
+        else:
+            match = fulltext.match_subquery(db.session, 'user', search)
+            if match is not None:
+                query = query.join(match, match.c.rowid == User.id)
+            else:
+                query = query.filter(
+                    or_(
+                        User.name.ilike(f"%{search}%"),
+                        User.email.ilike(f"%{search}%")
+                    )
+                )
+    return query, match
+
+
 @users_bp.route('/api/v1/users', methods=['GET'])
+@cached_response(tags=['user'])
 @swag_from({
     'tags': ['Users'],
     'parameters': [
         {'name': 'page', 'in': 'query', 'type': 'integer', 'default': 1},
         {'name': 'per_page', 'in': 'query', 'type': 'integer', 'default': 10},
-        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc email'},
-        {'name': 'sort_by', 'in': 'query', 'type': 'string', 'default': 'name'},
-        {'name': 'order', 'in': 'query', 'type': 'string', 'enum': ['asc', 'desc'], 'default': 'asc'}
+        {'name': 'include_total', 'in': 'query', 'type': 'boolean', 'default': True, 'description': 'false = bỏ qua COUNT(*), chỉ trả về has_next'},
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc email (full-text, theo tiền tố)'},
+        {'name': 'sort_by', 'in': 'query', 'type': 'string', 'default': 'name', 'description': 'name, email, userId, relevance (mặc định khi có search)'},
+        {'name': 'order', 'in': 'query', 'type': 'string', 'enum': ['asc', 'desc'], 'default': 'asc'},
+        {'name': 'fields', 'in': 'query', 'type': 'string', 'description': 'Chỉ trả về các trường này, vd: userId,name'}
     ],
     'responses': {
         200: {
@@ -68,37 +106,37 @@ def get_users():
         order = request.args.get('order', 'asc', type=str)
         exact = request.args.get('exact', 'false').lower() == 'true'
 
-        query = User.query
+        query, match = filter_users(User.query, search, exact)
 
-        # Search functionality
-        if search:
-            if exact:
-                query = query.filter(
-                    or_(
-                        User.name.ilike(search),
-                        User.email.ilike(search)
-                    )
-                )
-            else:
-                query = query.filter(
-                    or_(
-                        User.name.ilike(f"%{search}%"),
-                        User.email.ilike(f"%{search}%")
-                    )
-                )
+        # Sparse fieldset: ?fields=userId,name -> column-only SELECT
+        fieldset, fields_error = Fieldset.from_request(USER_FIELDS)
+        if fields_error:
+            return handle_pagination_error(fields_error)
 
-        # Sorting
-        valid_sort_fields = ['name', 'email', 'userId']
-        if sort_by not in valid_sort_fields:
-            sort_by = 'name'
-            
-        sort_column = getattr(User, sort_by, User.name)
-        if order == 'desc':
-            sort_column = sort_column.desc()
-        query = query.order_by(sort_column)
+        # Sorting (full-text matches default to relevance order)
+        if match is not None and 'sort_by' not in request.args:
+            sort_by = 'relevance'
+
+        if match is not None and sort_by == 'relevance':
+            query = query.order_by(match.c.rank, User.id)
+        else:
+            valid_sort_fields = ['name', 'email', 'userId']
+            if sort_by not in valid_sort_fields:
+                sort_by = 'name'
+                
+            sort_column = getattr(User, sort_by, User.name)
+            if order == 'desc':
+                sort_column = sort_column.desc()
+            query = query.order_by(sort_column)
+
+        if fieldset:
+            query = fieldset.project(query)
 
         # Apply pagination and return response
-        result = pagination_helper.paginate_query(query)
+        result = pagination_helper.paginate_query(
+            query, count_tables=['user'],
+            serializer=fieldset.serialize if fieldset else None
+        )
         
         # Add search info to meta if search was applied
         if search:
@@ -120,6 +158,33 @@ def get_users():
         }), 500
 
 
+@users_bp.route('/api/v1/users/export', methods=['GET'])
+@swag_from({
+    'tags': ['Users'],
+    'produces': ['application/x-ndjson', 'text/csv'],
+    'parameters': [
+        {'name': 'format', 'in': 'query', 'type': 'string', 'enum': ['ndjson', 'csv'], 'default': 'ndjson'},
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Tìm theo tên hoặc email'},
+        {'name': 'exact', 'in': 'query', 'type': 'boolean', 'default': False}
+    ],
+    'responses': {
+        200: {'description': 'Toàn bộ người dùng theo bộ lọc, trả về theo luồng'},
+        400: {'description': 'Định dạng không hợp lệ'}
+    }
+})
+def export_users():
+    fmt = request.args.get('format', 'ndjson', type=str)
+    if fmt not in export.EXPORT_FORMATS:
+        return export.invalid_format_response()
+
+    query, _ = filter_users(
+        User.query,
+        request.args.get('search', type=str),
+        request.args.get('exact', 'false').lower() == 'true'
+    )
+    return export.export_response(query.order_by(User.id), USER_FIELDS, fmt, 'users')
+
+
 @users_bp.route('/api/v1/users', methods=['POST'])
 @swag_from({
     'tags': ['Users'],
@@ -0,0 +1,195 @@
+"""
+Prefork production server
+
+The master process builds the app once (imports, blueprints, swagger spec),
+freezes the GC so the preloaded objects stay in shared copy-on-write pages,
+then forks the workers. Each worker accepts on the shared listening socket
+and exits after `max_requests` (+ jitter); the master replaces it, so slow
+leaks are bounded. SIGTERM/SIGINT stop the workers after their current
+request; SIGHUP restarts them one by one.
+
+    python serve.py --port 8000 --workers 4 --max-requests 1000
+
+Defaults come from the environment: HOST, PORT, WEB_CONCURRENCY (workers,
+otherwise the number of usable cores), MAX_REQUESTS, MAX_REQUESTS_JITTER.
+Unless PASSWORD_HASH_WORKERS is set, each worker's password hashing pool
+gets cores / workers processes.
+"""
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from werkzeug.serving import make_server
+
+from factory import create_app
+from database import db
+from utils.password_hashing import password_hasher
+from utils import payment_pipeline
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects taskset/cgroup affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def listen(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, max_requests: int) -> None:
+    """Serve until SIGTERM or `max_requests` requests, then exit"""
+    state = {"accepted": 0, "stopping": False}
+
+    def stop(signum, frame):
+        state["stopping"] = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+    # Drain payments left pending by a previous worker without waiting for a new POST
+    payment_pipeline.worker_pool.ensure_started(app)
+
+    host, port = sock.getsockname()[:2]
+    # Threaded: a long-polling status request must not hold the whole worker
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.daemon_threads = False  # server_close() waits for in-flight requests
+    server.timeout = 1.0  # wake up to notice SIGTERM
+
+    # Count in the accept loop (this thread), before the handler thread starts,
+    # so the worker never accepts more than max_requests connections
+    dispatch = server.process_request
+
+    def counted(request, client_address):
+        state["accepted"] += 1
+        dispatch(request, client_address)
+
+    server.process_request = counted
+    while not state["stopping"] and (max_requests <= 0 or state["accepted"] < max_requests):
+        server.handle_request()
+    server.server_close()
+    payment_pipeline.worker_pool.stop()
+    os._exit(0)
+
+
+class Master:
+    def __init__(self, app, sock, workers: int, max_requests: int, max_requests_jitter: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.children = set()
+        self.stopping = False
+        self.pending_restart = []
+
+    def spawn(self) -> None:
+        limit = self.max_requests
+        if limit > 0 and self.max_requests_jitter > 0:
+            # Stagger restarts so workers don't all recycle at once
+            limit += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.app, self.sock, limit)
+            finally:
+                os._exit(1)
+        self.children.add(pid)
+
+    def _terminate(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            self._kill(pid, signal.SIGTERM)
+
+    def _reload(self, signum, frame) -> None:
+        # Rolling restart: stop one worker now, the next when it is replaced
+        self.pending_restart = list(self.children)
+        if self.pending_restart:  # SIGHUP while every worker is being replaced
+            self._kill(self.pending_restart.pop(), signal.SIGTERM)
+
+    @staticmethod
+    def _kill(pid: int, sig) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._terminate)
+        signal.signal(signal.SIGINT, self._terminate)
+        signal.signal(signal.SIGHUP, self._reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"[serve] master {os.getpid()} on {self.sock.getsockname()[:2]} "
+              f"with {self.workers} workers", file=sys.stderr)
+
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            self.children.discard(pid)
+            if not self.stopping:
+                self.spawn()
+                if self.pending_restart:
+                    self._kill(self.pending_restart.pop(), signal.SIGTERM)
+                time.sleep(0.01)
+
+
+def serve(host: str = '127.0.0.1', port: int = 8000, workers: int = 0, max_requests: int = 1000,
+          max_requests_jitter: int = 50, config=None) -> None:
+    """
+    Preload the app, then fork and supervise `workers` processes
+
+    Args:
+        workers: Number of worker processes; 0 picks available_cores()
+        max_requests: Recycle a worker after this many requests (0 = never)
+        config: Passed to create_app
+    """
+    app = create_app(config)
+    sock = listen(host, port)
+    workers = workers or available_cores()
+    if 'PASSWORD_HASH_WORKERS' not in os.environ:
+        # Every worker gets its own hashing pool: share the cores between them
+        password_hasher.configure(workers=max(1, available_cores() // workers))
+
+    # Nothing connection-like may cross the fork
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+    password_hasher.shutdown()
+
+    gc.collect()
+    gc.freeze()
+
+    Master(app, sock, workers, max_requests, max_requests_jitter).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefork server for the library API")
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 0)))
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('MAX_REQUESTS', 1000)))
+    parser.add_argument('--max-requests-jitter', type=int, default=int(os.environ.get('MAX_REQUESTS_JITTER', 50)))
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.max_requests, args.max_requests_jitter)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+
+# Tests run against a throwaway in-memory database, never library.db
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+# No background eviction thread against the shared in-memory connection
+os.environ['IDEMPOTENCY_EVICT_INTERVAL'] = '0'
+# Payments are settled explicitly in tests (payment_pipeline.process_batch)
+os.environ['PAYMENT_WORKERS'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.extensions['count_cache'].clear()
+    app.extensions['response_cache'].clear()
+    app.extensions['token_cache'].clear()
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
@@ -0,0 +1,68 @@
+import gzip
+import json
+import subprocess
+import sys
+import os
+import pytest
+from app import app
+from utils import apidoc
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'APIDOC_PATH', str(tmp_path / 'apispec.json'))
+    return tmp_path
+
+
+def test_spec_is_built_once_and_served_gzipped(client, artifact_dir):
+    response = client.get('/apispec.json', headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert not response.headers['ETag'].startswith('W/')
+    spec = json.loads(gzip.decompress(response.data))
+    assert '/api/v1/books' in spec['paths']
+    assert (artifact_dir / 'apispec.json').exists()
+    assert (artifact_dir / 'apispec.json.gz').exists()
+
+    cached = client.get('/apispec.json', headers={"Accept-Encoding": "gzip",
+                                                  "If-None-Match": response.headers['ETag']})
+    assert cached.status_code == 304
+
+
+def test_identity_representation_has_its_own_etag(client, artifact_dir):
+    zipped = client.get('/apispec.json', headers={"Accept-Encoding": "gzip"})
+    plain = client.get('/apispec.json', headers={"Accept-Encoding": "identity"})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] != zipped.headers['ETag']
+    assert json.loads(plain.data) == json.loads(gzip.decompress(zipped.data))
+
+
+def test_artifact_from_other_sources_is_rebuilt(client, artifact_dir):
+    path = str(artifact_dir / 'apispec.json')
+    apidoc.write_artifact({"paths": {}}, path, source='routes before the change')
+
+    spec = client.get('/apispec.json', headers={"Accept-Encoding": "identity"}).get_json()
+    assert '/api/v1/books' in spec['paths']
+    with open(path + '.manifest') as f:
+        assert json.load(f)['source'] == apidoc.source_hash(app)
+
+
+def test_leftover_compressed_file_is_not_served(client, artifact_dir):
+    client.get('/apispec.json')
+    path = str(artifact_dir / 'apispec.json')
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(b'{"paths": {}}'))  # from an earlier build
+    apidoc._artifacts.pop(path)
+
+    response = client.get('/apispec.json', headers={"Accept-Encoding": "gzip"})
+    assert '/api/v1/books' in json.loads(gzip.decompress(response.data))['paths']
+
+
+def test_flasgger_is_not_imported_at_startup():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-c', "import sys, app; print('flasgger' in sys.modules)"],
+        cwd=root, capture_output=True, text=True, env={**os.environ, 'DATABASE_URL': 'sqlite://'}
+    )
+    assert result.stdout.strip() == 'False'
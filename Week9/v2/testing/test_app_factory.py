@@ -0,0 +1,32 @@
+from app import create_app, app as default_app
+from database import db
+from models import Book
+from serve import available_cores
+
+
+def test_factory_builds_independent_instances(tmp_path):
+    other = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'other.db'}",
+        'JWT_SECRET_KEY': 'another-secret',
+        'TESTING': True,
+    })
+    assert other is not default_app
+    assert other.config['JWT_SECRET_KEY'] == 'another-secret'
+    assert default_app.config['JWT_SECRET_KEY'] != 'another-secret'
+    assert 'books.get_books' in other.view_functions
+    for name in ('response_cache', 'count_cache', 'token_cache'):
+        assert other.extensions[name] is not default_app.extensions[name]
+
+    with other.app_context():
+        db.create_all()
+        db.session.add(Book(title="Only here"))
+        db.session.commit()
+        assert db.engine.url.database.endswith('other.db')
+        db.engine.dispose()
+
+    response = other.test_client().get('/api/v1/books')
+    assert response.get_json()["data"]["pagination"]["total_items"] == 1
+
+
+def test_available_cores_is_positive():
+    assert available_cores() >= 1
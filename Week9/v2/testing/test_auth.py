@@ -0,0 +1,103 @@
+import time
+import pytest
+from app import app
+from models import User
+from utils.password_hashing import password_hasher, PasswordHasher, HashingBusy
+
+
+@pytest.fixture
+def cheap_hashing():
+    previous = {key: getattr(password_hasher, key) for key in ('method', 'workers', 'queue_depth')}
+    password_hasher.configure(method='pbkdf2:sha256:1000', workers=1, queue_depth=4)
+    yield password_hasher
+    password_hasher.shutdown()
+    password_hasher.configure(**previous)
+
+
+def register(client, email="a@example.com", password="secret"):
+    return client.post('/api/v1/auth/register', json={"name": "A", "email": email, "password": password})
+
+
+def login(client, email="a@example.com", password="secret"):
+    return client.post('/api/v1/auth/login', json={"email": email, "password": password})
+
+
+def stored_hash(email="a@example.com"):
+    with app.app_context():
+        return User.query.filter_by(email=email).one().password_hash
+
+
+def test_register_and_login_through_the_pool(client, cheap_hashing):
+    assert register(client).status_code == 201
+    assert stored_hash().startswith('pbkdf2:sha256:1000$')
+    assert login(client).status_code == 200
+    assert login(client, password="wrong").status_code == 401
+    assert cheap_hashing.stats()["verified"] == 2
+
+
+def test_login_rehashes_when_policy_changes(client, cheap_hashing):
+    register(client)
+    old = stored_hash()
+    cheap_hashing.configure(method='pbkdf2:sha256:2000')
+    assert login(client).status_code == 200
+    assert stored_hash().startswith('pbkdf2:sha256:2000$')
+    assert stored_hash() != old
+    # Already on the current policy: no second rehash
+    login(client)
+    assert cheap_hashing.stats()["hashed"] == 1
+
+
+def test_saturated_pool_answers_503(client, cheap_hashing):
+    register(client)
+    slots = [cheap_hashing._slots.acquire(blocking=False) for _ in range(5)]
+    assert all(slots)
+    try:
+        response = login(client)
+    finally:
+        for _ in slots:
+            cheap_hashing._slots.release()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert login(client).status_code == 200
+
+
+def test_needs_rehash_compares_full_method():
+    hasher = PasswordHasher(method='scrypt', workers=0)
+    assert not hasher.needs_rehash(hasher.hash("x"))
+    assert hasher.needs_rehash('pbkdf2:sha256:1000$salt$abc')
+    with pytest.raises(HashingBusy):
+        busy = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, queue_depth=0)
+        busy._slots.acquire()
+        busy.hash("x")
+
+
+def test_hash_timeout_is_busy_not_error():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000000', workers=1, queue_depth=0, timeout=0.01)
+    try:
+        with pytest.raises(HashingBusy):
+            hasher.hash("x")
+        assert hasher.stats()["rejected"] == 1
+        # The timed-out hash still runs and keeps its slot until it ends
+        assert not hasher._slots.acquire(blocking=False)
+        deadline = time.monotonic() + 30
+        while not hasher._slots.acquire(blocking=False):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        hasher._slots.release()
+    finally:
+        hasher.shutdown()
+
+
+def test_rehash_skipped_when_pool_is_busy(client, cheap_hashing, monkeypatch):
+    register(client)
+    cheap_hashing.configure(method='pbkdf2:sha256:2000')
+    calls = []
+
+    def busy(self, password):
+        calls.append(password)
+        raise HashingBusy("Password hashing is saturated")
+
+    monkeypatch.setattr(User, 'set_password', busy)
+    assert login(client).status_code == 200
+    assert calls
+    assert stored_hash().startswith('pbkdf2:sha256:1000$')  # upgraded on a later login
@@ -0,0 +1,69 @@
+from app import app, db
+from models import Book
+
+
+def seed_books(rows):
+    with app.app_context():
+        db.session.add_all([Book(**row) for row in rows])
+        db.session.commit()
+
+
+def walk(client, url, key='next_cursor'):
+    """Follow cursors until the end and return every page's items"""
+    pages = []
+    resp = client.get(url)
+    while True:
+        body = resp.get_json()
+        assert resp.status_code == 200, body
+        pages.append(body["data"]["items"])
+        cursor = body["data"]["pagination"][key]
+        if not cursor:
+            return pages
+        resp = client.get(f"{url.split('&cursor=')[0]}&cursor={cursor}")
+
+
+def test_get_books_offset(client):
+    client.post('/api/v1/books', json={"title": "Flask 101"})
+    response = client.get('/api/v1/books')
+    assert response.status_code == 200
+    assert response.get_json()["data"]["items"][0]["title"] == "Flask 101"
+
+
+def test_keyset_matches_offset_for_every_sort(client):
+    seed_books([
+        {"title": f"Book {i % 7}", "author": None if i % 5 == 0 else f"Author {i % 3}",
+         "category": ["Programming", "Database", None][i % 3], "is_available": i % 2 == 0}
+        for i in range(37)
+    ])
+    for sort_by in ['title', 'author', 'category', 'bookId']:
+        for order in ['asc', 'desc']:
+            base = f'/api/v1/books?sort_by={sort_by}&order={order}'
+            expected = client.get(f'{base}&per_page=50').get_json()["data"]["items"]
+            pages = walk(client, f'{base}&limit=5&cursor=')
+            assert [b for page in pages for b in page] == expected
+            assert all(len(page) <= 5 for page in pages)
+
+
+def test_keyset_honours_filters(client):
+    seed_books([{"title": f"Python {i}", "category": "Programming", "is_available": i % 2 == 0}
+                for i in range(12)] + [{"title": "Other", "category": "Database"}])
+    pages = walk(client, '/api/v1/books?category=Programming&available=true&limit=4&cursor=')
+    items = [b for page in pages for b in page]
+    assert len(items) == 6
+    assert all(b["is_available"] and b["category"] == "Programming" for b in items)
+
+
+def test_keyset_prev_page_keeps_order(client):
+    seed_books([{"title": f"T{i:02d}"} for i in range(10)])
+    first = client.get('/api/v1/books?limit=3&cursor=').get_json()
+    second = client.get(f'/api/v1/books?limit=3&cursor={first["data"]["pagination"]["next_cursor"]}').get_json()
+    back = client.get(f'/api/v1/books?limit=3&cursor={second["data"]["pagination"]["prev_cursor"]}').get_json()
+    assert back["data"]["items"] == first["data"]["items"]
+    assert back["data"]["pagination"]["has_prev"] is False
+
+
+def test_keyset_rejects_tampered_or_mismatched_cursor(client):
+    seed_books([{"title": f"T{i}"} for i in range(5)])
+    cursor = client.get('/api/v1/books?limit=2&cursor=').get_json()["data"]["pagination"]["next_cursor"]
+    assert client.get(f'/api/v1/books?limit=2&cursor={cursor}x').status_code == 400
+    assert client.get(f'/api/v1/books?limit=2&sort_by=author&cursor={cursor}').status_code == 400
@@ -0,0 +1,112 @@
+from datetime import datetime
+from app import app, db
+from models import Book, User, BorrowRecord
+from utils.jwt_helper import create_access_token
+from utils.query_counter import count_queries, assert_num_queries
+
+
+def seed(borrows):
+    with app.app_context():
+        db.session.add_all([User(name=f"User {i}", email=f"u{i}@example.com", password_hash="x") for i in range(10)])
+        db.session.add_all([Book(title=f"Book {i}") for i in range(60)])
+        db.session.add_all([BorrowRecord(user_id=i % 10 + 1, book_id=i + 1, borrow_date=datetime(2024, 1, 1 + i % 28))
+                            for i in range(borrows)])
+        db.session.commit()
+        return db.engine, {"Authorization": f"Bearer {create_access_token('1')}"}
+
+
+def list_page_queries(client, engine, per_page):
+    app.extensions['response_cache'].clear()
+    with count_queries(engine) as counter:
+        body = client.get(f'/api/v1/borrows?per_page={per_page}').get_json()
+    assert len(body["data"]["items"]) == per_page
+    assert body["data"]["items"][0]["user"].startswith("User")
+    return counter.count
+
+
+def test_borrows_page_runs_constant_queries(client):
+    engine, _ = seed(50)
+    # table_version + COUNT + page; the count is cached on the second call
+    assert list_page_queries(client, engine, 50) == 3
+    assert list_page_queries(client, engine, 5) == 2
+
+
+def test_create_and_return_do_not_lazy_load(client):
+    engine, headers = seed(0)
+    # UPDATE book, INSERT record, facet upserts, table_version bump
+    with count_queries(engine) as counter:
+        created = client.post('/api/v1/borrows', json={"user_id": 1, "book_id": 1}, headers=headers)
+    assert created.status_code == 201
+    assert created.get_json()["book"] == "Book 0"
+    assert created.get_json()["user"] == "User 0"
+    assert counter.count == 5
+    assert not any(sql.lstrip().startswith('SELECT') for sql in counter.statements)
+
+    # UPDATE record, UPDATE book, facet upserts, table_version bump
+    with assert_num_queries(engine, 5):
+        returned = client.put(f'/api/v1/borrows/{created.get_json()["id"]}/return')
+    assert returned.get_json()["user"] == "User 0"
+
+
+def test_borrow_conflict_and_not_found(client):
+    _, headers = seed(0)
+    assert client.post('/api/v1/borrows', json={"user_id": 1, "book_id": 1}, headers=headers).status_code == 201
+    assert client.post('/api/v1/borrows', json={"user_id": 2, "book_id": 1}, headers=headers).status_code == 409
+    assert client.post('/api/v1/borrows', json={"user_id": 1, "book_id": 999}, headers=headers).status_code == 404
+
+
+def test_missing_user_leaves_book_available(client):
+    _, headers = seed(0)
+    response = client.post('/api/v1/borrows', json={"user_id": 999, "book_id": 2}, headers=headers)
+    assert response.status_code == 404
+    with app.app_context():
+        assert db.session.get(Book, 2).is_available is True
+        assert BorrowRecord.query.count() == 0
+
+
+def test_return_twice_conflicts(client):
+    _, headers = seed(0)
+    record_id = client.post('/api/v1/borrows', json={"user_id": 1, "book_id": 3}, headers=headers).get_json()["id"]
+    assert client.put(f'/api/v1/borrows/{record_id}/return').status_code == 200
+    assert client.put(f'/api/v1/borrows/{record_id}/return').status_code == 409
+    assert client.put('/api/v1/borrows/999/return').status_code == 404
+    with app.app_context():
+        assert db.session.get(Book, 3).is_available is True
+
+
+def test_batch_borrow_reports_each_book(client):
+    engine, headers = seed(0)
+    client.post('/api/v1/borrows', json={"user_id": 2, "book_id": 2}, headers=headers)
+
+    # user check, UPDATE ... IN, INSERT records, facet upserts, table_version bump, conflict lookup
+    with count_queries(engine) as counter:
+        response = client.post('/api/v1/borrows/batch',
+                               json={"user_id": 1, "book_ids": [1, 2, 999, 3, 1]}, headers=headers)
+    assert counter.count <= 8
+    body = response.get_json()["data"]
+    assert [(item["book_id"], item["status"]) for item in body["items"]] == [(1, 201), (2, 409), (999, 404), (3, 201)]
+    assert body["items"][0]["borrow"]["user"] == "User 0"
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    with app.app_context():
+        assert BorrowRecord.query.filter_by(user_id=1).count() == 2
+
+
+def test_batch_return_only_touches_own_borrows(client):
+    _, headers = seed(0)
+    client.post('/api/v1/borrows/batch', json={"user_id": 1, "book_ids": [1, 2]}, headers=headers)
+    client.post('/api/v1/borrows', json={"user_id": 2, "book_id": 3}, headers=headers)
+
+    body = client.put('/api/v1/borrows/return/batch', json={"user_id": 1, "book_ids": [1, 2, 3]}).get_json()["data"]
+    assert [(item["book_id"], item["status"]) for item in body["items"]] == [(1, 200), (2, 200), (3, 409)]
+    assert body["items"][1]["borrow"]["book"] == "Book 1"
+    with app.app_context():
+        assert [db.session.get(Book, i).is_available for i in (1, 2, 3)] == [True, True, False]
+
+
+def test_batch_validation(client):
+    _, headers = seed(0)
+    assert client.post('/api/v1/borrows/batch', json={"user_id": 1}, headers=headers).status_code == 400
+    assert client.post('/api/v1/borrows/batch', json={"user_id": 1, "book_ids": ["a"]}, headers=headers).status_code == 400
+    assert client.post('/api/v1/borrows/batch', json={"user_id": 1, "book_ids": list(range(1, 100))},
+                       headers=headers).status_code == 400
+    assert client.post('/api/v1/borrows/batch', json={"user_id": 99, "book_ids": [1]}, headers=headers).status_code == 404
@@ -0,0 +1,46 @@
+import json
+from app import app
+from models import Book
+
+
+def test_bulk_import_ndjson_in_batches(client):
+    lines = [json.dumps({"title": f"Book {i}", "author": "A", "category": "Bulk"}) for i in range(25)]
+    lines.insert(3, '{"author": "no title"}')
+    lines.insert(7, 'not json')
+    resp = client.post('/api/v1/books/bulk?batch_size=10', data="\n".join(lines),
+                       content_type='application/x-ndjson')
+    report = resp.get_json()["data"]
+    assert resp.status_code == 200
+    assert (report["received"], report["inserted"], report["failed"], report["batches"]) == (27, 25, 2, 3)
+    assert [e["line"] for e in report["errors"]] == [4, 8]
+    assert report["rows_per_second"] > 0
+
+    with app.app_context():
+        assert Book.query.count() == 25
+    facets = client.get('/api/v1/books/facets').get_json()["data"]
+    assert facets["categories"] == [{"category": "Bulk", "count": 25, "available": 25, "borrowed": 0}]
+    assert len(client.get('/api/v1/books?search=book&per_page=50').get_json()["data"]["items"]) == 25
+
+
+def test_bulk_import_csv(client):
+    body = "title,author,category\nClean Code,Robert Martin,Programming\n,Nobody,X\n"
+    report = client.post('/api/v1/books/bulk', data=body, content_type='text/csv').get_json()["data"]
+    assert report["inserted"] == 1
+    assert report["errors"] == [{"line": 3, "error": "Title is required"}]
+
+
+def test_bulk_import_rejects_unknown_content_type(client):
+    assert client.post('/api/v1/books/bulk', json=[{"title": "x"}]).status_code == 415
+
+
+def test_bulk_import_rejects_non_utf8_body(client):
+    body = b'{"title": "Ok"}\n{"title": "Caf\xe9"}\n{"title": "Never read"}\n'
+    resp = client.post('/api/v1/books/bulk?batch_size=1', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 400
+    assert resp.get_json()["errors"][0]["line"] == 2
+    assert "1 rows were imported" in resp.get_json()["meta"]["message"]
+
+    csv_body = b'title,author\nOk,A\nCaf\xe9,B\n'
+    resp = client.post('/api/v1/books/bulk', data=csv_body, content_type='text/csv')
+    assert resp.status_code == 400
+    assert resp.get_json()["errors"][0]["line"] == 3
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import create_engine, text
+from database import sqlite_pragmas, engine_options, install_pragmas, DEFAULT_PRAGMAS
+
+
+def test_pragmas_come_from_env():
+    pragmas = sqlite_pragmas({"SQLITE_SYNCHRONOUS": "FULL", "SQLITE_BUSY_TIMEOUT": "100"})
+    assert pragmas["synchronous"] == "FULL"
+    assert pragmas["busy_timeout"] == "100"
+    assert pragmas["journal_mode"] == DEFAULT_PRAGMAS["journal_mode"]
+
+
+def test_pragma_values_are_validated():
+    with pytest.raises(ValueError):
+        sqlite_pragmas({"SQLITE_JOURNAL_MODE": "WAL; DROP TABLE book"})
+
+
+def test_pool_options_skip_memory_databases():
+    assert engine_options('sqlite:///:memory:', {}) == {}
+    options = engine_options('sqlite:///library.db', {"DB_POOL_SIZE": "8"})
+    assert options["pool_size"] == 8
+    assert options["max_overflow"] == 10
+
+
+def test_every_connection_gets_the_profile(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}", **engine_options('sqlite:///file', {}))
+    install_pragmas(engine, sqlite_pragmas({}))
+    with engine.connect() as first, engine.connect() as second:
+        for connection in (first, second):
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert connection.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+    engine.dispose()
@@ -0,0 +1,58 @@
+import pytest
+from app import app, db
+from models import User
+from utils.jwt_helper import create_access_token
+
+
+def auth_header():
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token('1')}"}
+
+
+def test_list_etag_304_until_books_change(client):
+    client.post('/api/v1/books', json={"title": "Python"})
+    first = client.get('/api/v1/books?page=1&per_page=5')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+
+    again = client.get('/api/v1/books?per_page=5&page=1', headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    other_query = client.get('/api/v1/books?per_page=6', headers={"If-None-Match": etag})
+    assert other_query.status_code == 200
+
+    client.post('/api/v1/books', json={"title": "Go"})
+    changed = client.get('/api/v1/books?page=1&per_page=5', headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_row_etag_changes_on_borrow_and_return(client):
+    with app.app_context():
+        db.session.add(User(name="Alice", email="alice@example.com", password_hash="x"))
+        db.session.commit()
+    book_id = client.post('/api/v1/books', json={"title": "Python"}).get_json()["bookId"]
+    etag = client.get(f'/api/v1/books/{book_id}').headers['ETag']
+    assert client.get(f'/api/v1/books/{book_id}', headers={"If-None-Match": etag}).status_code == 304
+
+    borrow = client.post('/api/v1/borrows', json={"user_id": 1, "book_id": book_id}, headers=auth_header())
+    borrowed = client.get(f'/api/v1/books/{book_id}', headers={"If-None-Match": etag})
+    assert borrowed.status_code == 200
+    assert borrowed.get_json()["is_available"] is False
+
+    client.put(f'/api/v1/borrows/{borrow.get_json()["id"]}/return')
+    returned = client.get(f'/api/v1/books/{book_id}', headers={"If-None-Match": borrowed.headers['ETag']})
+    assert returned.status_code == 200
+    assert returned.get_json()["is_available"] is True
+
+
+def test_row_304_reads_only_the_version(client, monkeypatch):
+    book_id = client.post('/api/v1/books', json={"title": "Python"}).get_json()["bookId"]
+    etag = client.get(f'/api/v1/books/{book_id}').headers['ETag']
+    app.extensions['response_cache'].clear()
+
+    monkeypatch.setattr(db.session, 'get', lambda *args, **kwargs: pytest.fail("row loaded for a 304"))
+    assert client.get(f'/api/v1/books/{book_id}', headers={"If-None-Match": etag}).status_code == 304
+    monkeypatch.undo()
+    assert client.get('/api/v1/books/999', headers={"If-None-Match": etag}).status_code == 404
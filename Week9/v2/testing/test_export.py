@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from datetime import datetime
+from app import app, db
+from models import Book, User, BorrowRecord
+from utils import export
+
+
+def seed():
+    with app.app_context():
+        db.session.add_all([Book(title=f"Book {i}", category="Programming" if i % 2 else "Database")
+                            for i in range(1, 1201)])
+        db.session.add(User(name="Alice", email="alice@example.com", password_hash="x"))
+        db.session.add(BorrowRecord(user_id=1, book_id=1, borrow_date=datetime(2024, 1, 1)))
+        db.session.commit()
+
+
+def test_export_books_ndjson_streams_every_row(client):
+    seed()
+    resp = client.get('/api/v1/books/export')
+    assert resp.is_streamed
+    assert resp.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert len(rows) == 1200
+    assert rows[0] == {"bookId": 1, "title": "Book 1", "author": None, "category": "Programming", "is_available": True}
+
+
+def test_export_honours_list_filters(client):
+    seed()
+    body = client.get('/api/v1/books/export?format=csv&category=Database').get_data(as_text=True)
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(rows) == 600
+    assert {row["category"] for row in rows} == {"Database"}
+
+
+def test_export_users_and_borrows(client):
+    seed()
+    users = client.get('/api/v1/users/export?search=alice').get_data(as_text=True).splitlines()
+    assert json.loads(users[0]) == {"userId": 1, "name": "Alice", "email": "alice@example.com"}
+
+    borrows = client.get('/api/v1/borrows/export?is_returned=false').get_data(as_text=True).splitlines()
+    assert json.loads(borrows[0])["book"] == "Book 1"
+    assert json.loads(borrows[0])["borrow_date"] == "2024-01-01T00:00:00"
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get('/api/v1/books/export?format=xml').status_code == 400
+
+
+def test_csv_chunks_are_bounded():
+    chunks = list(export.csv_chunks(((i, f"t{i}") for i in range(1200)), ["id", "title"]))
+    assert len(chunks) == 3
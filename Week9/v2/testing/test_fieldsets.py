@@ -0,0 +1,39 @@
+from datetime import datetime
+from app import app, db
+from models import Book, User, BorrowRecord
+
+
+def seed():
+    with app.app_context():
+        db.session.add_all([Book(title=f"Book {i:02d}", author="A") for i in range(12)])
+        db.session.add(User(name="Alice", email="alice@example.com", password_hash="x"))
+        db.session.add(BorrowRecord(user_id=1, book_id=1, borrow_date=datetime(2024, 1, 1)))
+        db.session.commit()
+
+
+def test_books_fields_offset_and_keyset(client):
+    seed()
+    body = client.get('/api/v1/books?fields=bookId,title&per_page=3').get_json()
+    assert body["data"]["items"][0] == {"bookId": 1, "title": "Book 00"}
+    assert body["data"]["pagination"]["total_items"] == 12
+
+    first = client.get('/api/v1/books?fields=title&limit=5&cursor=').get_json()
+    assert first["data"]["items"][0] == {"title": "Book 00"}
+    cursor = first["data"]["pagination"]["next_cursor"]
+    second = client.get(f'/api/v1/books?fields=title&limit=5&cursor={cursor}').get_json()
+    assert second["data"]["items"][0] == {"title": "Book 05"}
+
+
+def test_users_and_borrows_fields(client):
+    seed()
+    users = client.get('/api/v1/users?fields=email').get_json()
+    assert users["data"]["items"] == [{"email": "alice@example.com"}]
+
+    borrows = client.get('/api/v1/borrows?fields=book,borrow_date').get_json()
+    assert borrows["data"]["items"] == [{"book": "Book 00", "borrow_date": "2024-01-01T00:00:00"}]
+
+
+def test_unknown_field_is_rejected(client):
+    resp = client.get('/api/v1/books?fields=title,password_hash')
+    assert resp.status_code == 400
+    assert "bookId" in resp.get_json()["allowed_fields"]
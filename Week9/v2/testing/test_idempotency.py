@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta
+from app import app, db
+from models import Payment, IdempotencyKey
+from utils.jwt_helper import create_access_token
+from utils import idempotency
+
+BODY = {"book_id": "1", "amount": 10.0, "currency": "USD", "payment_method": "card"}
+
+
+def headers(key, user='1'):
+    with app.app_context():
+        token = create_access_token(user)
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+
+def payment_count():
+    with app.app_context():
+        return Payment.query.count()
+
+
+def test_retry_replays_stored_response(client):
+    first = client.post('/api/v2/payments/book', json=BODY, headers=headers("k1"))
+    retry = client.post('/api/v2/payments/book', json=BODY, headers=headers("k1"))
+    assert first.status_code == retry.status_code == 202
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert payment_count() == 1
+
+
+def test_keys_are_scoped_per_user(client):
+    client.post('/api/v2/payments/book', json=BODY, headers=headers("shared", user='1'))
+    other = client.post('/api/v2/payments/book', json=BODY, headers=headers("shared", user='2'))
+    assert 'Idempotent-Replayed' not in other.headers
+    assert payment_count() == 2
+
+
+def test_reused_key_with_different_body_is_rejected(client):
+    client.post('/api/v2/payments/book', json=BODY, headers=headers("k2"))
+    response = client.post('/api/v2/payments/book', json={**BODY, "amount": 99}, headers=headers("k2"))
+    assert response.status_code == 422
+    assert payment_count() == 1
+
+
+def test_failed_request_releases_the_key(client):
+    assert client.post('/api/v2/payments/book', json={"book_id": "1"}, headers=headers("k3")).status_code == 400
+    assert client.post('/api/v2/payments/book', json=BODY, headers=headers("k3")).status_code == 202
+
+
+def test_in_flight_key_answers_409(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDEMPOTENCY_WAIT', 0.1)
+    # Another worker holds the key and has not finished yet
+    digest = idempotency.fingerprint('POST', '/api/v2/payments/book', json.dumps(BODY).encode())
+    with app.app_context():
+        db.session.add(IdempotencyKey(scope='1', key='busy', fingerprint=digest,
+                                      expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+    response = client.post('/api/v2/payments/book', json=BODY, headers=headers("busy"))
+    assert response.status_code == 409
+    assert payment_count() == 0
+
+
+def test_expired_keys_are_evicted_and_reusable(client):
+    client.post('/api/v2/payments/book', json=BODY, headers=headers("old"))
+    with app.app_context():
+        row = db.session.get(IdempotencyKey, ('1', 'old'))
+        row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert idempotency.evict_expired(db.session) == 1
+    response = client.post('/api/v2/payments/book', json=BODY, headers=headers("old"))
+    assert 'Idempotent-Replayed' not in response.headers
+    assert payment_count() == 2
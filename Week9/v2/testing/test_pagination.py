@@ -0,0 +1,53 @@
+from app import app, db
+from models import Book, User
+
+
+def seed(rows):
+    with app.app_context():
+        db.session.add_all(rows)
+        db.session.commit()
+
+
+def test_include_total_false_probes_next_page(client):
+    seed([Book(title=f"Book {i}") for i in range(12)])
+    body = client.get('/api/v1/books?per_page=5&page=2&include_total=false').get_json()
+    pagination = body["data"]["pagination"]
+    assert len(body["data"]["items"]) == 5
+    assert pagination["has_next"] is True
+    assert pagination["total_items"] is None
+    assert pagination["links"]["last"] is None
+
+    last = client.get('/api/v1/books?per_page=5&page=3&include_total=false').get_json()
+    assert len(last["data"]["items"]) == 2
+    assert last["data"]["pagination"]["has_next"] is False
+
+
+def test_count_is_cached_per_filter_signature(client):
+    seed([Book(title=f"Python {i}", category="Programming") for i in range(3)])
+    client.get('/api/v1/books?category=Programming&page=1')
+    client.get('/api/v1/books?page=1&category=Programming&sort_by=author')
+    stats = app.extensions['count_cache'].stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_count_cache_invalidated_on_write(client):
+    seed([Book(title="A")])
+    assert client.get('/api/v1/books').get_json()["data"]["pagination"]["total_items"] == 1
+    client.post('/api/v1/books', json={"title": "B"})
+    assert client.get('/api/v1/books').get_json()["data"]["pagination"]["total_items"] == 2
+
+
+def test_users_count_ignores_book_writes(client):
+    seed([User(name="Alice", email="alice@example.com", password_hash="x")])
+    client.get('/api/v1/users')
+    client.post('/api/v1/books', json={"title": "B"})
+    client.get('/api/v1/users?sort_by=email')
+    assert app.extensions['count_cache'].stats()["hits"] == 1
+
+
+def test_count_key_keeps_whitespace_the_filter_sees(client):
+    seed([Book(title="A", category="Programming"), Book(title="B", category="Web Programming")])
+    assert client.get('/api/v1/books?category=Programming').get_json()["data"]["pagination"]["total_items"] == 2
+    assert client.get('/api/v1/books?category=%20Programming').get_json()["data"]["pagination"]["total_items"] == 1
+    assert app.extensions['count_cache'].stats()["hits"] == 0
@@ -0,0 +1,118 @@
+import time
+from datetime import datetime, timedelta
+
+from app import app, create_app, db
+from models import Payment, PaymentDailyTotal
+from utils import payment_pipeline
+from utils.jwt_helper import create_access_token
+from utils.payment_pipeline import FakeProcessor
+
+BODY = {"book_id": "1", "amount": 10.0, "currency": "USD", "payment_method": "card"}
+
+
+def auth(application=app):
+    with application.app_context():
+        return {"Authorization": f"Bearer {create_access_token('1')}"}
+
+
+def totals():
+    return {row.status: (row.count, row.amount) for row in PaymentDailyTotal.query if row.count}
+
+
+def test_create_is_accepted_as_pending(client):
+    response = client.post('/api/v2/payments/book', json=BODY, headers=auth())
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status"] == "pending"
+    assert response.headers["Location"] == f"/api/v2/payments/book/{body['id']}"
+
+    status = client.get(response.headers["Location"], headers=auth())
+    assert status.get_json()["status"] == "pending"
+    assert status.headers["Retry-After"] == "1"
+
+
+def test_replayed_create_keeps_location(client):
+    headers = {**auth(), "Idempotency-Key": "pay-1"}
+    first = client.post('/api/v2/payments/book', json=BODY, headers=headers)
+    retry = client.post('/api/v2/payments/book', json=BODY, headers=headers)
+    assert retry.status_code == 202
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.headers["Location"] == first.headers["Location"]
+
+
+def test_process_batch_settles_and_moves_rollup(client):
+    for _ in range(5):
+        client.post('/api/v2/payments/book', json=BODY, headers=auth())
+
+    with app.app_context():
+        assert totals() == {"pending": (5, 50.0)}
+        processor = FakeProcessor(latency=0)
+        assert payment_pipeline.process_batch(db.session, processor, batch_size=3) == 3
+        assert payment_pipeline.process_batch(db.session, processor, batch_size=3) == 2
+        assert payment_pipeline.process_batch(db.session, processor, batch_size=3) == 0
+        assert {p.status for p in Payment.query} == {"succeeded"}
+        assert all(p.claimed_at is None for p in Payment.query)
+        assert totals() == {"succeeded": (5, 50.0)}
+
+
+def test_claims_respect_the_lease(client):
+    client.post('/api/v2/payments/book', json=BODY, headers=auth())
+    with app.app_context():
+        rows = payment_pipeline.claim_batch(db.session, 10, lease_seconds=60)
+        assert len(rows) == 1
+        # Leased by another worker: nothing to claim
+        assert payment_pipeline.claim_batch(db.session, 10, lease_seconds=60) == []
+
+        # That worker stalled past its lease: the row is taken over
+        db.session.query(Payment).update({"claimed_at": datetime.utcnow() - timedelta(seconds=120)})
+        db.session.commit()
+        stale = rows[0]
+        taken = payment_pipeline.claim_batch(db.session, 10, lease_seconds=60)
+        assert [row.id for row in taken] == [stale.id]
+
+        # The stalled worker's late result no longer applies
+        assert payment_pipeline.settle(db.session, [(stale, "failed")]) == 0
+        assert payment_pipeline.settle(db.session, [(taken[0], "succeeded")]) == 1
+        assert db.session.get(Payment, stale.id).status == "succeeded"
+
+
+def test_long_poll_returns_when_worker_settles(tmp_path):
+    other = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'payments.db'}",
+        'TESTING': True,
+        'PAYMENT_WORKERS': 2,
+        'PAYMENT_PROCESSOR_LATENCY': 0.2,
+    })
+    with other.app_context():
+        db.create_all()
+    client = other.test_client()
+    headers = auth(other)
+    try:
+        created = client.post('/api/v2/payments/book', json=BODY, headers=headers)
+        assert created.status_code == 202
+
+        started = time.monotonic()
+        polled = client.get(created.headers["Location"] + "?wait=10", headers=headers)
+        assert polled.get_json()["status"] == "succeeded"
+        assert time.monotonic() - started < 5
+        assert "Retry-After" not in polled.headers
+
+        # Already final: answers at once
+        started = time.monotonic()
+        again = client.get(created.headers["Location"] + "?wait=10&status=pending", headers=headers)
+        assert again.get_json()["status"] == "succeeded"
+        assert time.monotonic() - started < 1
+    finally:
+        payment_pipeline.worker_pool.stop()
+        with other.app_context():
+            db.engine.dispose()
+
+
+def test_long_poll_times_out_and_validates(client):
+    payment_id = client.post('/api/v2/payments/book', json=BODY, headers=auth()).get_json()["id"]
+    started = time.monotonic()
+    response = client.get(f'/api/v2/payments/book/{payment_id}?wait=0.3', headers=auth())
+    assert response.get_json()["status"] == "pending"
+    assert time.monotonic() - started >= 0.3
+    assert client.get(f'/api/v2/payments/book/{payment_id}?wait=soon', headers=auth()).status_code == 400
+    assert client.get('/api/v2/payments/book/999?wait=0.1', headers=auth()).status_code == 404
@@ -0,0 +1,95 @@
+from datetime import datetime
+from app import app, db
+from models import Payment, PaymentDailyTotal
+from utils.jwt_helper import create_access_token
+from utils import payment_rollup
+
+
+def auth():
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token('1')}"}
+
+
+def seed_payments(n=25):
+    with app.app_context():
+        # Every third pair shares a timestamp to exercise the id tie-breaker
+        db.session.add_all([Payment(user_id=i % 3 + 1, book_id=i + 1, amount=10.0, payment_method="card",
+                                    currency="USD" if i % 2 else "VND",
+                                    status="refunded" if i % 5 == 0 else "succeeded",
+                                    created_at=datetime(2024, 3, 1, 12, i // 2))
+                            for i in range(n)])
+        db.session.flush()
+        # Rows inserted behind the routes' back: backfill like the migration does
+        payment_rollup.rebuild(db.session)
+        db.session.commit()
+
+
+def walk(client, url, headers):
+    ids, pages = [], 0
+    while url:
+        body = client.get(url, headers=headers).get_json()["data"]
+        ids += [item["id"] for item in body["items"]]
+        url = body["pagination"]["links"]["next"]
+        pages += 1
+    return ids, pages
+
+
+def test_ledger_walks_every_payment_newest_first(client):
+    seed_payments()
+    headers = auth()
+    ids, pages = walk(client, '/api/v2/payments?limit=10', headers)
+    with app.app_context():
+        expected = [p.id for p in Payment.query.order_by(Payment.created_at.desc(), Payment.id.desc())]
+    assert ids == expected
+    assert pages == 3
+
+
+def test_ledger_prev_cursor_and_filters(client):
+    seed_payments()
+    headers = auth()
+    first = client.get('/api/v2/payments?limit=5', headers=headers).get_json()["data"]
+    second = client.get(first["pagination"]["links"]["next"], headers=headers).get_json()["data"]
+    back = client.get(second["pagination"]["links"]["prev"], headers=headers).get_json()["data"]
+    assert [i["id"] for i in back["items"]] == [i["id"] for i in first["items"]]
+
+    filtered = client.get('/api/v2/payments?status=refunded&currency=VND&user_id=1&limit=100&fields=id,status',
+                          headers=headers).get_json()["data"]["items"]
+    assert filtered and all(set(item) == {"id", "status"} and item["status"] == "refunded" for item in filtered)
+
+
+def test_ledger_rejects_tampered_cursor(client):
+    response = client.get('/api/v2/payments?cursor=abc', headers=auth())
+    assert response.status_code == 400
+
+
+def test_summary_follows_writes_without_scanning(client):
+    headers = auth()
+    for amount, currency in ((10.0, "USD"), (5.5, "USD"), (20000, "VND")):
+        client.post('/api/v2/payments/book', headers=headers,
+                    json={"book_id": "1", "amount": amount, "currency": currency, "payment_method": "card"})
+
+    body = client.get('/api/v2/payments/summary?group_by=currency', headers=headers).get_json()["data"]
+    assert body["rows"] == [{"currency": "USD", "count": 2, "amount": 15.5},
+                            {"currency": "VND", "count": 1, "amount": 20000.0}]
+    assert body["total"] == {"count": 3, "amount_by_currency": {"USD": 15.5, "VND": 20000.0}}
+
+    # The incrementally maintained rollup matches a full rebuild
+    with app.app_context():
+        maintained = sorted((r.day, r.currency, r.status, r.count, r.amount) for r in PaymentDailyTotal.query)
+        payment_rollup.rebuild(db.session)
+        rebuilt = sorted((r.day, r.currency, r.status, r.count, r.amount) for r in PaymentDailyTotal.query)
+        db.session.rollback()
+    assert maintained == rebuilt
+
+
+def test_summary_by_day_and_validation(client):
+    seed_payments()
+    headers = auth()
+    body = client.get('/api/v2/payments/summary?group_by=day,status&from=2024-03-01&to=2024-03-01',
+                      headers=headers).get_json()["data"]
+    assert {row["status"]: row["count"] for row in body["rows"]} == {"refunded": 5, "succeeded": 20}
+    assert body["rows"][0]["day"] == "2024-03-01"
+    assert body["total"]["amount_by_currency"] is None
+
+    assert client.get('/api/v2/payments/summary?group_by=hour', headers=headers).status_code == 400
+    assert client.get('/api/v2/payments/summary?from=03/01/2024', headers=headers).status_code == 400
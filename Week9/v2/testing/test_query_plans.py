@@ -0,0 +1,84 @@
+from datetime import datetime
+import pytest
+from app import app, db
+from models import Book, User, BorrowRecord, Payment
+from utils import query_plans
+from utils.jwt_helper import create_access_token
+
+TABLES = ['book', 'user', 'borrow_record', 'payment']
+
+# Every list endpoint / filter / sort combination that must stay index-backed.
+# Substring filters (?category=, ILIKE fallbacks) cannot use a b-tree index
+# and are intentionally not listed.
+LIST_URLS = [
+    '/api/v1/books',
+    '/api/v1/books?sort_by=author&order=desc',
+    '/api/v1/books?sort_by=category',
+    '/api/v1/books?sort_by=bookId&order=desc',
+    '/api/v1/books?available=true',
+    '/api/v1/books?available=false&include_total=false',
+    '/api/v1/books?cursor=&limit=20',
+    '/api/v1/books?cursor=&sort_by=author&order=desc&fields=bookId,title',
+    '/api/v1/books/facets?available=true',
+    '/api/v1/users',
+    '/api/v1/users?sort_by=email&order=desc',
+    '/api/v1/borrows',
+    '/api/v1/borrows?is_returned=false',
+    '/api/v1/borrows?sort_by=return_date',
+    '/api/v2/payments',
+    '/api/v2/payments?order=asc&limit=50',
+    '/api/v2/payments?user_id=7',
+    '/api/v2/payments?status=refunded',
+    '/api/v2/payments?currency=USD&fields=id,amount',
+    '/api/v2/payments/summary?group_by=day,currency',
+]
+
+
+# Walking the rowid b-tree in id order is reported as a bare SCAN but stops
+# after LIMIT rows, so it is not a full scan.
+ALLOWED_STEPS = {
+    '/api/v1/books?sort_by=bookId&order=desc': {'SCAN book'},
+}
+
+
+@pytest.fixture
+def seeded_client(client):
+    with app.app_context():
+        db.session.add_all([Book(title=f"Book {i}", author=f"Author {i % 50}",
+                                 category=f"Category {i % 10}", is_available=i % 3 != 0)
+                            for i in range(2000)])
+        db.session.add_all([User(name=f"User {i}", email=f"user{i}@example.com", password_hash="x")
+                            for i in range(200)])
+        db.session.add_all([BorrowRecord(user_id=i % 200 + 1, book_id=i % 2000 + 1,
+                                         borrow_date=datetime(2024, 1, 1 + i % 28), is_returned=i % 2 == 0)
+                            for i in range(3000)])
+        db.session.add_all([Payment(user_id=i % 200 + 1, book_id=i % 2000 + 1, amount=10.0 + i % 7,
+                                    currency=('VND', 'USD', 'EUR')[i % 3], payment_method="card",
+                                    status='refunded' if i % 50 == 0 else 'succeeded',
+                                    created_at=datetime(2024, 1, 1 + i % 28, i % 24))
+                            for i in range(3000)])
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+    return client
+
+
+@pytest.mark.parametrize('url', LIST_URLS)
+def test_list_endpoint_plans_use_indexes(seeded_client, url):
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token('1')}"}
+        with query_plans.capture_selects(db.engine) as statements:
+            assert seeded_client.get(url, headers=headers).status_code == 200
+        assert statements
+
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                plan = query_plans.explain(connection, statement, parameters)
+                problems = set(query_plans.regressions(plan, TABLES)) - ALLOWED_STEPS.get(url, set())
+                assert not problems, (statement, plan)
+
+
+def test_regressions_flags_full_scans_and_sorts():
+    assert query_plans.regressions(['SCAN book'], TABLES) == ['SCAN book']
+    assert query_plans.regressions(['SCAN book USING INDEX ix_book_title'], TABLES) == []
+    assert query_plans.regressions(['SCAN book_fts_match'], TABLES) == []
+    assert query_plans.regressions(['USE TEMP B-TREE FOR ORDER BY'], TABLES) == ['USE TEMP B-TREE FOR ORDER BY']
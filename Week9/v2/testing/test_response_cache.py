@@ -0,0 +1,71 @@
+from app import app, create_app, db
+from models import Book, User
+from utils.jwt_helper import create_access_token
+from utils.response_cache import ResponseCache
+
+
+def test_repeated_list_request_is_a_hit(client):
+    client.post('/api/v1/books', json={"title": "Python", "category": "Programming"})
+    first = client.get('/api/v1/books?category=Programming&page=1')
+    second = client.get('/api/v1/books?page=1&category=Programming')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert app.extensions['response_cache'].stats()["hits"] == 1
+
+
+def test_borrow_invalidates_cached_book(client):
+    with app.app_context():
+        db.session.add(User(name="Alice", email="alice@example.com", password_hash="x"))
+        db.session.commit()
+        token = create_access_token('1')
+    book_id = client.post('/api/v1/books', json={"title": "Python"}).get_json()["bookId"]
+    assert client.get(f'/api/v1/books/{book_id}').get_json()["is_available"] is True
+    assert client.get(f'/api/v1/books/{book_id}').headers['X-Cache'] == 'HIT'
+
+    client.post('/api/v1/borrows', json={"user_id": 1, "book_id": book_id},
+                headers={"Authorization": f"Bearer {token}"})
+    after = client.get(f'/api/v1/books/{book_id}')
+    assert after.headers['X-Cache'] == 'MISS'
+    assert after.get_json()["is_available"] is False
+    assert client.get('/api/v1/borrows').get_json()["data"]["items"][0]["book"] == "Python"
+
+
+def test_user_writes_do_not_evict_book_entries(client):
+    client.get('/api/v1/books')
+    client.post('/api/v1/users', json={"name": "Bob", "email": "bob@example.com"})
+    assert client.get('/api/v1/books').headers['X-Cache'] == 'HIT'
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    for key in ('a', 'b', 'c'):
+        cache.set((key,), (0,), b'{}', 200, {})
+    assert cache.get(('a',), (0,)) is None
+    assert cache.get(('c',), (0,)) is not None
+    assert cache.get(('c',), (1,)) is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = ResponseCache(ttl=0)
+    expired.set(('a',), (0,), b'{}', 200, {})
+    assert expired.get(('a',), (0,)) is None
+
+
+def test_instances_with_different_databases_do_not_share_entries(tmp_path):
+    titles = {}
+    for name in ('a', 'b'):
+        instance = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / name}.db", 'TESTING': True})
+        with instance.app_context():
+            db.create_all()
+            db.session.add_all([Book(title=f"Only in {name}") for _ in range(2 if name == 'a' else 1)])
+            db.session.commit()
+        titles[name] = instance
+
+    responses = {name: instance.test_client().get('/api/v1/books') for name, instance in titles.items()}
+    assert responses['b'].headers['X-Cache'] == 'MISS'
+    assert [b["title"] for b in responses['b'].get_json()["data"]["items"]] == ["Only in b"]
+    assert responses['b'].get_json()["data"]["pagination"]["total_items"] == 1
+    assert titles['a'].test_client().get('/api/v1/books').headers['X-Cache'] == 'HIT'
+    for instance in titles.values():
+        with instance.app_context():
+            db.engine.dispose()
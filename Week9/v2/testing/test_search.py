@@ -0,0 +1,66 @@
+from app import app, db
+from models import Book, User
+from utils import fulltext
+
+
+def seed(rows):
+    with app.app_context():
+        db.session.add_all(rows)
+        db.session.commit()
+
+
+def titles(resp):
+    return [b["title"] for b in resp.get_json()["data"]["items"]]
+
+
+def test_build_match_query_quotes_prefix_terms():
+    assert fulltext.build_match_query('pyth prog') == '"pyth"* "prog"*'
+    assert fulltext.build_match_query('a"b OR *') == '"a"* "b"* "OR"*'
+    assert fulltext.build_match_query('  ') is None
+
+
+def test_book_search_uses_prefix_and_stays_in_sync(client):
+    seed([Book(title="Python Programming", author="John Smith"),
+          Book(title="Clean Code", author="Robert Martin"),
+          Book(title="Fluent Python", author="Luciano Ramalho")])
+    with app.app_context():
+        assert fulltext.is_available(db.session, 'book')
+
+    assert sorted(titles(client.get('/api/v1/books?search=pyth'))) == ["Fluent Python", "Python Programming"]
+    assert titles(client.get('/api/v1/books?search=rob mart')) == ["Clean Code"]
+
+    book_id = client.post('/api/v1/books', json={"title": "Pythonic Patterns"}).get_json()["bookId"]
+    assert "Pythonic Patterns" in titles(client.get('/api/v1/books?search=pyth'))
+    client.delete(f'/api/v1/books/{book_id}')
+    assert "Pythonic Patterns" not in titles(client.get('/api/v1/books?search=pyth'))
+
+
+def test_book_search_ranks_by_relevance(client):
+    seed([Book(title="Cooking for Everyone", author="Python Fan"),
+          Book(title="Python Python Python", author="Guido")])
+    assert titles(client.get('/api/v1/books?search=python'))[0] == "Python Python Python"
+    assert titles(client.get('/api/v1/books?search=python&sort_by=title')) == [
+        "Cooking for Everyone", "Python Python Python"]
+
+
+def test_user_search(client):
+    seed([User(name="Alice Johnson", email="alice@example.com", password_hash="x"),
+          User(name="Bob Smith", email="bob@sample.org", password_hash="x")])
+    body = client.get('/api/v1/users?search=sampl').get_json()
+    assert [u["name"] for u in body["data"]["items"]] == ["Bob Smith"]
+
+
+def test_rebuild_restores_index(client):
+    seed([Book(title="Design Patterns")])
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO book_fts(book_fts) VALUES ('delete-all')")
+            assert fulltext.rebuild(connection) == {'book': True, 'user': True}
+    assert titles(client.get('/api/v1/books?search=desi')) == ["Design Patterns"]
+
+
+def test_falls_back_to_ilike_without_fts(client):
+    seed([Book(title="Python Programming")])
+    with app.app_context():
+        fulltext._availability[db.engine] = {'book': False}
+    assert titles(client.get('/api/v1/books?search=ython')) == ["Python Programming"]
@@ -0,0 +1,52 @@
+import time
+import jwt
+import pytest
+from utils.token_cache import TokenCache
+
+SECRET = "test-secret-with-enough-bytes-for-hs256"
+
+
+def make_token(exp_in=60, secret=SECRET, **claims):
+    return jwt.encode({"sub": "1", "exp": int(time.time()) + exp_in, **claims}, secret, algorithm="HS256")
+
+
+def test_second_decode_is_a_hit():
+    cache = TokenCache()
+    token = make_token()
+    assert cache.decode(token, SECRET)["sub"] == "1"
+    assert cache.decode(token, SECRET)["sub"] == "1"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_entry_expires_at_token_exp(monkeypatch):
+    cache = TokenCache()
+    token = make_token(exp_in=10)
+    cache.decode(token, SECRET)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        cache.decode(token, SECRET)
+
+
+def test_rejected_tokens_are_cached():
+    cache = TokenCache(negative_ttl=30)
+    forged = make_token(secret="another-secret-with-enough-bytes-xx")
+    for _ in range(3):
+        with pytest.raises(jwt.InvalidSignatureError):
+            cache.decode(forged, SECRET)
+    assert cache.stats()["negative_hits"] == 2
+
+
+def test_lru_bound_and_secret_change():
+    cache = TokenCache(max_entries=2)
+    tokens = [make_token(jti=str(i)) for i in range(3)]
+    for token in tokens:
+        cache.decode(token, SECRET)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    # A different key must not trust tokens verified with the old one
+    with pytest.raises(jwt.InvalidSignatureError):
+        cache.decode(tokens[2], "rotated-secret-with-enough-bytes-xxx")
+    assert cache.decode(tokens[2], SECRET)["jti"] == "2"
@@ -0,0 +1,245 @@
+"""
+OpenAPI spec built once, served precompiled
+
+Building the spec means importing flasgger (and jsonschema, yaml, ...) and
+walking every view's `@swag_from` dict and docstring. That now happens at
+build time (`flask apispec-build`) into a versioned artifact,
+build/apispec-v<version>.json (+ .gz, + .br when brotli is installed). At
+runtime `/apispec.json` only reads those bytes and picks an encoding, and
+flasgger is never imported.
+
+A manifest beside the artifact (<artifact>.manifest) records a hash of the
+modules the spec is generated from (app.py and every module defining a
+view) and the digest of each file of that build. The artifact is rebuilt on
+the first request when it is missing or its source hash no longer matches,
+and a .gz/.br is served only if the manifest lists it with that digest, so
+a leftover from an earlier build is never served beside a newer .json.
+
+Routes use `utils.apidoc.swag_from`, which records the spec dict on the view
+exactly like flasgger's decorator does, minus the import. Set APIDOC_LIVE=1
+to mount flasgger itself (live spec + its Swagger UI) while developing, and
+APIDOC_PATH to put the artifact somewhere else.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Optional
+
+from flask import Blueprint, Response, current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+apidoc_bp = Blueprint('apidoc', __name__)
+
+_artifacts: Dict[str, 'Artifact'] = {}
+_lock = threading.Lock()
+
+DOCS_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Library Management API</title>
+  <link rel="stylesheet" href="/flasgger_static/swagger-ui.css">
+</head>
+<body>
+  <div id="swagger-ui"></div>
+  <script src="/flasgger_static/swagger-ui-bundle.js"></script>
+  <script src="/flasgger_static/swagger-ui-standalone-preset.js"></script>
+  <script>
+    SwaggerUIBundle({url: "/apispec.json", dom_id: "#swagger-ui", deepLinking: true,
+                     presets: [SwaggerUIBundle.presets.apis, SwaggerUIStandalonePreset],
+                     layout: "StandaloneLayout"});
+  </script>
+</body>
+</html>
+"""
+
+
+def swag_from(specs: Dict[str, Any]) -> Callable:
+    """Attach an OpenAPI operation dict to a view (read by flasgger at build time)"""
+    def decorator(function):
+        function.specs_dict = specs
+        return function
+    return decorator
+
+
+class Artifact:
+    """The spec's bytes in every encoding we serve, plus their ETags"""
+
+    def __init__(self, identity: bytes, gzipped: Optional[bytes] = None, brotlied: Optional[bytes] = None):
+        digest = hashlib.sha256(identity).hexdigest()[:32]
+        self.bodies = {
+            'identity': identity,
+            'gzip': gzipped if gzipped is not None else gzip.compress(identity, 9, mtime=0),
+        }
+        if brotlied is None and brotli is not None:
+            brotlied = brotli.compress(identity)
+        if brotlied is not None:
+            self.bodies['br'] = brotlied
+        # Strong ETag per representation
+        self.etags = {encoding: digest if encoding == 'identity' else f"{digest}-{encoding}"
+                      for encoding in self.bodies}
+
+    def negotiate(self, accept_encodings) -> str:
+        for encoding in ('br', 'gzip'):
+            if encoding in self.bodies and accept_encodings[encoding]:
+                return encoding
+        return 'identity'
+
+
+def artifact_path(app) -> str:
+    return app.config.get('APIDOC_PATH') or os.path.join(
+        app.root_path, 'build', f"apispec-v{app.config['APIDOC_VERSION']}.json"
+    )
+
+
+def build_spec(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Generate the spec from a throwaway app instance with flasgger mounted"""
+    from factory import create_app
+
+    live = create_app({**(config or {}), 'APIDOC_LIVE': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with live.test_request_context():
+        return live.swag.get_apispecs('apispec')
+
+
+def source_hash(app) -> str:
+    """sha256 over the spec's inputs: APIDOC_VERSION, app.py and the view modules"""
+    modules = {app.import_name} | {view.__module__ for view in app.view_functions.values()}
+    digest = hashlib.sha256(str(app.config['APIDOC_VERSION']).encode())
+    for name in sorted(modules):
+        path = getattr(sys.modules.get(name), '__file__', None)
+        source = _read(path) if path else None
+        if source is not None:
+            digest.update(name.encode() + b'\0' + source)
+    return digest.hexdigest()
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def write_artifact(spec: Dict[str, Any], path: str, source: str) -> Artifact:
+    """Write <path>, <path>.gz, (with brotli) <path>.br and the manifest, last"""
+    identity = json.dumps(spec, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    artifact = Artifact(identity)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    files = {}
+    for encoding, suffix in (('identity', ''), ('gzip', '.gz'), ('br', '.br')):
+        if encoding in artifact.bodies:
+            with open(path + suffix, 'wb') as f:
+                f.write(artifact.bodies[encoding])
+            files[encoding] = _digest(artifact.bodies[encoding])
+    with open(path + '.manifest', 'w', encoding='utf-8') as f:
+        json.dump({"source": source, "files": files}, f)
+    return artifact
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _read_built(path: str, source: str) -> Optional[Artifact]:
+    """The artifact on disk if it was built from `source`; only files of that build"""
+    try:
+        with open(path + '.manifest', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get('source') != source:
+        return None
+
+    files = manifest.get('files', {})
+    bodies = {}
+    for encoding, suffix in (('identity', ''), ('gzip', '.gz'), ('br', '.br')):
+        body = _read(path + suffix) if encoding in files else None
+        bodies[encoding] = body if body is not None and _digest(body) == files[encoding] else None
+    if bodies['identity'] is None:
+        return None
+    return Artifact(bodies['identity'], bodies['gzip'], bodies['br'])
+
+
+def load_artifact(app) -> Artifact:
+    """The artifact for `app`, read once per process (rebuilt on first use if missing or stale)"""
+    path = artifact_path(app)
+    artifact = _artifacts.get(path)
+    if artifact is not None:
+        return artifact
+
+    with _lock:
+        if path not in _artifacts:
+            source = source_hash(app)
+            artifact = _read_built(path, source)
+            if artifact is None:
+                spec = build_spec()
+                try:
+                    artifact = write_artifact(spec, path, source)
+                except OSError:
+                    # Read-only deploy: keep it in memory
+                    artifact = Artifact(json.dumps(spec, sort_keys=True, ensure_ascii=False,
+                                                   separators=(',', ':')).encode('utf-8'))
+            _artifacts[path] = artifact
+        return _artifacts[path]
+
+
+@apidoc_bp.route('/apispec.json', methods=['GET'])
+def apispec():
+    artifact = load_artifact(current_app)
+    encoding = artifact.negotiate(request.accept_encodings)
+    etag = artifact.etags[encoding]
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(artifact.bodies[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@apidoc_bp.route('/api/docs/', methods=['GET'])
+def docs():
+    return Response(DOCS_PAGE, mimetype='text/html')
+
+
+@apidoc_bp.route('/flasgger_static/<path:filename>', methods=['GET'])
+def docs_static(filename):
+    # Swagger UI assets shipped with flasgger, located without importing it
+    spec = find_spec('flasgger')
+    if spec is None or not spec.submodule_search_locations:
+        return Response(status=404)
+    return send_from_directory(os.path.join(spec.submodule_search_locations[0], 'ui3', 'static'), filename)
+
+
+def init_app(app, swagger_config: Dict[str, Any], swagger_template: Dict[str, Any]) -> None:
+    """Mount the precompiled spec (default) or flasgger itself (APIDOC_LIVE)"""
+    app.config.setdefault('APIDOC_LIVE', os.environ.get('APIDOC_LIVE', '').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('APIDOC_VERSION', swagger_template['info']['version'])
+    app.config.setdefault('APIDOC_PATH', os.environ.get('APIDOC_PATH'))
+
+    if app.config['APIDOC_LIVE']:
+        from flasgger import Swagger
+        Swagger(app, config=swagger_config, template=swagger_template)
+    else:
+        app.register_blueprint(apidoc_bp)
+
+    @app.cli.command('apispec-build')
+    def apispec_build():
+        """Generate the versioned OpenAPI artifact (json, gz, br)"""
+        path = artifact_path(app)
+        artifact = write_artifact(build_spec(), path, source_hash(app))
+        sizes = ', '.join(f"{encoding}={len(body)}B" for encoding, body in artifact.bodies.items())
+        print(f"Wrote {path} ({sizes})")
@@ -0,0 +1,277 @@
+"""
+Atomic borrow / return using conditional single-row UPDATEs
+
+The happy path issues no SELECTs: availability is checked and flipped by
+`UPDATE book ... WHERE id = ? AND is_available = 1`, so two concurrent
+requests for the same copy can never both succeed, and the borrow record is
+inserted in the same short transaction. Reads only happen on failure, to
+tell "not found" apart from "conflict".
+
+The batch variants do the same for a list of books with `WHERE id IN (...)`,
+in one transaction, and report the outcome per book.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy import insert, update, select, literal, literal_column, false, true
+from models import Book, User, BorrowRecord
+from utils import facets
+
+
+# Most books one batch request may touch
+MAX_BATCH = 50
+
+
+class BorrowError(Exception):
+    """A borrow/return that cannot proceed; carries the HTTP status"""
+    
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+# Borrower's name as a RETURNING expression. Written as SQL because the
+# compiler strips table qualifiers inside RETURNING, which makes a
+# correlated subquery ambiguous.
+_RETURNING_USER_NAME = literal_column(
+    '(SELECT "user".name FROM "user" WHERE "user".id = borrow_record.user_id)'
+)
+
+
+def _record_dict(record_id, user_name, book_title, borrow_date, return_date, is_returned) -> Dict[str, Any]:
+    """Same shape as BorrowRecord.to_dict()"""
+    return {
+        "id": record_id,
+        "user": user_name,
+        "book": book_title,
+        "borrow_date": borrow_date.isoformat(),
+        "return_date": return_date.isoformat() if return_date else None,
+        "is_returned": is_returned
+    }
+
+
+def borrow(session, user_id: int, book_id: int) -> Dict[str, Any]:
+    """
+    Borrow `book_id` for `user_id` and commit
+    
+    Raises:
+        BorrowError: 404 if the user or book does not exist, 409 if the
+            book is already borrowed
+    """
+    now = datetime.utcnow()
+    
+    # 1. Claim the copy: only succeeds while it is still available
+    claimed = session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.is_available == true())
+        .values(is_available=False, version=Book.version + 1)
+        .returning(Book.title, Book.category)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if claimed is None:
+        session.rollback()
+        if session.get(Book, book_id) is None:
+            raise BorrowError("Sách không tồn tại", 404)
+        raise BorrowError("Sách đã được mượn", 409)
+    
+    # 2. Insert the record, only if the user exists
+    inserted = session.execute(
+        insert(BorrowRecord)
+        .from_select(
+            ['user_id', 'book_id', 'borrow_date', 'is_returned'],
+            select(User.id, literal(book_id), literal(now), false()).where(User.id == user_id)
+        )
+        .returning(BorrowRecord.id, _RETURNING_USER_NAME)
+    ).first()
+    
+    if inserted is None:
+        session.rollback()
+        raise BorrowError("Người dùng không tồn tại", 404)
+    
+    facets.availability_changed(session, claimed.category, False)
+    session.commit()
+    
+    return _record_dict(inserted[0], inserted[1], claimed.title, now, None, False)
+
+
+def return_borrow(session, borrow_id: int) -> Dict[str, Any]:
+    """
+    Close borrow record `borrow_id`, make its book available and commit
+    
+    Raises:
+        BorrowError: 404 if the record does not exist, 409 if it was
+            already returned
+    """
+    now = datetime.utcnow()
+    
+    closed = session.execute(
+        update(BorrowRecord)
+        .where(BorrowRecord.id == borrow_id, BorrowRecord.is_returned == false())
+        .values(is_returned=True, return_date=now)
+        .returning(BorrowRecord.book_id, BorrowRecord.borrow_date, _RETURNING_USER_NAME)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if closed is None:
+        session.rollback()
+        if session.get(BorrowRecord, borrow_id) is None:
+            raise BorrowError("Phiếu mượn không tồn tại", 404)
+        raise BorrowError("Sách đã được trả", 409)
+    
+    book_id, borrow_date, user_name = closed
+    released = session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.is_available == false())
+        .values(is_available=True, version=Book.version + 1)
+        .returning(Book.title, Book.category)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if released is not None:
+        facets.availability_changed(session, released.category, True)
+        title = released.title
+    else:
+        # Book already available (or deleted): nothing to release
+        title = session.execute(select(Book.title).where(Book.id == book_id)).scalar()
+    session.commit()
+    
+    return _record_dict(borrow_id, user_name, title, borrow_date, now, True)
+
+
+def _batch_result(user_id: int, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    succeeded = sum(1 for item in items if item["status"] < 400)
+    return {
+        "user_id": user_id,
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "items": items
+    }
+
+
+def _existing_books(session, book_ids: List[int]) -> set:
+    if not book_ids:
+        return set()
+    return set(session.execute(select(Book.id).where(Book.id.in_(book_ids))).scalars())
+
+
+def borrow_many(session, user_id: int, book_ids: List[int]) -> Dict[str, Any]:
+    """
+    Borrow several books for one user in a single transaction
+    
+    Each book is claimed independently: unavailable or unknown books are
+    reported per item and do not stop the others.
+    
+    Returns:
+        {"user_id", "succeeded", "failed", "items"} with items in request
+        order (duplicates removed), each carrying its own HTTP status
+    
+    Raises:
+        BorrowError: 404 if the user does not exist
+    """
+    now = datetime.utcnow()
+    book_ids = list(dict.fromkeys(book_ids))
+    
+    user_name = session.execute(select(User.name).where(User.id == user_id)).scalar()
+    if user_name is None:
+        raise BorrowError("Người dùng không tồn tại", 404)
+    
+    claimed = {row.id: row for row in session.execute(
+        update(Book)
+        .where(Book.id.in_(book_ids), Book.is_available == true())
+        .values(is_available=False, version=Book.version + 1)
+        .returning(Book.id, Book.title, Book.category)
+        .execution_options(synchronize_session=False)
+    )}
+    
+    record_ids = {}
+    if claimed:
+        inserted = session.execute(
+            insert(BorrowRecord).returning(BorrowRecord.id, BorrowRecord.book_id),
+            [{"user_id": user_id, "book_id": book_id, "borrow_date": now, "is_returned": False}
+             for book_id in claimed]
+        )
+        record_ids = {book_id: record_id for record_id, book_id in inserted}
+        for category, count in Counter(row.category for row in claimed.values()).items():
+            facets.availability_changed(session, category, False, count)
+        session.commit()
+    else:
+        session.rollback()
+    
+    existing = _existing_books(session, [book_id for book_id in book_ids if book_id not in claimed])
+    items = []
+    for book_id in book_ids:
+        if book_id in claimed:
+            record = _record_dict(record_ids[book_id], user_name, claimed[book_id].title, now, None, False)
+            items.append({"book_id": book_id, "status": 201, "borrow": record})
+        elif book_id in existing:
+            items.append({"book_id": book_id, "status": 409, "error": "Sách đã được mượn"})
+        else:
+            items.append({"book_id": book_id, "status": 404, "error": "Sách không tồn tại"})
+    return _batch_result(user_id, items)
+
+
+def return_many(session, user_id: int, book_ids: List[int]) -> Dict[str, Any]:
+    """
+    Return several books borrowed by one user in a single transaction
+    
+    Returns:
+        Same shape as borrow_many; a book this user has no open borrow for
+        is reported as 409 (or 404 if the book does not exist)
+    
+    Raises:
+        BorrowError: 404 if the user does not exist
+    """
+    now = datetime.utcnow()
+    book_ids = list(dict.fromkeys(book_ids))
+    
+    user_name = session.execute(select(User.name).where(User.id == user_id)).scalar()
+    if user_name is None:
+        raise BorrowError("Người dùng không tồn tại", 404)
+    
+    closed = {row.book_id: row for row in session.execute(
+        update(BorrowRecord)
+        .where(BorrowRecord.user_id == user_id,
+               BorrowRecord.book_id.in_(book_ids),
+               BorrowRecord.is_returned == false())
+        .values(is_returned=True, return_date=now)
+        .returning(BorrowRecord.id, BorrowRecord.book_id, BorrowRecord.borrow_date)
+        .execution_options(synchronize_session=False)
+    )}
+    
+    titles = {}
+    if closed:
+        released = session.execute(
+            update(Book)
+            .where(Book.id.in_(list(closed)), Book.is_available == false())
+            .values(is_available=True, version=Book.version + 1)
+            .returning(Book.id, Book.title, Book.category)
+            .execution_options(synchronize_session=False)
+        ).all()
+        titles = {row.id: row.title for row in released}
+        for category, count in Counter(row.category for row in released).items():
+            facets.availability_changed(session, category, True, count)
+        
+        # Books already available (or deleted): nothing to release
+        unreleased = [book_id for book_id in closed if book_id not in titles]
+        if unreleased:
+            titles.update(session.execute(
+                select(Book.id, Book.title).where(Book.id.in_(unreleased))
+            ).tuples().all())
+        session.commit()
+    else:
+        session.rollback()
+    
+    existing = _existing_books(session, [book_id for book_id in book_ids if book_id not in closed])
+    items = []
+    for book_id in book_ids:
+        if book_id in closed:
+            row = closed[book_id]
+            record = _record_dict(row.id, user_name, titles.get(book_id), row.borrow_date, now, True)
+            items.append({"book_id": book_id, "status": 200, "borrow": record})
+        elif book_id in existing:
+            items.append({"book_id": book_id, "status": 409, "error": "Người dùng không mượn sách này"})
+        else:
+            items.append({"book_id": book_id, "status": 404, "error": "Sách không tồn tại"})
+    return _batch_result(user_id, items)
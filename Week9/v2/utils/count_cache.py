@@ -0,0 +1,111 @@
+"""
+TTL cache for COUNT(*) results of list endpoints
+
+Every app gets its own cache (`app.extensions['count_cache']`, see
+init_app), so instances bound to different databases never share totals.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from flask import current_app
+
+from database import db
+from utils import table_versions
+
+
+class CountCache:
+    """
+    Bounded cache of total counts keyed by a normalized filter signature.
+    
+    Entries expire after `ttl` seconds and are invalidated as soon as any
+    table they depend on is written, by any worker process (the committed
+    generations in `table_version`, see utils.table_versions).
+    """
+    
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[int, Tuple[int, ...], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(endpoint: str, args: Dict[str, Any], ignore: Iterable[str] = ()) -> Tuple:
+        """
+        Build a cache key from request args, dropping paging/sorting params
+        and empty values so equivalent requests share an entry
+        
+        Values are kept verbatim: the filters use them unstripped, so
+        `?search=%20foo` and `?search=foo` count different rows.
+        """
+        ignored = set(ignore)
+        filters = tuple(sorted(
+            (name, str(value))
+            for name, value in args.items()
+            if name not in ignored and str(value) != ''
+        ))
+        return (endpoint, filters)
+    
+    def get_or_count(self, key: Tuple, tables: Iterable[str],
+                     counter: Callable[[], int]) -> int:
+        """
+        Return the cached count for `key`, running `counter` on a miss
+        
+        Args:
+            key: Normalized filter signature (see make_key)
+            tables: Table names the count depends on
+            counter: Callable executing the COUNT query
+        """
+        tables = tuple(tables)
+        # Read before counting so a concurrent write makes the entry stale
+        versions = table_versions.stored_for_request(db.session, tables)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_versions, expires_at = entry
+                if entry_versions == versions and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+        
+        value = counter()
+        
+        with self._lock:
+            self._entries[key] = (value, versions, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None
+            }
+
+
+def init_app(app) -> CountCache:
+    """Attach a fresh cache to `app` (called by create_app)"""
+    return app.extensions.setdefault('count_cache', CountCache())
+
+
+def current_cache() -> CountCache:
+    """The cache of the app handling the current request"""
+    return current_app.extensions.get('count_cache') or init_app(current_app)
@@ -0,0 +1,92 @@
+"""
+Book facet counts (per category and availability)
+
+`book_facet_count` holds one row per (category, is_available) and is adjusted
+in the same transaction as every write that changes a book's facet, so
+unfiltered facets are read in O(categories) instead of scanning `book`.
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Book, BookFacetCount
+
+
+def _key(category: Optional[str]) -> str:
+    return category or ''
+
+
+def adjust(session, category: Optional[str], is_available: bool, delta: int) -> None:
+    """Add `delta` to the count of one facet (upsert, no prior read)"""
+    statement = sqlite_insert(BookFacetCount).values(
+        category=_key(category), is_available=bool(is_available), count=delta
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[BookFacetCount.category, BookFacetCount.is_available],
+        set_={"count": BookFacetCount.count + delta}
+    )
+    session.execute(statement)
+
+
+def book_added(session, book) -> None:
+    adjust(session, book.category, book.is_available is not False, 1)
+
+
+def book_removed(session, category: Optional[str], is_available: bool) -> None:
+    adjust(session, category, is_available, -1)
+
+
+def availability_changed(session, category: Optional[str], is_available: bool, count: int = 1) -> None:
+    """Move `count` books of `category` to the `is_available` facet"""
+    adjust(session, category, not is_available, -count)
+    adjust(session, category, is_available, count)
+
+
+def rebuild(executor) -> None:
+    """Recompute every facet count from the book table (accepts a session or a connection)"""
+    category = func.coalesce(Book.category, '')
+    is_available = func.coalesce(Book.is_available, True)
+    executor.execute(delete(BookFacetCount))
+    executor.execute(insert(BookFacetCount).from_select(
+        ['category', 'is_available', 'count'],
+        select(category, is_available, func.count(Book.id)).group_by(category, is_available)
+    ))
+
+
+def stored_counts(session) -> Iterable[Tuple[str, bool, int]]:
+    """Read the maintained counts (backfilled by the db-upgrade migrations)"""
+    return session.query(BookFacetCount.category, BookFacetCount.is_available,
+                         BookFacetCount.count).all()
+
+
+def grouped_counts(query) -> Iterable[Tuple[str, bool, int]]:
+    """Count a filtered Book query per facet in one grouped statement"""
+    return (query.order_by(None)
+            .with_entities(Book.category, Book.is_available, func.count(Book.id))
+            .group_by(Book.category, Book.is_available)
+            .all())
+
+
+def format_facets(rows: Iterable[Tuple[str, bool, int]]) -> Dict[str, Any]:
+    """Shape (category, is_available, count) rows into the facets payload"""
+    categories: Dict[str, Dict[str, Any]] = {}
+    available = borrowed = 0
+    
+    for category, is_available, count in rows:
+        if not count:
+            continue
+        bucket = categories.setdefault(_key(category), {
+            "category": _key(category), "count": 0, "available": 0, "borrowed": 0
+        })
+        bucket["count"] += count
+        if is_available is not False:
+            bucket["available"] += count
+            available += count
+        else:
+            bucket["borrowed"] += count
+            borrowed += count
+    
+    return {
+        "categories": sorted(categories.values(), key=lambda c: (-c["count"], c["category"])),
+        "availability": {"available": available, "borrowed": borrowed},
+        "total": available + borrowed
+    }
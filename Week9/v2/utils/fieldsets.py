@@ -0,0 +1,66 @@
+"""
+Sparse fieldsets (?fields=a,b) served from column-only SELECTs
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from flask import request
+
+
+def serialize_value(value: Any) -> Any:
+    """Match to_dict() output for values read straight from a row"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class Fieldset:
+    """
+    A validated subset of a model's API fields
+    
+    The query is projected onto just those columns (plus any extra columns
+    the caller needs, e.g. keyset sort keys), so rows come back as plain
+    tuples without building ORM entities or going through the identity map.
+    """
+    
+    def __init__(self, fields_map: Dict[str, Any], names: List[str]):
+        self.fields_map = fields_map
+        self.names = names
+    
+    @classmethod
+    def from_request(cls, fields_map: Dict[str, Any]) -> Tuple[Optional['Fieldset'], Optional[Dict[str, Any]]]:
+        """
+        Parse ?fields= against the whitelist in `fields_map`
+        
+        Returns:
+            (fieldset, None), (None, None) when no fields were requested,
+            or (None, error dict) for unknown fields
+        """
+        raw = request.args.get('fields', type=str)
+        if not raw or not raw.strip():
+            return None, None
+        
+        names = []
+        for name in raw.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        
+        unknown = [name for name in names if name not in fields_map]
+        if unknown or not names:
+            return None, {
+                "meta": {
+                    "status": "error",
+                    "message": "Invalid fields parameter"
+                },
+                "errors": [f"Unknown field '{name}'" for name in unknown] or ["No fields requested"],
+                "allowed_fields": list(fields_map)
+            }
+        
+        return cls(fields_map, names), None
+    
+    def project(self, query, extra_columns=()):
+        """Replace the query's SELECT list with the requested columns"""
+        columns = [self.fields_map[name] for name in self.names]
+        return query.with_entities(*columns, *extra_columns)
+    
+    def serialize(self, row) -> Dict[str, Any]:
+        """Turn a projected row into a dict (extra columns are dropped)"""
+        return {name: serialize_value(row[i]) for i, name in enumerate(self.names)}
@@ -0,0 +1,154 @@
+"""
+SQLite FTS5 full-text index for books and users
+
+Each indexed table gets an external-content FTS5 shadow table
+(`<table>_fts`) kept in sync by triggers, so the index follows every write,
+including bulk SQL that bypasses the ORM. Searches are prefix queries ranked
+with bm25(). On databases without FTS5 callers fall back to ILIKE.
+"""
+import re
+from typing import Optional
+from sqlalchemy import event, text, Float, Integer
+from sqlalchemy.exc import OperationalError
+from models import Book, User
+
+# table name -> indexed columns
+FTS_INDEXES = {
+    'book': ('title', 'author'),
+    'user': ('name', 'email'),
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# engine -> {table: bool}; reset whenever the schema is created or dropped
+_availability = {}
+
+
+def _ddl(table: str):
+    columns = FTS_INDEXES[table]
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+        f'{cols}, content="{table}", content_rowid="id", '
+        f'tokenize="unicode61 remove_diacritics 2")',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{table}" BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        # Only reindex when an indexed column changes (not on is_available flips)
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON "{table}" BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END',
+    ]
+
+
+def install(connection, table: str) -> bool:
+    """
+    Create the FTS5 table and sync triggers for `table` and (re)build it
+    
+    Returns:
+        True if the index is in place, False if FTS5 is unavailable
+    """
+    _availability.pop(connection.engine, None)
+    if connection.dialect.name != 'sqlite':
+        return False
+    
+    try:
+        for statement in _ddl(table):
+            connection.exec_driver_sql(statement)
+    except OperationalError as e:
+        # SQLite built without FTS5: searches fall back to ILIKE
+        if 'fts5' not in str(e):
+            raise
+        return False
+    
+    fts = f'{table}_fts'
+    connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return True
+
+
+def rebuild(connection) -> dict:
+    """Install (if needed) and rebuild every full-text index"""
+    return {table: install(connection, table) for table in FTS_INDEXES}
+
+
+def is_available(session, table: str) -> bool:
+    """Return True if the FTS5 index for `table` exists on the session's database"""
+    engine = session.get_bind()
+    tables = _availability.setdefault(engine, {})
+    if table not in tables:
+        if engine.dialect.name != 'sqlite':
+            tables[table] = False
+        else:
+            found = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": f'{table}_fts'}
+            ).first()
+            tables[table] = found is not None
+    return tables[table]
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 MATCH expression
+    
+    Every word becomes a quoted prefix term and all terms must match, so
+    'pyth prog' finds 'Python Programming'. Returns None if the input has
+    no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(search or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def match_subquery(session, table: str, search: str):
+    """
+    Return a (rowid, rank) subquery of rows matching `search`, or None
+    when the index is unavailable or the search has no words
+    
+    Lower rank means more relevant (bm25).
+    """
+    match = build_match_query(search)
+    if match is None or not is_available(session, table):
+        return None
+    
+    fts = f'{table}_fts'
+    return text(
+        f'SELECT rowid, bm25({fts}) AS rank FROM {fts} WHERE {fts} MATCH :match'
+    ).bindparams(match=match).columns(rowid=Integer, rank=Float).subquery(f'{fts}_match')
+
+
+def _on_create(table: str):
+    def listener(target, connection, **kw):
+        install(connection, table)
+    return listener
+
+
+def _on_drop(table: str):
+    def listener(target, connection, **kw):
+        _availability.pop(connection.engine, None)
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {table}_fts')
+    return listener
+
+
+for _model in (Book, User):
+    _name = _model.__table__.name
+    event.listen(_model.__table__, 'after_create', _on_create(_name))
+    event.listen(_model.__table__, 'before_drop', _on_drop(_name))
+
+
+def register_commands(app):
+    """Add `flask fts-rebuild` to the app's CLI"""
+    @app.cli.command('fts-rebuild')
+    def fts_rebuild_command():
+        """Create and rebuild the FTS5 search indexes."""
+        from database import db
+        db.create_all()
+        with db.engine.begin() as connection:
+            for table, ok in rebuild(connection).items():
+                print(f"{table}_fts: {'rebuilt' if ok else 'FTS5 unavailable, using ILIKE'}")
@@ -0,0 +1,254 @@
+"""
+Idempotency-Key support for unsafe endpoints
+
+The first request with a given (caller, key) claims a row in
+`idempotency_key` with one `INSERT ... ON CONFLICT DO NOTHING`. The view runs
+and its response is stored on that row, in the view's own transaction when
+the view calls `complete()` before committing. A retry looks the row up by
+primary key and gets the stored response back without running the view.
+
+- same key, different body           -> 422
+- same key while the first is running -> wait up to IDEMPOTENCY_WAIT seconds,
+                                         then 409
+- 4xx/5xx or exception               -> claim released, nothing stored; the
+                                         client may fix the request and retry
+- claims older than IDEMPOTENCY_LOCK_TIMEOUT are treated as abandoned
+  (crashed worker) and taken over
+
+Expired keys (IDEMPOTENCY_TTL) are deleted by a background thread every
+IDEMPOTENCY_EVICT_INTERVAL seconds (0 disables it).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app, g, jsonify, make_response, request, Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import db
+from models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    """The key cannot be used for this request; carries the HTTP status"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    """sha256 of the request; JSON bodies are canonicalized first"""
+    try:
+        body = json.dumps(json.loads(body or b'null'), sort_keys=True, separators=(',', ':')).encode()
+    except ValueError:
+        pass
+    return hashlib.sha256(method.encode() + b' ' + path.encode() + b'\n' + body).hexdigest()
+
+
+def _settings():
+    config = current_app.config
+    return (
+        float(config.get('IDEMPOTENCY_TTL', os.environ.get('IDEMPOTENCY_TTL', 24 * 3600))),
+        float(config.get('IDEMPOTENCY_WAIT', os.environ.get('IDEMPOTENCY_WAIT', 5))),
+        float(config.get('IDEMPOTENCY_LOCK_TIMEOUT', os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))),
+    )
+
+
+def _claim(session, scope: str, key: str, digest: str, ttl: float, lock_timeout: float) -> bool:
+    """Take the key for this request; True if we own it now"""
+    now = datetime.utcnow()
+    inserted = session.execute(
+        sqlite_insert(IdempotencyKey)
+        .values(scope=scope, key=key, fingerprint=digest, status='in_progress',
+                locked_at=now, expires_at=now + timedelta(seconds=ttl))
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.scope, IdempotencyKey.key])
+    ).rowcount
+    if not inserted:
+        # Expired entry not evicted yet, or a claim abandoned by a dead worker
+        inserted = session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+                   (IdempotencyKey.expires_at < now)
+                   | ((IdempotencyKey.status == 'in_progress')
+                      & (IdempotencyKey.locked_at < now - timedelta(seconds=lock_timeout))))
+            .values(fingerprint=digest, status='in_progress', response_status=None, response_body=None,
+                    locked_at=now, expires_at=now + timedelta(seconds=ttl))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    session.commit()
+    return bool(inserted)
+
+
+def begin(session, scope: str, key: str, digest: str) -> Optional[Tuple[int, str]]:
+    """
+    Claim `key` or fetch its stored outcome
+
+    Returns:
+        None when this request owns the key and should run, otherwise the
+        stored (status, body) to replay
+
+    Raises:
+        IdempotencyError: 422 for a different payload, 409 if the original
+            request is still running after the wait
+    """
+    ttl, wait, lock_timeout = _settings()
+    deadline = time.monotonic() + wait
+
+    while True:
+        if _claim(session, scope, key, digest, ttl, lock_timeout):
+            return None
+
+        row = session.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status,
+                   IdempotencyKey.response_status, IdempotencyKey.response_body)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        ).first()
+        session.rollback()  # end the read so the next poll sees new commits
+
+        if row is None:
+            continue  # evicted in between: claim again
+        if row.fingerprint != digest:
+            raise IdempotencyError(f"{HEADER} was already used with a different request", 422)
+        if row.status == 'completed':
+            return row.response_status, row.response_body
+        if time.monotonic() >= deadline:
+            raise IdempotencyError(f"A request with this {HEADER} is still being processed", 409)
+        time.sleep(0.05)
+
+
+def complete(session, status: int, body: str) -> None:
+    """
+    Store the response for the key claimed by the current request
+
+    Call before the view's commit so the response is persisted atomically
+    with the work it describes. No-op when the request has no key.
+    """
+    claim = g.get('idempotency_claim')
+    if claim is None or claim.get('completed'):
+        return
+    session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.scope == claim['scope'], IdempotencyKey.key == claim['key'])
+        .values(status='completed', response_status=status, response_body=body)
+        .execution_options(synchronize_session=False)
+    )
+    claim['completed'] = True
+
+
+def release(session, scope: str, key: str) -> None:
+    """Drop an unfinished claim so the client can retry"""
+    session.rollback()
+    session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+               IdempotencyKey.status == 'in_progress')
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+
+
+def evict_expired(session) -> int:
+    """Delete expired keys (index range scan on expires_at); returns the count"""
+    deleted = session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.expires_at < datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    session.commit()
+    return deleted
+
+
+_evictor = {"pid": None}
+_evictor_lock = threading.Lock()
+
+
+def _start_evictor(app) -> None:
+    """One daemon thread per process deleting expired keys"""
+    interval = float(app.config.get('IDEMPOTENCY_EVICT_INTERVAL',
+                                    os.environ.get('IDEMPOTENCY_EVICT_INTERVAL', 300)))
+    if interval <= 0 or _evictor["pid"] == os.getpid():
+        return
+    with _evictor_lock:
+        if _evictor["pid"] == os.getpid():
+            return
+        _evictor["pid"] = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    evict_expired(db.session)
+                except Exception as e:
+                    app.logger.warning("Idempotency eviction failed: %s", e)
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=run, name='idempotency-evictor', daemon=True).start()
+
+
+def idempotent(f=None, *, replay_headers: Optional[Callable[[dict], Dict[str, str]]] = None):
+    """
+    Honour the Idempotency-Key header on an authenticated POST
+
+    Place below @jwt_required: keys are scoped to `request.user_identity`.
+    Replayed responses carry `Idempotent-Replayed: true`.
+
+    Only the status and body are stored. Views whose response has headers
+    derived from the body (e.g. Location) pass `replay_headers`, called with
+    the stored JSON body to rebuild them on a replay.
+    """
+    if f is None:
+        return lambda view: idempotent(view, replay_headers=replay_headers)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": "bad_request",
+                            "message": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        _start_evictor(current_app._get_current_object())
+        scope = str(getattr(request, 'user_identity', None) or '')
+        digest = fingerprint(request.method, request.path, request.get_data())
+
+        try:
+            stored = begin(db.session, scope, key, digest)
+        except IdempotencyError as e:
+            return jsonify({"error": "idempotency_conflict", "message": e.message}), e.status
+        if stored is not None:
+            status, body = stored
+            response = Response(body, status=status, mimetype='application/json')
+            if replay_headers is not None:
+                response.headers.update(replay_headers(json.loads(body)))
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        g.idempotency_claim = {"scope": scope, "key": key}
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            release(db.session, scope, key)
+            raise
+
+        if response.status_code >= 400:
+            release(db.session, scope, key)
+        elif not g.idempotency_claim.get('completed'):
+            # The view did not record its outcome itself: store it now
+            complete(db.session, response.status_code, response.get_data(as_text=True))
+            db.session.commit()
+        return response
+    return decorated
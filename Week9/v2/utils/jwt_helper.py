@@ -2,6 +2,7 @@ import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
+from utils import token_cache
 
 def create_access_token(identity, expires_delta: timedelta | None = None) -> str:
     secret = current_app.config.get('JWT_SECRET_KEY', 'abcxyz!@#123')
@@ -19,8 +20,9 @@ def create_access_token(identity, expires_delta: timedelta | None = None) -> str
     return token
 
 def decode_token(token: str):
+    # Verified tokens are cached until their exp (see utils/token_cache.py)
     secret = current_app.config.get('JWT_SECRET_KEY', 'abcxyz!@#123')
-    return jwt.decode(token, secret, algorithms=['HS256'])
+    return token_cache.current_cache().decode(token, secret)
 
 def jwt_required(f):
     @wraps(f)
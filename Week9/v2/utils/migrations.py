@@ -0,0 +1,111 @@
+"""
+Minimal schema migrations for existing SQLite databases
+
+`db.create_all()` only creates missing tables; it never alters existing
+ones. Each migration below brings an older library.db up to the current
+models and the applied level is tracked in `PRAGMA user_version`.
+Run with `flask --app app db-upgrade`.
+"""
+from sqlalchemy import inspect
+
+
+def _add_book_version(connection, metadata):
+    """book.version (optimistic row version used for ETags)"""
+    columns = {column['name'] for column in inspect(connection).get_columns('book')}
+    if 'version' not in columns:
+        connection.exec_driver_sql('ALTER TABLE book ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+
+def _create_new_tables(connection, metadata):
+    """table_version, book_facet_count (backfilled), and any other missing table"""
+    from utils import facets
+    metadata.create_all(connection, checkfirst=True)
+    facets.rebuild(connection)
+
+
+def _create_indexes(connection, metadata):
+    """Secondary indexes for the list endpoints' filters and sort orders"""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    connection.exec_driver_sql('ANALYZE')
+
+
+def _create_idempotency_keys(connection, metadata):
+    """idempotency_key (stored responses for Idempotency-Key retries)"""
+    metadata.tables['idempotency_key'].create(connection, checkfirst=True)
+
+
+def _create_payment_ledger(connection, metadata):
+    """payment_daily_total (backfilled) and the payment ledger filter indexes"""
+    from utils import payment_rollup
+    metadata.tables['payment_daily_total'].create(connection, checkfirst=True)
+    for index in metadata.tables['payment'].indexes:
+        index.create(connection, checkfirst=True)
+    payment_rollup.rebuild(connection)
+
+
+def _add_payment_claimed_at(connection, metadata):
+    """payment.claimed_at (worker lease for asynchronous settlement)"""
+    columns = {column['name'] for column in inspect(connection).get_columns('payment')}
+    if 'claimed_at' not in columns:
+        connection.exec_driver_sql('ALTER TABLE payment ADD COLUMN claimed_at DATETIME')
+
+
+def _recount_book_facets(connection, metadata):
+    """book_facet_count recomputed (databases migrated before it was backfilled)"""
+    from utils import facets
+    facets.rebuild(connection)
+
+
+MIGRATIONS = [
+    _add_book_version,
+    _create_new_tables,
+    _create_indexes,
+    _create_idempotency_keys,
+    _create_payment_ledger,
+    _add_payment_claimed_at,
+    _recount_book_facets,
+]
+
+
+def current_version(connection) -> int:
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def upgrade(connection, metadata) -> list:
+    """
+    Apply every pending migration in order
+    
+    Returns:
+        Names of the migrations that ran
+    """
+    applied = []
+    version = current_version(connection)
+    
+    # A brand-new database: create everything, nothing to migrate
+    if not inspect(connection).has_table('book'):
+        metadata.create_all(connection)
+        connection.exec_driver_sql(f'PRAGMA user_version = {len(MIGRATIONS)}')
+        return applied
+    
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        migration(connection, metadata)
+        connection.exec_driver_sql(f'PRAGMA user_version = {number}')
+        applied.append(migration.__name__.lstrip('_'))
+    return applied
+
+
+def register_commands(app):
+    """Add `flask db-upgrade` to the app's CLI"""
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Bring an existing database up to the current schema."""
+        from database import db
+        from utils import fulltext
+        with db.engine.begin() as connection:
+            applied = upgrade(connection, db.metadata)
+            fulltext.rebuild(connection)
+        print(f"Applied: {', '.join(applied) if applied else 'nothing, schema is up to date'}")
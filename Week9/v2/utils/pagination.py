@@ -1,9 +1,13 @@
 """
 Pagination utilities for Flask SQLAlchemy applications
 """
-from flask import request, url_for
-from typing import Dict, Any, Optional, List
+from datetime import datetime
+from flask import request, url_for, current_app
+from typing import Dict, Any, Optional, List, Callable
 from math import ceil
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import and_, or_
+from utils import count_cache
 
 
 class PaginationHelper:
@@ -12,11 +16,15 @@ class PaginationHelper:
     standardized pagination functionality across all endpoints
     """
     
+    # Request args that never change the size of the filtered set
+    NON_FILTER_ARGS = ('page', 'per_page', 'include_total', 'sort_by', 'order')
+    
     def __init__(self, 
                  page: int = 1, 
                  per_page: int = 10, 
                  max_per_page: int = 100,
-                 endpoint: Optional[str] = None):
+                 endpoint: Optional[str] = None,
+                 include_total: bool = True):
         """
         Initialize pagination helper
         
@@ -25,11 +33,14 @@ class PaginationHelper:
             per_page: Number of items per page
             max_per_page: Maximum allowed items per page
             endpoint: Flask endpoint name for generating links
+            include_total: Run (or reuse a cached) COUNT for total_items;
+                when False only has_next is reported, via a limit+1 probe
         """
         self.page = max(1, page)  # Ensure page is at least 1
         self.per_page = min(max(1, per_page), max_per_page)  # Clamp per_page
         self.max_per_page = max_per_page
         self.endpoint = endpoint
+        self.include_total = include_total
         
     @classmethod
     def from_request(cls, 
@@ -47,31 +58,56 @@ class PaginationHelper:
         """
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        include_total = request.args.get('include_total', 'true').lower() != 'false'
         
         return cls(page=page, per_page=per_page, 
-                  max_per_page=max_per_page, endpoint=endpoint)
+                  max_per_page=max_per_page, endpoint=endpoint,
+                  include_total=include_total)
     
-    def paginate_query(self, query) -> Dict[str, Any]:
+    def paginate_query(self, query, count_tables: Optional[List[str]] = None,
+                       serializer: Optional[Callable] = None) -> Dict[str, Any]:
         """
         Apply pagination to a SQLAlchemy query and return formatted result
         
         Args:
             query: SQLAlchemy query object
+            count_tables: Tables the filtered set depends on; when given,
+                total counts are cached until one of them is written
+            serializer: Converts each row to a dict (defaults to to_dict())
             
         Returns:
             Dictionary containing pagination data and items
         """
-        # Execute pagination
-        pagination = query.paginate(
-            page=self.page, 
-            per_page=self.per_page, 
-            error_out=False
-        )
+        offset = (self.page - 1) * self.per_page
+        
+        if self.include_total:
+            total = self._count(query, count_tables)
+            rows = query.limit(self.per_page).offset(offset).all() if offset < total else []
+            pages = ceil(total / self.per_page) if total else 0
+            has_next = self.page < pages
+        else:
+            # Fetch one extra row instead of counting the whole set
+            rows = query.limit(self.per_page + 1).offset(offset).all()
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            total = None
+            pages = None
+        
+        page_info = {
+            "page": self.page,
+            "total": total,
+            "pages": pages,
+            "returned": len(rows),
+            "has_prev": self.page > 1,
+            "has_next": has_next
+        }
         
         # Convert items to dictionaries if they have to_dict method
         items = []
-        for item in pagination.items:
-            if hasattr(item, 'to_dict'):
+        for item in rows:
+            if serializer is not None:
+                items.append(serializer(item))
+            elif hasattr(item, 'to_dict'):
                 items.append(item.to_dict())
             else:
                 items.append(item)
@@ -81,51 +117,71 @@ class PaginationHelper:
             "data": {
                 "items": items,
                 "pagination": {
-                    "current_page": pagination.page,
-                    "per_page": pagination.per_page,
-                    "total_items": pagination.total,
-                    "total_pages": pagination.pages,
-                    "has_prev": pagination.has_prev,
-                    "has_next": pagination.has_next,
-                    "prev_page": pagination.prev_num if pagination.has_prev else None,
-                    "next_page": pagination.next_num if pagination.has_next else None
+                    "current_page": self.page,
+                    "per_page": self.per_page,
+                    "total_items": total,
+                    "total_pages": pages,
+                    "has_prev": page_info["has_prev"],
+                    "has_next": has_next,
+                    "prev_page": self.page - 1 if page_info["has_prev"] else None,
+                    "next_page": self.page + 1 if has_next else None
                 }
             },
             "meta": {
                 "status": "success",
-                "message": self._get_status_message(pagination)
+                "message": self._get_status_message(page_info)
             }
         }
         
         # Add navigation links if endpoint is provided
         if self.endpoint:
-            result["data"]["pagination"]["links"] = self._generate_links(pagination)
+            result["data"]["pagination"]["links"] = self._generate_links(page_info)
             
         return result
     
-    def _get_status_message(self, pagination) -> str:
+    def _count(self, query, count_tables: Optional[List[str]]) -> int:
+        """Count the filtered set, through the count cache when possible"""
+        def counter():
+            return query.order_by(None).count()
+        
+        if not count_tables:
+            return counter()
+        
+        cache = count_cache.current_cache()
+        key = cache.make_key(self.endpoint or request.path, request.args,
+                             ignore=self.NON_FILTER_ARGS)
+        return cache.get_or_count(key, count_tables, counter)
+    
+    def _get_status_message(self, page_info) -> str:
         """Generate appropriate status message based on pagination results"""
-        if pagination.total == 0:
+        if page_info["returned"] == 0 and not page_info["total"]:
             return "No data found"
         
-        start_item = (pagination.page - 1) * pagination.per_page + 1
-        end_item = min(pagination.page * pagination.per_page, pagination.total)
+        start_item = (page_info["page"] - 1) * self.per_page + 1
+        end_item = start_item + page_info["returned"] - 1
+        
+        if page_info["total"] is None:
+            return f"Showing {start_item}-{end_item} items"
+        
+        if page_info["returned"] == 0:
+            return f"No items on this page ({page_info['total']} in total)"
         
-        return f"Showing {start_item}-{end_item} of {pagination.total} items"
+        return f"Showing {start_item}-{end_item} of {page_info['total']} items"
     
-    def _generate_links(self, pagination) -> Dict[str, Optional[str]]:
+    def _generate_links(self, page_info) -> Dict[str, Optional[str]]:
         """Generate navigation links for pagination"""
         def make_url(page_num):
             args = dict(request.args)
             args['page'] = page_num
             return url_for(self.endpoint, **args)
         
+        pages = page_info["pages"]
         links = {
             "first": make_url(1),
-            "last": make_url(pagination.pages) if pagination.pages > 0 else None,
-            "prev": make_url(pagination.prev_num) if pagination.has_prev else None,
-            "next": make_url(pagination.next_num) if pagination.has_next else None,
-            "self": make_url(pagination.page)
+            "last": make_url(pages) if pages else None,
+            "prev": make_url(page_info["page"] - 1) if page_info["has_prev"] else None,
+            "next": make_url(page_info["page"] + 1) if page_info["has_next"] else None,
+            "self": make_url(page_info["page"])
         }
         
         return links
@@ -235,6 +291,10 @@ class CursorPagination:
         if has_more:
             items = items[:-1]  # Remove the extra item
         
+        # Prev pages are fetched in descending order, restore ascending order
+        if self.cursor and self.direction == 'prev':
+            items = list(reversed(items))
+        
         # Convert items to dictionaries
         formatted_items = []
         for item in items:
@@ -272,6 +332,253 @@ class CursorPagination:
         }
 
 
+class KeysetPagination:
+    """
+    Keyset (seek) pagination over a composite (sort value, id) key.
+    
+    Works for any sort column, including nullable ones, because ties and
+    NULLs are broken by the unique id column. Cursors are opaque, signed
+    tokens so clients cannot forge or tamper with positions.
+    """
+    
+    CURSOR_SALT = 'keyset-cursor'
+    
+    def __init__(self,
+                 sort_key: str,
+                 sort_column,
+                 id_column,
+                 order: str = 'asc',
+                 limit: int = 10,
+                 max_limit: int = 100,
+                 cursor: Optional[str] = None,
+                 endpoint: Optional[str] = None):
+        """
+        Initialize keyset pagination
+        
+        Args:
+            sort_key: Public name of the sort field (e.g. 'title', 'bookId')
+            sort_column: SQLAlchemy column used for sorting
+            id_column: Unique SQLAlchemy column used as tie-breaker
+            order: 'asc' or 'desc'
+            limit: Number of items to return
+            max_limit: Maximum allowed items per page
+            cursor: Opaque cursor token from a previous response
+            endpoint: Flask endpoint name for generating links
+        """
+        self.sort_key = sort_key
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.order = 'desc' if order == 'desc' else 'asc'
+        self.limit = min(max(1, limit), max_limit)
+        self.cursor = cursor or None
+        self.endpoint = endpoint
+        self.position = None
+        self.direction = 'next'
+    
+    @classmethod
+    def from_request(cls,
+                     sort_key: str,
+                     sort_column,
+                     id_column,
+                     order: str = 'asc',
+                     max_limit: int = 100,
+                     endpoint: Optional[str] = None) -> 'KeysetPagination':
+        """Create KeysetPagination from Flask request args"""
+        limit = request.args.get('limit', 10, type=int)
+        cursor = request.args.get('cursor', type=str)
+        
+        return cls(sort_key=sort_key, sort_column=sort_column,
+                   id_column=id_column, order=order, limit=limit,
+                   max_limit=max_limit, cursor=cursor, endpoint=endpoint)
+    
+    @classmethod
+    def _serializer(cls) -> URLSafeSerializer:
+        secret = current_app.config.get('SECRET_KEY') or current_app.config.get('JWT_SECRET_KEY')
+        return URLSafeSerializer(secret, salt=cls.CURSOR_SALT)
+    
+    def encode_cursor(self, item_values: tuple, direction: str) -> str:
+        """Encode a (sort value, id) position into a signed cursor token"""
+        value, item_id = item_values
+        if isinstance(value, datetime):
+            # JSON has no datetime; tagged so validate_cursor can restore it
+            value = {"dt": value.isoformat()}
+        return self._serializer().dumps({
+            "k": self.sort_key,
+            "o": self.order,
+            "v": value,
+            "i": item_id,
+            "d": direction
+        })
+    
+    def validate_cursor(self) -> Optional[Dict[str, Any]]:
+        """
+        Decode and validate the cursor token
+        
+        Returns:
+            Error dict if validation fails, None if valid
+        """
+        if not self.cursor:
+            return None
+        
+        errors = []
+        try:
+            payload = self._serializer().loads(self.cursor)
+        except BadSignature:
+            payload = None
+            errors.append("Cursor is invalid or has been tampered with")
+        
+        if payload is not None:
+            if payload.get("k") != self.sort_key or payload.get("o") != self.order:
+                errors.append("Cursor does not match the requested sort_by/order")
+            elif payload.get("d") not in ('next', 'prev'):
+                errors.append("Cursor direction is invalid")
+            else:
+                value = payload.get("v")
+                if isinstance(value, dict):
+                    try:
+                        value = datetime.fromisoformat(value.get("dt"))
+                    except (TypeError, ValueError):
+                        errors.append("Cursor is invalid or has been tampered with")
+                self.position = (value, payload.get("i"))
+                self.direction = payload["d"]
+        
+        if errors:
+            return {
+                "meta": {
+                    "status": "error",
+                    "message": "Invalid pagination parameters"
+                },
+                "errors": errors
+            }
+        
+        return None
+    
+    def _seek_condition(self, ascending: bool):
+        """Build the WHERE clause that skips every row up to the cursor"""
+        value, item_id = self.position
+        col, id_col = self.sort_column, self.id_column
+        
+        if col is id_col:
+            return id_col > item_id if ascending else id_col < item_id
+        
+        # SQLite sorts NULL before any other value
+        if ascending:
+            if value is None:
+                return or_(col.isnot(None), and_(col.is_(None), id_col > item_id))
+            return or_(col > value, and_(col == value, id_col > item_id))
+        
+        if value is None:
+            return and_(col.is_(None), id_col < item_id)
+        return or_(col < value, col.is_(None), and_(col == value, id_col < item_id))
+    
+    def apply_to_query(self, query):
+        """
+        Apply keyset filtering, ordering and limit to a query
+        
+        Args:
+            query: SQLAlchemy query with filters already applied
+            
+        Returns:
+            Modified query (fetches limit + 1 rows to detect more pages)
+        """
+        ascending = self.order == 'asc'
+        if self.direction == 'prev':
+            ascending = not ascending
+        
+        if self.position is not None:
+            query = query.filter(self._seek_condition(ascending))
+        
+        if self.sort_column is self.id_column:
+            order_columns = [self.id_column]
+        else:
+            order_columns = [self.sort_column, self.id_column]
+        
+        if ascending:
+            query = query.order_by(*[c.asc() for c in order_columns])
+        else:
+            query = query.order_by(*[c.desc() for c in order_columns])
+        
+        return query.limit(self.limit + 1)
+    
+    def format_response(self, items: List, value_getter,
+                        serializer: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        Format keyset pagination response
+        
+        Args:
+            items: List of query results
+            value_getter: Callable returning the (sort value, id) tuple of an item
+            serializer: Converts each row to a dict (defaults to to_dict())
+            
+        Returns:
+            Formatted response dictionary
+        """
+        has_more = len(items) > self.limit
+        if has_more:
+            items = items[:-1]
+        
+        # Prev pages are fetched in reverse order, restore the requested order
+        if self.direction == 'prev':
+            items = list(reversed(items))
+            has_prev, has_next = has_more, self.position is not None
+        else:
+            has_prev, has_next = self.position is not None, has_more
+        
+        if serializer is not None:
+            formatted_items = [serializer(item) for item in items]
+        else:
+            formatted_items = [item.to_dict() if hasattr(item, 'to_dict') else item
+                               for item in items]
+        
+        next_cursor = None
+        prev_cursor = None
+        if items:
+            if has_next:
+                next_cursor = self.encode_cursor(value_getter(items[-1]), 'next')
+            if has_prev:
+                prev_cursor = self.encode_cursor(value_getter(items[0]), 'prev')
+        
+        result = {
+            "data": {
+                "items": formatted_items,
+                "pagination": {
+                    "limit": self.limit,
+                    "sort_by": self.sort_key,
+                    "order": self.order,
+                    "has_prev": has_prev,
+                    "has_next": has_next,
+                    "next_cursor": next_cursor,
+                    "prev_cursor": prev_cursor,
+                    "total_returned": len(formatted_items)
+                }
+            },
+            "meta": {
+                "status": "success",
+                "message": f"Retrieved {len(formatted_items)} items"
+            }
+        }
+        
+        if self.endpoint:
+            result["data"]["pagination"]["links"] = self._generate_links(next_cursor, prev_cursor)
+        
+        return result
+    
+    def _generate_links(self, next_cursor: Optional[str],
+                        prev_cursor: Optional[str]) -> Dict[str, Optional[str]]:
+        """Generate navigation links for keyset pagination"""
+        def make_url(cursor):
+            args = dict(request.args)
+            args.pop('page', None)
+            args['cursor'] = cursor
+            return url_for(self.endpoint, **args)
+        
+        return {
+            "first": make_url(''),
+            "prev": make_url(prev_cursor) if prev_cursor else None,
+            "next": make_url(next_cursor) if next_cursor else None
+        }
+
+
 def handle_pagination_error(error_dict: Dict[str, Any]) -> tuple:
     """
     Handle pagination validation errors
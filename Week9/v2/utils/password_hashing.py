@@ -0,0 +1,160 @@
+"""
+Password hashing off the request thread
+
+PBKDF2/scrypt are deliberately slow; run inline they hold a request worker
+for the whole hash. Hashes are instead computed in a small process pool with
+a bounded number of jobs in flight. When the pool is saturated,
+`HashingBusy` is raised immediately so the route can answer 503 rather than
+queueing the request behind a login storm; a hash that does not finish
+within PASSWORD_HASH_TIMEOUT raises it too.
+
+Configured from the environment:
+
+    PASSWORD_HASH_METHOD    scrypt      (any werkzeug method, e.g. pbkdf2:sha256:600000)
+    PASSWORD_HASH_WORKERS   cpu count   (0 = hash inline, no pool; per process:
+                                         serve.py defaults it to cores / workers)
+    PASSWORD_HASH_QUEUE     64          (jobs waiting beyond the busy workers)
+    PASSWORD_HASH_TIMEOUT   10          (seconds to wait for one hash)
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Every worker is busy and the queue is full, or a hash timed out"""
+
+
+def _hash(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def _verify(pwhash: str, password: str) -> bool:
+    return check_password_hash(pwhash, password)
+
+
+@lru_cache(maxsize=16)
+def _canonical_method(method: str) -> str:
+    """Method with every parameter spelled out, as stored in the hash ('scrypt' -> 'scrypt:32768:8:1')"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Hash/verify passwords in a bounded process pool"""
+
+    def __init__(self, method: str = 'scrypt', workers: Optional[int] = None,
+                 queue_depth: int = 64, timeout: float = 10):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self.configure(method=method, workers=workers, queue_depth=queue_depth, timeout=timeout)
+
+    def configure(self, method: Optional[str] = None, workers: Optional[int] = None,
+                  queue_depth: Optional[int] = None, timeout: Optional[float] = None) -> None:
+        """Change the policy; the pool is recreated on next use if its size changed"""
+        with self._lock:
+            if method is not None:
+                self.method = method
+            if workers is not None:
+                self.workers = workers
+            elif not hasattr(self, 'workers'):
+                self.workers = os.cpu_count() or 1
+            if queue_depth is not None:
+                self.queue_depth = queue_depth
+            if timeout is not None:
+                self.timeout = timeout
+            self._slots = threading.BoundedSemaphore(max(1, self.workers + self.queue_depth))
+            self._shutdown_pool()
+            self._stats = {"hashed": 0, "verified": 0, "rejected": 0, "rehash_needed": 0}
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> 'PasswordHasher':
+        workers = environ.get('PASSWORD_HASH_WORKERS')
+        return cls(
+            method=environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            workers=int(workers) if workers is not None else None,
+            queue_depth=int(environ.get('PASSWORD_HASH_QUEUE', 64)),
+            timeout=float(environ.get('PASSWORD_HASH_TIMEOUT', 10))
+        )
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # A pool inherited through fork (e.g. prefork servers) is unusable
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self._count("rejected")
+            raise HashingBusy("Password hashing is saturated")
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is freed when the job ends, not when we stop waiting for it
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except (FuturesTimeout, TimeoutError):
+            future.cancel()  # only helps if it has not started yet
+            self._count("rejected")
+            raise HashingBusy("Password hashing timed out")
+
+    def hash(self, password: str) -> str:
+        """
+        Hash `password` with the configured method
+
+        Raises:
+            HashingBusy: if the pool is saturated or the hash timed out
+        """
+        result = self._run(_hash, password, self.method)
+        self._count("hashed")
+        return result
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """
+        Check `password` against a stored hash
+
+        Raises:
+            HashingBusy: if the pool is saturated or the hash timed out
+        """
+        result = self._run(_verify, pwhash, password)
+        self._count("verified")
+        return result
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True if `pwhash` was made with a different method or work factor"""
+        stale = pwhash.split('$', 1)[0] != _canonical_method(self.method)
+        if stale:
+            self._count("rehash_needed")
+        return stale
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"method": self.method, "workers": self.workers,
+                    "queue_depth": self.queue_depth, **self._stats}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._shutdown_pool()
+
+
+password_hasher = PasswordHasher.from_env()
@@ -0,0 +1,206 @@
+"""
+Asynchronous payment settlement
+
+POST /api/v2/payments/book only records the payment as `pending` and
+answers 202. The `payment` table itself is the durable queue: workers claim
+a batch of pending rows with one conditional UPDATE (setting a lease in
+`claimed_at`), call the processor outside any transaction, then settle the
+whole batch with one commit. A worker that dies mid-batch simply lets its
+lease expire and another worker picks the rows up again.
+
+Configured from app config or the environment:
+
+    PAYMENT_WORKERS             2     (threads per process, 0 = no background workers)
+    PAYMENT_BATCH_SIZE          20
+    PAYMENT_LEASE_SECONDS       60
+    PAYMENT_POLL_INTERVAL       1     (seconds between queue checks when idle)
+    PAYMENT_PROCESSOR_LATENCY   0.05  (fake processor delay per payment)
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_, select, update
+
+from database import db
+from models import Payment
+from utils import payment_rollup
+
+FINAL_STATUSES = ('succeeded', 'failed')
+
+# Notified after every settled batch, for long-polling readers in this process
+_settled = threading.Condition()
+
+
+def _setting(app, name: str, default):
+    return type(default)(app.config.get(name, os.environ.get(name, default)))
+
+
+class FakeProcessor:
+    """Stand-in for the card processor: sleeps, then approves (or declines)"""
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def charge(self, payment) -> str:
+        """Return the final status for one claimed payment row"""
+        if self.latency:
+            time.sleep(self.latency)
+        return 'failed' if self._random.random() < self.failure_rate else 'succeeded'
+
+
+def claim_batch(session, batch_size: int, lease_seconds: float) -> List:
+    """
+    Lease up to `batch_size` pending payments (oldest first) and commit
+
+    Returns:
+        Rows with id, amount, currency, created_at, payment_method, claimed_at
+    """
+    now = datetime.utcnow()
+    claimable = (
+        select(Payment.id)
+        .where(Payment.status == 'pending',
+               or_(Payment.claimed_at.is_(None), Payment.claimed_at < now - timedelta(seconds=lease_seconds)))
+        .order_by(Payment.created_at, Payment.id)
+        .limit(batch_size)
+    )
+    rows = session.execute(
+        update(Payment)
+        .where(Payment.id.in_(claimable))
+        .values(claimed_at=now)
+        .returning(Payment.id, Payment.amount, Payment.currency, Payment.created_at,
+                   Payment.payment_method, Payment.claimed_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    session.commit()
+    return rows
+
+
+def settle(session, results) -> int:
+    """
+    Write the outcome of a batch in one transaction
+
+    Args:
+        results: (claimed row, new status) pairs
+
+    Returns:
+        Number of payments settled (rows whose lease was lost are skipped)
+    """
+    settled = 0
+    for row, status in results:
+        changed = session.execute(
+            update(Payment)
+            .where(Payment.id == row.id, Payment.status == 'pending', Payment.claimed_at == row.claimed_at)
+            .values(status=status, claimed_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if changed:
+            payment_rollup.moved(session, row.created_at, row.currency, row.amount, 'pending', status)
+            settled += 1
+    session.commit()
+
+    with _settled:
+        _settled.notify_all()
+    return settled
+
+
+def process_batch(session, processor, batch_size: int = 20, lease_seconds: float = 60) -> int:
+    """Claim, charge and settle one batch; returns how many were claimed"""
+    rows = claim_batch(session, batch_size, lease_seconds)
+    if rows:
+        settle(session, [(row, processor.charge(row)) for row in rows])
+    return len(rows)
+
+
+def wait_for_change(session, payment_id: int, known_status: str, timeout: float) -> Optional[Payment]:
+    """
+    Long-poll: return the payment once its status differs from
+    `known_status`, or when `timeout` seconds have passed
+
+    Settlements in this process wake the waiter immediately; ones made by
+    other processes are seen on the next re-read (every 0.25 s at most).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        payment = session.get(Payment, payment_id, populate_existing=True)
+        remaining = deadline - time.monotonic()
+        if payment is None or payment.status != known_status or remaining <= 0:
+            return payment
+        session.rollback()  # drop the read snapshot so the next read is fresh
+        with _settled:
+            _settled.wait(min(remaining, 0.25))
+
+
+class PaymentWorkerPool:
+    """Background threads draining the pending-payment queue, one pool per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+        self._threads = []
+
+    def ensure_started(self, app) -> None:
+        workers = _setting(app, 'PAYMENT_WORKERS', 2)
+        if workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive fork: a worker process starts its own
+            self._pid = os.getpid()
+            self._stop.clear()
+            processor = app.extensions.get('payment_processor') or FakeProcessor(
+                latency=_setting(app, 'PAYMENT_PROCESSOR_LATENCY', 0.05)
+            )
+            self._threads = [
+                threading.Thread(target=self._run, args=(app, processor), name=f'payment-worker-{i}', daemon=True)
+                for i in range(workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def notify(self) -> None:
+        """New work was committed: wake idle workers now instead of at the next poll"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _run(self, app, processor) -> None:
+        batch_size = _setting(app, 'PAYMENT_BATCH_SIZE', 20)
+        lease = _setting(app, 'PAYMENT_LEASE_SECONDS', 60.0)
+        interval = _setting(app, 'PAYMENT_POLL_INTERVAL', 1.0)
+        while not self._stop.is_set():
+            claimed = 0
+            with app.app_context():
+                try:
+                    claimed = process_batch(db.session, processor, batch_size, lease)
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning("Payment batch failed: %s", e)
+                finally:
+                    db.session.remove()
+            if not claimed:
+                self._wake.wait(interval)
+                self._wake.clear()
+
+
+worker_pool = PaymentWorkerPool()
+
+
+def enqueued(app) -> None:
+    """Call after committing a pending payment"""
+    worker_pool.ensure_started(app)
+    worker_pool.notify()
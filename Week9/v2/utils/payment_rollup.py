@@ -0,0 +1,100 @@
+"""
+Payment totals per (day, currency, status)
+
+`payment_daily_total` is adjusted in the same transaction as every write
+that creates a payment or changes its status, so the summary endpoint reads
+a table of days x currencies x statuses instead of scanning `payment`.
+Payments that predate the table are backfilled by its migration (rebuild).
+"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Payment, PaymentDailyTotal
+
+GROUP_BY_FIELDS = ('day', 'currency', 'status')
+
+
+def _key(value: Optional[str]) -> str:
+    return value or ''
+
+
+def _day(created_at: Optional[datetime]) -> date:
+    return (created_at or datetime.utcnow()).date()
+
+
+def adjust(session, day: date, currency: Optional[str], status: Optional[str],
+           count: int, amount: float) -> None:
+    """Add `count`/`amount` to one rollup row (upsert, no prior read)"""
+    statement = sqlite_insert(PaymentDailyTotal).values(
+        day=day, currency=_key(currency), status=_key(status), count=count, amount=amount
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[PaymentDailyTotal.day, PaymentDailyTotal.currency, PaymentDailyTotal.status],
+        set_={"count": PaymentDailyTotal.count + count, "amount": PaymentDailyTotal.amount + amount}
+    )
+    session.execute(statement)
+
+
+def payment_added(session, payment) -> None:
+    adjust(session, _day(payment.created_at), payment.currency, payment.status, 1, payment.amount or 0.0)
+
+
+def moved(session, created_at: Optional[datetime], currency: Optional[str], amount: Optional[float],
+          old_status: Optional[str], new_status: Optional[str]) -> None:
+    """Move one payment's count and amount from `old_status` to `new_status`"""
+    day, amount = _day(created_at), amount or 0.0
+    adjust(session, day, currency, old_status, -1, -amount)
+    adjust(session, day, currency, new_status, 1, amount)
+
+
+def rebuild(executor) -> None:
+    """Recompute the rollup from `payment` (accepts a session or a connection)"""
+    day = func.date(Payment.created_at)
+    currency = func.coalesce(Payment.currency, '')
+    status = func.coalesce(Payment.status, '')
+    executor.execute(delete(PaymentDailyTotal))
+    executor.execute(insert(PaymentDailyTotal).from_select(
+        ['day', 'currency', 'status', 'count', 'amount'],
+        select(day, currency, status, func.count(Payment.id), func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(Payment.created_at.isnot(None))
+        .group_by(day, currency, status)
+    ))
+
+
+def summary(session, group_by: Iterable[str], date_from: Optional[date] = None, date_to: Optional[date] = None,
+            currency: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Sum the rollup over the requested dimensions
+
+    Args:
+        group_by: Subset of GROUP_BY_FIELDS
+        date_from, date_to: Inclusive day range
+
+    Returns:
+        One dict per group with its dimensions, `count` and `amount`
+    """
+    columns = [getattr(PaymentDailyTotal, name) for name in group_by]
+    query = session.query(*columns,
+                          func.sum(PaymentDailyTotal.count),
+                          func.sum(PaymentDailyTotal.amount))
+    if date_from:
+        query = query.filter(PaymentDailyTotal.day >= date_from)
+    if date_to:
+        query = query.filter(PaymentDailyTotal.day <= date_to)
+    if currency:
+        query = query.filter(PaymentDailyTotal.currency == currency)
+    if status:
+        query = query.filter(PaymentDailyTotal.status == status)
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+
+    rows = []
+    for row in query.all():
+        count, amount = row[-2], row[-1]
+        if not count:
+            continue
+        group = {name: (value.isoformat() if isinstance(value, date) else value)
+                 for name, value in zip(group_by, row)}
+        rows.append({**group, "count": count, "amount": round(amount or 0.0, 2)})
+    return rows
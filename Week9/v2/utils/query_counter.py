@@ -0,0 +1,46 @@
+"""
+Count the SQL statements a block of code (or a request) issues
+
+Use in tests to pin an endpoint to a constant number of queries, so an
+N+1 regression fails loudly instead of silently multiplying round-trips.
+"""
+from contextlib import contextmanager
+from typing import List
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def report(self) -> str:
+        return '\n'.join(f'{i}. {" ".join(sql.split())}' for i, sql in enumerate(self.statements, start=1))
+
+
+@contextmanager
+def count_queries(engine):
+    """Record every statement executed on `engine` inside the block"""
+    counter = QueryCounter()
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def assert_num_queries(engine, expected: int):
+    """Fail unless exactly `expected` statements run inside the block"""
+    with count_queries(engine) as counter:
+        yield counter
+    assert counter.count == expected, (
+        f"Expected {expected} queries, got {counter.count}:\n{counter.report()}"
+    )
@@ -0,0 +1,55 @@
+"""
+EXPLAIN QUERY PLAN harness for the SQL generated by the list endpoints
+
+Capture every SELECT an endpoint issues, replay each one under
+EXPLAIN QUERY PLAN and report steps that scan a whole table without an
+index or sort the result in a temp b-tree.
+"""
+import re
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
+from sqlalchemy import event
+
+_FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+_TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@contextmanager
+def capture_selects(engine):
+    """Collect (sql, parameters) for every SELECT run on `engine`"""
+    statements: List[Tuple[str, tuple]] = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+    
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(connection, statement: str, parameters) -> List[str]:
+    """Return the detail column of EXPLAIN QUERY PLAN for one statement"""
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+
+def regressions(plan: Iterable[str], tables: Iterable[str]) -> List[str]:
+    """
+    Return the plan steps that count as a regression
+    
+    Args:
+        plan: Detail lines from explain()
+        tables: Base tables that must always be reached through an index
+    """
+    tables = set(tables)
+    problems = []
+    for step in plan:
+        match = _FULL_SCAN_RE.match(step.strip())
+        if match and match.group(1) in tables:
+            problems.append(step)
+        elif step.strip() == _TEMP_SORT:
+            problems.append(step)
+    return problems
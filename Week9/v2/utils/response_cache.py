@@ -0,0 +1,126 @@
+"""
+In-process LRU cache for GET responses with tag-based invalidation
+
+Each entry is tagged with the tables it was built from and remembers their
+committed generations (table_version). A write to any of those tables, in
+this or another worker process, changes the generation and the entry is
+never served again; stale entries are dropped lazily or by LRU eviction.
+
+Every app gets its own cache (`app.extensions['response_cache']`, see
+init_app), so instances bound to different databases never share entries.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Iterable, Optional, Tuple
+from flask import current_app, request, make_response, Response
+from database import db
+from utils import table_versions
+from utils.etag import normalized_args
+
+# Response headers worth replaying on a hit
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Cache-Control')
+
+
+class ResponseCache:
+    """Bounded LRU of rendered responses with TTL and hit/miss/eviction stats"""
+    
+    def __init__(self, max_entries: int = 512, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Tuple, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: Tuple, versions: Tuple[int, ...]) -> Optional[tuple]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, status, headers, entry_versions, expires_at = entry
+                if entry_versions == versions and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body, status, headers
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+        return None
+    
+    def set(self, key: Tuple, versions: Tuple[int, ...], body: bytes,
+            status: int, headers: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = (body, status, headers, versions, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+    
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 4) if total else None
+            }
+
+
+def init_app(app) -> ResponseCache:
+    """Attach a fresh cache to `app` (called by create_app)"""
+    return app.extensions.setdefault('response_cache', ResponseCache())
+
+
+def current_cache() -> ResponseCache:
+    """The cache of the app handling the current request"""
+    return current_app.extensions.get('response_cache') or init_app(current_app)
+
+
+def cached_response(tags: Iterable[str]):
+    """
+    Serve repeated GETs from the app's cache until a tagged table changes
+    
+    The key is the endpoint, its view arguments and the canonicalized query
+    string. Only 200 responses are stored. Responses carry X-Cache: HIT/MISS.
+    """
+    tags = tuple(tags)
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = (request.endpoint, tuple(sorted(kwargs.items())), normalized_args())
+            versions = table_versions.stored_for_request(db.session, tags)
+            response_cache = current_cache()
+            
+            hit = response_cache.get(key, versions)
+            if hit is not None:
+                body, status, headers = hit
+                response = Response(body, status=status, headers=headers)
+                if response.get_etag()[0] and request.if_none_match.contains_weak(response.get_etag()[0]):
+                    response = make_response('', 304)
+                    response.headers['ETag'] = headers['ETag']
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+                response_cache.set(key, versions, response.get_data(), 200, headers)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated
+    return decorator
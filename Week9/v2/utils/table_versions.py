@@ -0,0 +1,85 @@
+"""
+Per-table write generations for invalidating derived data
+
+Every committed INSERT/UPDATE/DELETE made through the SQLAlchemy session
+bumps the generation of the tables it touched. Caches store the generations
+they were computed against and treat any mismatch as a miss, so invalidation
+is O(1) and can never race with a concurrent reader.
+
+Generations live in the `table_version` table and are bumped inside the
+writing transaction, so every worker process sees the same value.
+"""
+from typing import Iterable, Tuple
+from flask import g
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models import TableVersion
+
+_PENDING_KEY = 'table_versions.pending'
+
+
+def _pending(session) -> set:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tables(session, flush_context):
+    pending = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            pending.add(table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_statement_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _pending(orm_execute_state.session).add(table.name)
+
+
+def stored(session, tables: Iterable[str]) -> Tuple[int, ...]:
+    """Read the committed generations of several tables from the database"""
+    tables = tuple(tables)
+    rows = dict(session.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+    ).all())
+    return tuple(rows.get(table, 0) for table in tables)
+
+
+def stored_for_request(session, tables: Iterable[str]) -> Tuple[int, ...]:
+    """stored(), memoized per request so stacked decorators read it once"""
+    tables = tuple(tables)
+    memo = g.setdefault('table_versions', {})
+    if tables not in memo:
+        memo[tables] = stored(session, tables)
+    return memo[tables]
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_stored_versions(session):
+    # Flush first so tables written by the commit's own flush are included
+    session.flush()
+    pending = session.info.get(_PENDING_KEY)
+    tables = sorted(pending - {TableVersion.__tablename__}) if pending else []
+    if not tables:
+        return
+    
+    statement = sqlite_insert(TableVersion).on_conflict_do_update(
+        index_elements=[TableVersion.name],
+        set_={"version": TableVersion.version + 1}
+    )
+    # Core execution on the connection keeps this write out of `pending`
+    session.connection().execute(statement, [{"name": table, "version": 1} for table in tables])
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_committed_tables(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_tables(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
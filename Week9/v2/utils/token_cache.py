@@ -0,0 +1,142 @@
+"""
+LRU cache of verified JWTs for jwt_required
+
+Every app gets its own cache (`app.extensions['token_cache']`, see
+init_app). Entries are keyed by (secret, token), so a token verified with
+one key is never trusted under another.
+"""
+import base64
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Tuple, Type
+
+import jwt
+from flask import current_app
+
+ALGORITHM = 'HS256'
+
+
+@lru_cache(maxsize=8)
+def signing_key(secret: str) -> jwt.PyJWK:
+    """
+    HMAC key object prepared once per secret instead of on every decode
+
+    jwt.decode accepts a PyJWK since PyJWT 2.9 (hence the floor in
+    requirements.txt).
+    """
+    k = base64.urlsafe_b64encode(secret.encode()).rstrip(b'=').decode()
+    return jwt.PyJWK({"kty": "oct", "k": k, "alg": ALGORITHM})
+
+
+class TokenCache:
+    """
+    Verified token -> claims, bounded and LRU-evicted.
+
+    A positive entry lives until the token's own `exp`, so a cached token
+    expires exactly when jwt.decode would start rejecting it. Rejected
+    tokens are remembered for `negative_ttl` seconds so a client retrying a
+    bad token doesn't cost a full decode each time.
+    """
+
+    def __init__(self, max_entries: int = 4096, negative_ttl: float = 30.0, max_negative: int = 1024):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.max_negative = max_negative
+        self._valid: 'OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], float]]' = OrderedDict()
+        self._rejected: 'OrderedDict[Tuple[str, str], Tuple[Type[Exception], str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Tuple[str, str], now: float):
+        """Cached claims, a cached rejection to re-raise, or None on a miss"""
+        with self._lock:
+            entry = self._valid.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if now < expires_at:
+                    self._valid.move_to_end(key)
+                    self.hits += 1
+                    return dict(claims)
+                del self._valid[key]
+                self._remember_rejection(key, jwt.ExpiredSignatureError, "Signature has expired", now)
+
+            rejected = self._rejected.get(key)
+            if rejected is not None:
+                error, message, until = rejected
+                if now < until:
+                    self.negative_hits += 1
+                    raise error(message)
+                del self._rejected[key]
+
+            self.misses += 1
+            return None
+
+    def _remember_rejection(self, key: Tuple[str, str], error: Type[Exception], message: str, now: float) -> None:
+        self._rejected[key] = (error, message, now + self.negative_ttl)
+        self._rejected.move_to_end(key)
+        while len(self._rejected) > self.max_negative:
+            self._rejected.popitem(last=False)
+
+    def decode(self, token: str, secret: str) -> Dict[str, Any]:
+        """
+        Verify `token` and return its claims, from cache when possible
+
+        Raises:
+            jwt.ExpiredSignatureError, jwt.InvalidTokenError: same as jwt.decode
+        """
+        now = time.time()
+        key = (secret, token)
+        claims = self._lookup(key, now)
+        if claims is not None:
+            return claims
+
+        try:
+            claims = jwt.decode(token, signing_key(secret), algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError as e:
+            with self._lock:
+                self._remember_rejection(key, type(e), str(e), now)
+            raise
+
+        # Tokens without exp (or not yet valid) are verified every time
+        if 'exp' in claims and 'nbf' not in claims:
+            with self._lock:
+                self._valid[key] = (claims, float(claims['exp']))
+                self._valid.move_to_end(key)
+                while len(self._valid) > self.max_entries:
+                    self._valid.popitem(last=False)
+                    self.evictions += 1
+        return dict(claims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._valid.clear()
+            self._rejected.clear()
+            self.hits = self.misses = self.negative_hits = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.negative_hits
+            return {
+                "entries": len(self._valid),
+                "rejected_entries": len(self._rejected),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+def init_app(app) -> TokenCache:
+    """Attach a fresh cache to `app` (called by create_app)"""
+    return app.extensions.setdefault('token_cache', TokenCache())
+
+
+def current_cache() -> TokenCache:
+    """The cache of the app handling the current request"""
+    return current_app.extensions.get('token_cache') or init_app(current_app)